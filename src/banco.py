@@ -0,0 +1,276 @@
+import itertools
+import os
+import queue
+import sys
+import threading
+import psycopg2
+from dotenv import load_dotenv
+from migracoes import aplicar_migracoes
+from rastreamento import CursorRastreado, definir_acao
+
+# Carregar variáveis de ambiente do arquivo .env
+load_dotenv()
+
+# Intervalo (ms) em que a interface busca os resultados prontos do executor
+INTERVALO_RESULTADOS_MS = 30
+
+# Linhas trazidas do servidor por vez nas leituras com cursor nomeado
+LINHAS_POR_LOTE = 2000
+
+# Lotes de uma leitura em lotes que podem aguardar a interface; a thread do banco só
+# busca o lote seguinte depois que a interface consome um deles
+LOTES_EM_ESPERA = 2
+
+# Nomes únicos para os cursores nomeados
+numeros_cursor = itertools.count(1)
+
+def conectar(dbname=None):
+    """Abre uma nova conexão com o banco usando as credenciais do .env.
+
+    Os cursores da conexão são rastreados (tempo, linhas e ação de cada comando).
+    """
+    db_password = os.getenv('db_password')
+    if not db_password:
+        raise ValueError('db_password não encontrado no arquivo .env')
+    return psycopg2.connect(
+        dbname=dbname or os.getenv('db_name', 'escola'), user='postgres', password=db_password,
+        host='localhost', client_encoding='UTF8', cursor_factory=CursorRastreado)
+
+def inicializar_banco():
+    """Conexão com o esquema já migrado até a versão atual"""
+    con = conectar()
+    aplicar_migracoes(con)
+    return con
+
+def iterar_lotes(con, query, params=None, tamanho=LINHAS_POR_LOTE):
+    """Gera o resultado da consulta em listas de até `tamanho` linhas.
+
+    Usa um cursor nomeado (no servidor), então só um lote fica em memória por vez.
+    Precisa rodar dentro de uma transação (conexão fora de autocommit).
+    """
+    cur = con.cursor(name=f'leitura_{next(numeros_cursor)}')
+    try:
+        cur.execute(query, params)
+        while True:
+            lote = cur.fetchmany(tamanho)
+            if not lote:
+                break
+            yield lote
+    finally:
+        cur.close()
+
+def iterar_consulta(con, query, params=None, tamanho=LINHAS_POR_LOTE):
+    """Gera as linhas da consulta uma a uma, buscando-as do servidor em lotes"""
+    for lote in iterar_lotes(con, query, params, tamanho):
+        yield from lote
+
+class LinhasCopy:
+    """Arquivo somente leitura que entrega ao COPY FROM STDIN as linhas de um gerador"""
+    def __init__(self, linhas):
+        self.linhas = linhas
+        self.resto = ''
+
+    def read(self, tamanho=8192):
+        partes, total = [self.resto], len(self.resto)
+        for linha in self.linhas:
+            partes.append(linha)
+            total += len(linha)
+            if 0 <= tamanho <= total:
+                break
+        dados = ''.join(partes)
+        if tamanho < 0:
+            self.resto = ''
+            return dados
+        self.resto = dados[tamanho:]
+        return dados[:tamanho]
+
+def campo_copy(valor):
+    if valor is None:
+        return '\\N'
+    # Escapes do formato texto do COPY
+    return (str(valor).replace('\\', '\\\\').replace('\t', '\\t')
+            .replace('\n', '\\n').replace('\r', '\\r'))
+
+def linha_copy(*valores):
+    return '\t'.join(campo_copy(v) for v in valores) + '\n'
+
+def copiar(cur, tabela, colunas, linhas):
+    cur.copy_expert(f"COPY {tabela}({', '.join(colunas)}) FROM STDIN", LinhasCopy(linhas))
+
+class ExecutorBanco:
+    """Executa funções de banco fora da thread do Tk e entrega os resultados via after().
+
+    Cada tarefa é uma função que recebe a conexão e devolve o resultado. As tarefas
+    rodam em ordem, em uma thread com conexão própria, e são confirmadas (commit) ao
+    final. Tarefas com a mesma chave se substituem: a mais nova descarta as pendentes,
+    cancela no servidor a que estiver em execução e só o resultado dela é entregue.
+
+    Com `con` informada, as tarefas rodam imediatamente na thread atual usando essa
+    conexão (modo síncrono, usado nos testes).
+    """
+
+    def __init__(self, janela, con=None):
+        self.janela = janela
+        self.con = con
+        self.assincrono = con is None
+        self.sequencias = {}  # chave -> sequência da tarefa mais recente
+        self.pendentes = queue.Queue()
+        self.resultados = queue.Queue()
+        self.trava = threading.Lock()
+        self.em_execucao = None  # (chave, sequência, conexão) da tarefa em execução
+        self.encerrado = False
+        if self.assincrono:
+            self.thread = threading.Thread(target=self.trabalhar, name='executor-banco', daemon=True)
+            self.thread.start()
+            self.janela.after(INTERVALO_RESULTADOS_MS, self.processar_resultados)
+
+    def submeter(self, funcao, ao_concluir=None, ao_falhar=None, chave=None, ao_finalizar=None, ao_lote=None,
+                 acao=None):
+        """Agenda funcao(con); ao_finalizar é sempre chamado, mesmo se a tarefa for descartada.
+
+        Com ao_lote, funcao(con) é um gerador: cada lote produzido é entregue a ao_lote
+        assim que fica pronto, e ao_concluir recebe None ao final. Até LOTES_EM_ESPERA
+        lotes aguardam a interface; com isso cheio, o gerador só avança quando a
+        interface consome um deles. `acao` identifica, no rastreamento, a ação da
+        interface que originou os comandos da tarefa.
+        """
+        sequencia = None
+        if chave is not None:
+            sequencia = self.sequencias.get(chave, 0) + 1
+            self.sequencias[chave] = sequencia
+        if ao_lote is not None:
+            funcao = self.entregando_lotes(funcao, ao_lote, chave, sequencia)
+        if acao is not None:
+            funcao = self.com_acao(funcao, acao)
+        tarefa = (funcao, ao_concluir, ao_falhar, ao_finalizar, chave, sequencia)
+        if not self.assincrono:
+            self.entregar(tarefa, *self.executar(self.con, tarefa))
+            return
+        if chave is not None:
+            self.cancelar_obsoleta(chave, sequencia)
+        self.pendentes.put(tarefa)
+
+    def descartar(self, chave):
+        """Descarta as tarefas da chave (cancelando a que estiver rodando) sem agendar outra.
+
+        Usado quando a interface obtém o resultado por outro caminho, sem o banco.
+        """
+        sequencia = self.sequencias.get(chave, 0) + 1
+        self.sequencias[chave] = sequencia
+        if self.assincrono:
+            self.cancelar_obsoleta(chave, sequencia)
+
+    def entregando_lotes(self, gerar, ao_lote, chave, sequencia):
+        vagas = threading.Semaphore(LOTES_EM_ESPERA)
+        # A vaga é devolvida na entrega do lote, mesmo se ele for descartado
+        parcial = (None, ao_lote, None, vagas.release, chave, sequencia)
+        def funcao(con):
+            for lote in gerar(con):
+                # Uma tarefa mais nova com a mesma chave torna o restante inútil
+                if self.obsoleta(chave, sequencia):
+                    break
+                if self.assincrono:
+                    if not self.aguardar_vaga(vagas, chave, sequencia):
+                        break
+                    self.resultados.put((parcial, True, lote))
+                else:
+                    self.entregar(parcial, True, lote)
+        return funcao
+
+    def aguardar_vaga(self, vagas, chave, sequencia):
+        """Espera a interface consumir um lote; False se a tarefa deixou de interessar"""
+        while not vagas.acquire(timeout=INTERVALO_RESULTADOS_MS / 1000):
+            if self.encerrado or self.obsoleta(chave, sequencia):
+                return False
+        return True
+
+    def com_acao(self, funcao, acao):
+        def executar(con):
+            anterior = definir_acao(acao)
+            try:
+                return funcao(con)
+            finally:
+                definir_acao(anterior)
+        return executar
+
+    def obsoleta(self, chave, sequencia):
+        return chave is not None and self.sequencias.get(chave) != sequencia
+
+    def cancelar_obsoleta(self, chave, sequencia):
+        """Cancela no servidor a consulta da mesma chave que ainda estiver rodando"""
+        with self.trava:
+            if self.em_execucao and self.em_execucao[0] == chave and self.em_execucao[1] != sequencia:
+                self.em_execucao[2].cancel()
+
+    def executar(self, con, tarefa):
+        try:
+            resultado = tarefa[0](con)
+            con.commit()
+            return True, resultado
+        except Exception as e:
+            if not con.closed:
+                con.rollback()
+            return False, e
+
+    def trabalhar(self):
+        con = None
+        while True:
+            tarefa = self.pendentes.get()
+            if tarefa is None:
+                break
+            chave, sequencia = tarefa[4], tarefa[5]
+            if self.obsoleta(chave, sequencia):
+                self.resultados.put((tarefa, False, None))
+                continue
+            try:
+                if con is None or con.closed:
+                    con = conectar()
+            except Exception as e:
+                self.resultados.put((tarefa, False, e))
+                continue
+            with self.trava:
+                self.em_execucao = (chave, sequencia, con)
+            resultado = self.executar(con, tarefa)
+            with self.trava:
+                self.em_execucao = None
+            self.resultados.put((tarefa, *resultado))
+        if con is not None:
+            con.close()
+
+    def processar_resultados(self):
+        """Entrega na thread do Tk os resultados que ficaram prontos"""
+        try:
+            while True:
+                try:
+                    tarefa, ok, valor = self.resultados.get_nowait()
+                except queue.Empty:
+                    break
+                try:
+                    self.entregar(tarefa, ok, valor)
+                except Exception:
+                    # Um callback com erro (janela já fechada, por exemplo) é relatado
+                    # como os demais callbacks do Tk e não impede a entrega dos outros
+                    self.janela.report_callback_exception(*sys.exc_info())
+        finally:
+            if not self.encerrado:
+                self.janela.after(INTERVALO_RESULTADOS_MS, self.processar_resultados)
+
+    def entregar(self, tarefa, ok, valor):
+        _, ao_concluir, ao_falhar, ao_finalizar, chave, sequencia = tarefa
+        if ao_finalizar:
+            ao_finalizar()
+        # Um resultado atrasado nunca sobrescreve o de uma tarefa mais nova; o cancelamento
+        # dela é esperado. Qualquer outro cancelamento (statement_timeout, por exemplo) é
+        # uma falha da tarefa
+        if self.obsoleta(chave, sequencia):
+            return
+        if ok:
+            if ao_concluir:
+                ao_concluir(valor)
+        elif ao_falhar:
+            ao_falhar(valor)
+
+    def encerrar(self):
+        self.encerrado = True
+        if self.assincrono:
+            self.pendentes.put(None)
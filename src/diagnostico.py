@@ -0,0 +1,349 @@
+import bisect
+import cProfile
+import os
+import sys
+import tempfile
+import time
+import tkinter as tk
+from tkinter import ttk
+import rastreamento
+
+# Intervalo (ms) de atualização das janelas de diagnóstico
+INTERVALO_DIAGNOSTICO_MS = 1000
+
+# Limites (ms) das faixas do histograma de duração dos callbacks; a última faixa é "acima"
+LIMITES_HISTOGRAMA_MS = (1, 4, 16, 50, 100, 250, 1000)
+
+# Intervalo (ms) da batida que mede o travamento do mainloop, e o atraso a partir do
+# qual a batida conta como travamento
+INTERVALO_BATIDA_MS = 100
+LIMITE_TRAVAMENTO_MS = 50
+
+# Callbacks perfilados por padrão a cada pedido de perfil
+CALLBACKS_PERFIL = 50
+
+# Monitor que mede os callbacks do Tk (um por processo, o da janela principal) e o
+# CallWrapper.__call__ original, recolocado quando o monitor é encerrado
+monitor_ativo = None
+chamar_callback = tk.CallWrapper.__call__
+
+# Módulos cujas funções são tratadores de eventos da interface. São reconhecidos pelo
+# arquivo, que é o mesmo rodando como script (__main__) ou importados como main ou src.main
+MODULOS_INTERFACE = ('main', 'lancamento')
+ARQUIVOS_INTERFACE = {os.path.join(os.path.dirname(os.path.abspath(__file__)), f'{modulo}.py')
+                      for modulo in MODULOS_INTERFACE}
+
+def acao_da_interface():
+    """Nome do tratador da interface que originou a chamada atual.
+
+    É a função de interface mais externa da pilha, ignorando lambdas: um botão
+    com command=lambda: self.marcar_filtradas(True) resulta em 'marcar_filtradas', e
+    o callback concluido de adicionar_curso resulta em 'adicionar_curso'.
+    """
+    acao = None
+    quadro = sys._getframe(1)
+    while quadro is not None:
+        codigo = quadro.f_code
+        if (os.path.abspath(codigo.co_filename) in ARQUIVOS_INTERFACE
+                and codigo.co_name not in ('<lambda>', '<module>')):
+            acao = getattr(codigo, 'co_qualname', codigo.co_name)
+        quadro = quadro.f_back
+    if acao is None:
+        return None
+    return acao.split('.<locals>')[0].removeprefix('MiniEscolaApp.')
+
+def nome_callback(func):
+    """Nome legível do callback: método, função local ou lambda (com a linha)"""
+    codigo = getattr(func, '__code__', None)
+    # O after() do tkinter embrulha a função em callit
+    if codigo is not None and codigo.co_name == 'callit' and 'func' in codigo.co_freevars:
+        func = func.__closure__[codigo.co_freevars.index('func')].cell_contents
+        codigo = getattr(func, '__code__', None)
+    nome = getattr(func, '__qualname__', None) or type(func).__name__
+    nome = nome.removeprefix('MiniEscolaApp.').replace('.<locals>', '')
+    if codigo is not None and codigo.co_name == '<lambda>':
+        nome += f':{codigo.co_firstlineno}'
+    return nome
+
+def chamar_medindo(wrapper, *args):
+    monitor = monitor_ativo
+    if monitor is None:
+        return chamar_callback(wrapper, *args)
+    return monitor.medir(wrapper, args)
+
+class MonitorInterface:
+    """Mede a duração de cada callback do Tk (comandos, binds e after) e o travamento do mainloop.
+
+    Os callbacks passam por tkinter.CallWrapper, substituído na criação do monitor e
+    restaurado em encerrar(): por isso ele precisa ser criado antes dos widgets e só
+    pode haver um ativo por vez. Sob pedido, os próximos callbacks são perfilados com
+    cProfile e gravados em um arquivo .prof.
+    """
+
+    def __init__(self, janela):
+        global monitor_ativo
+        if monitor_ativo is not None:
+            raise RuntimeError('Já há um monitor da interface ativo; encerre-o antes de criar outro')
+        self.janela = janela
+        tk.CallWrapper.__call__ = chamar_medindo
+        monitor_ativo = self
+        self.zerar()
+        self.perfil = None
+        self.restantes_perfil = 0
+        self.perfilando = False
+        self.ultimo_perfil = None
+        # A batida é um comando Tcl direto, fora do CallWrapper, para não entrar nas medições
+        self.comando_batida = f'monitor_batida{id(self)}'
+        self.janela.tk.createcommand(self.comando_batida, self.batida)
+        self.proxima_batida = time.perf_counter() + INTERVALO_BATIDA_MS / 1000
+        self.agendamento = self.janela.tk.call('after', INTERVALO_BATIDA_MS, self.comando_batida)
+
+    def zerar(self):
+        self.callbacks = {}  # nome -> [chamadas, segundos, maior, histograma]
+        self.travamentos = 0
+        self.tempo_travado = 0.0
+        self.maior_travamento = 0.0
+
+    def medir(self, wrapper, args):
+        # Callbacks aninhados (update(), diálogos) entram no perfil do mais externo
+        perfilar = self.restantes_perfil > 0 and not self.perfilando
+        inicio = time.perf_counter()
+        if perfilar:
+            self.perfilando = True
+            self.perfil.enable()
+        try:
+            return chamar_callback(wrapper, *args)
+        finally:
+            if perfilar:
+                self.perfil.disable()
+                self.perfilando = False
+                self.restantes_perfil -= 1
+                if self.restantes_perfil == 0:
+                    self.gravar_perfil()
+            self.registrar(nome_callback(wrapper.func), time.perf_counter() - inicio)
+
+    def registrar(self, nome, duracao):
+        callback = self.callbacks.get(nome)
+        if callback is None:
+            callback = self.callbacks[nome] = [0, 0.0, 0.0, [0] * (len(LIMITES_HISTOGRAMA_MS) + 1)]
+        callback[0] += 1
+        callback[1] += duracao
+        callback[2] = max(callback[2], duracao)
+        callback[3][bisect.bisect_left(LIMITES_HISTOGRAMA_MS, duracao * 1000)] += 1
+
+    def batida(self):
+        agora = time.perf_counter()
+        atraso = (agora - self.proxima_batida) * 1000
+        if atraso >= LIMITE_TRAVAMENTO_MS:
+            self.travamentos += 1
+            self.tempo_travado += atraso
+            self.maior_travamento = max(self.maior_travamento, atraso)
+        self.proxima_batida = agora + INTERVALO_BATIDA_MS / 1000
+        self.agendamento = self.janela.tk.call('after', INTERVALO_BATIDA_MS, self.comando_batida)
+
+    def perfilar(self, quantidade=CALLBACKS_PERFIL):
+        """Perfila os próximos `quantidade` callbacks"""
+        self.perfil = cProfile.Profile()
+        self.restantes_perfil = quantidade
+
+    def gravar_perfil(self):
+        """Grava o perfil no formato do pstats (snakeviz, flameprof, python -m pstats)"""
+        self.ultimo_perfil = os.path.join(tempfile.gettempdir(),
+                                          f"miniescola_{time.strftime('%Y%m%d_%H%M%S')}.prof")
+        self.perfil.dump_stats(self.ultimo_perfil)
+        self.perfil = None
+
+    def resumo(self):
+        """[(callback, chamadas, ms, maior ms, histograma)], dos mais demorados para os mais rápidos"""
+        return sorted(((nome, chamadas, segundos * 1000, maior * 1000, list(histograma))
+                       for nome, (chamadas, segundos, maior, histograma) in self.callbacks.items()),
+                      key=lambda item: item[2], reverse=True)
+
+    def encerrar(self):
+        global monitor_ativo
+        if monitor_ativo is self:
+            monitor_ativo = None
+            tk.CallWrapper.__call__ = chamar_callback
+        self.janela.tk.call('after', 'cancel', self.agendamento)
+        self.janela.tk.deletecommand(self.comando_batida)
+
+def texto_ms(valor):
+    return f'{valor:.1f}'
+
+class JanelaDiagnostico(tk.Toplevel):
+    """Resumo ao vivo das consultas por ação da interface e das consultas lentas"""
+
+    def __init__(self, app):
+        super().__init__(app)
+        self.title('Diagnóstico de Consultas')
+        self.geometry('1000x600')
+        self.itens = {}  # (ação,) ou (ação, sql) -> item da árvore
+        self.lentas = {}  # número -> consulta lenta exibida
+        self.agendamento = None
+
+        frame_topo = ttk.Frame(self)
+        frame_topo.pack(fill='x', padx=5, pady=5)
+        ttk.Label(frame_topo, text=f'Consultas lentas: acima de {rastreamento.LIMITE_LENTA_MS:.0f} ms'
+                                   f"{' (com plano)' if rastreamento.EXPLICAR_LENTAS else ''}").pack(side='left')
+        ttk.Button(frame_topo, text='Zerar', command=self.zerar).pack(side='right')
+
+        painel = ttk.PanedWindow(self, orient='vertical')
+        painel.pack(fill='both', expand=True, padx=5, pady=5)
+
+        # Ações e, dentro de cada uma, os comandos normalizados
+        frame_acoes = ttk.Frame(painel)
+        self.arvore = ttk.Treeview(frame_acoes, columns=('execucoes', 'total', 'medio', 'maior', 'linhas', 'lentas'))
+        self.arvore.heading('#0', text='Ação / Comando')
+        self.arvore.column('#0', width=460)
+        for coluna, titulo in [('execucoes', 'Execuções'), ('total', 'Total (ms)'), ('medio', 'Médio (ms)'),
+                               ('maior', 'Maior (ms)'), ('linhas', 'Linhas'), ('lentas', 'Lentas')]:
+            self.arvore.heading(coluna, text=titulo)
+            self.arvore.column(coluna, width=80, anchor='e')
+        scrollbar = ttk.Scrollbar(frame_acoes, orient='vertical', command=self.arvore.yview)
+        self.arvore.configure(yscrollcommand=scrollbar.set)
+        scrollbar.pack(side='right', fill='y')
+        self.arvore.pack(side='left', fill='both', expand=True)
+        painel.add(frame_acoes, weight=3)
+
+        # Consultas lentas, com o plano da selecionada
+        frame_lentas = ttk.Frame(painel)
+        self.lista_lentas = ttk.Treeview(frame_lentas, columns=('hora', 'acao', 'ms', 'sql'), show='headings', height=6)
+        for coluna, titulo, largura in [('hora', 'Hora', 70), ('acao', 'Ação', 160), ('ms', 'ms', 70),
+                                        ('sql', 'Comando', 600)]:
+            self.lista_lentas.heading(coluna, text=titulo)
+            self.lista_lentas.column(coluna, width=largura, anchor='e' if coluna == 'ms' else 'w')
+        self.lista_lentas.pack(side='left', fill='both', expand=True)
+        self.lista_lentas.bind('<<TreeviewSelect>>', self.mostrar_plano)
+        self.texto_plano = tk.Text(frame_lentas, width=50, height=6, wrap='none', font=('Courier', 9))
+        self.texto_plano.pack(side='right', fill='both')
+        painel.add(frame_lentas, weight=1)
+
+        self.atualizar()
+
+    def atualizar(self):
+        """Atualiza os totais, mantendo a seleção e as ações expandidas"""
+        # As mais demoradas primeiro, tanto as ações quanto os comandos de cada uma
+        for posicao, (acao, execucoes, total, linhas, lentas, consultas) in enumerate(rastreamento.resumo_por_acao()):
+            item = self.item((acao,), '', posicao, acao)
+            self.arvore.item(item, values=(execucoes, texto_ms(total), texto_ms(total / execucoes), '', linhas, lentas))
+            for posicao_sql, (sql, execucoes, total, maior, linhas, lentas) in enumerate(consultas):
+                filho = self.item((acao, sql), item, posicao_sql, sql)
+                self.arvore.item(filho, values=(execucoes, texto_ms(total), texto_ms(total / execucoes),
+                                                texto_ms(maior), linhas, lentas))
+        # Acrescenta as lentas novas e retira as que saíram do histórico
+        lentas = {lenta[0]: lenta for lenta in rastreamento.consultas_lentas()}
+        for numero in set(self.lentas) - set(lentas):
+            self.lista_lentas.delete(str(numero))
+        for numero, (_, hora, acao, ms, sql, _) in sorted(lentas.items()):
+            if numero not in self.lentas:
+                self.lista_lentas.insert('', 0, iid=str(numero), values=(hora, acao, texto_ms(ms), sql))
+        self.lentas = lentas
+        self.agendamento = self.after(INTERVALO_DIAGNOSTICO_MS, self.atualizar)
+
+    def destroy(self):
+        if self.agendamento is not None:
+            self.after_cancel(self.agendamento)
+        super().destroy()
+
+    def item(self, chave, pai, posicao, texto):
+        item = self.itens.get(chave)
+        if item is None or not self.arvore.exists(item):
+            item = self.arvore.insert(pai, posicao, text=texto)
+            self.itens[chave] = item
+        else:
+            self.arvore.move(item, pai, posicao)
+        return item
+
+    def mostrar_plano(self, event=None):
+        selecionados = self.lista_lentas.selection()
+        self.texto_plano.delete('1.0', tk.END)
+        if selecionados:
+            *_, sql, plano = self.lentas[int(selecionados[0])]
+            self.texto_plano.insert('1.0', plano or sql)
+
+    def zerar(self):
+        rastreamento.zerar()
+        self.arvore.delete(*self.arvore.get_children())
+        self.itens.clear()
+        self.lista_lentas.delete(*self.lista_lentas.get_children())
+        self.lentas = {}
+
+class JanelaMonitor(tk.Toplevel):
+    """Histogramas de duração dos callbacks do Tk, travamentos do mainloop e perfil sob pedido"""
+
+    def __init__(self, app):
+        super().__init__(app)
+        self.monitor = app.monitor
+        self.title('Monitor da Interface')
+        self.geometry('1000x500')
+        self.agendamento = None
+
+        frame_topo = ttk.Frame(self)
+        frame_topo.pack(fill='x', padx=5, pady=5)
+        self.rotulo_travamentos = ttk.Label(frame_topo, text='')
+        self.rotulo_travamentos.pack(side='left')
+        ttk.Button(frame_topo, text='Zerar', command=self.zerar).pack(side='right')
+
+        faixas = [f'≤{limite}' for limite in LIMITES_HISTOGRAMA_MS] + [f'>{LIMITES_HISTOGRAMA_MS[-1]}']
+        frame_lista = ttk.Frame(self)
+        frame_lista.pack(fill='both', expand=True, padx=5)
+        colunas = ['chamadas', 'total', 'medio', 'maior'] + [f'faixa{i}' for i in range(len(faixas))]
+        self.lista = ttk.Treeview(frame_lista, columns=colunas)
+        self.lista.heading('#0', text='Callback')
+        self.lista.column('#0', width=300)
+        for coluna, titulo in zip(colunas, ['Chamadas', 'Total (ms)', 'Médio (ms)', 'Maior (ms)'] + faixas):
+            self.lista.heading(coluna, text=titulo)
+            self.lista.column(coluna, width=70 if coluna.startswith('faixa') else 80, anchor='e')
+        scrollbar = ttk.Scrollbar(frame_lista, orient='vertical', command=self.lista.yview)
+        self.lista.configure(yscrollcommand=scrollbar.set)
+        scrollbar.pack(side='right', fill='y')
+        self.lista.pack(side='left', fill='both', expand=True)
+
+        # Perfil dos próximos callbacks
+        frame_perfil = ttk.Frame(self)
+        frame_perfil.pack(fill='x', padx=5, pady=5)
+        ttk.Label(frame_perfil, text='Perfilar os próximos').pack(side='left')
+        self.quantidade_perfil = ttk.Spinbox(frame_perfil, from_=1, to=10000, width=6)
+        self.quantidade_perfil.set(CALLBACKS_PERFIL)
+        self.quantidade_perfil.pack(side='left', padx=5)
+        ttk.Label(frame_perfil, text='callbacks').pack(side='left')
+        ttk.Button(frame_perfil, text='Iniciar Perfil', command=self.perfilar).pack(side='left', padx=5)
+        self.rotulo_perfil = ttk.Label(frame_perfil, text='', anchor='w')
+        self.rotulo_perfil.pack(side='left', fill='x', expand=True)
+
+        self.atualizar()
+
+    def atualizar(self):
+        monitor = self.monitor
+        self.rotulo_travamentos.config(
+            text=f'Travamentos do mainloop (atraso ≥ {LIMITE_TRAVAMENTO_MS} ms): {monitor.travamentos}, '
+                 f'{texto_ms(monitor.tempo_travado)} ms no total, maior {texto_ms(monitor.maior_travamento)} ms')
+        for posicao, (nome, chamadas, total, maior, histograma) in enumerate(monitor.resumo()):
+            valores = (chamadas, texto_ms(total), texto_ms(total / chamadas), texto_ms(maior),
+                       *(quantidade or '' for quantidade in histograma))
+            if self.lista.exists(nome):
+                self.lista.item(nome, values=valores)
+                self.lista.move(nome, '', posicao)
+            else:
+                self.lista.insert('', posicao, iid=nome, text=nome, values=valores)
+        if monitor.restantes_perfil:
+            self.rotulo_perfil.config(text=f'Perfilando: faltam {monitor.restantes_perfil} callbacks')
+        elif monitor.ultimo_perfil:
+            self.rotulo_perfil.config(text=f'Perfil gravado em {monitor.ultimo_perfil}')
+        self.agendamento = self.after(INTERVALO_DIAGNOSTICO_MS, self.atualizar)
+
+    def destroy(self):
+        if self.agendamento is not None:
+            self.after_cancel(self.agendamento)
+        super().destroy()
+
+    def perfilar(self):
+        try:
+            quantidade = int(self.quantidade_perfil.get())
+        except ValueError:
+            quantidade = CALLBACKS_PERFIL
+        self.monitor.perfilar(max(quantidade, 1))
+
+    def zerar(self):
+        self.monitor.zerar()
+        self.lista.delete(*self.lista.get_children())
@@ -8,6 +8,10 @@ def drop_all_tables():
     cur.execute('DROP TABLE IF EXISTS curso_materia CASCADE;')
     cur.execute('DROP TABLE IF EXISTS materias CASCADE;')
     cur.execute('DROP TABLE IF EXISTS cursos CASCADE;')
+    cur.execute('DROP TABLE IF EXISTS versoes_tabela;')
+    cur.execute('DROP TABLE IF EXISTS alteracoes_tabela;')
+    cur.execute('DROP FUNCTION IF EXISTS incrementar_versao_tabela;')
+    cur.execute('DROP TABLE IF EXISTS schema_version;')
     con.commit()
     con.close()
     print('Todas as tabelas foram removidas com sucesso!')
@@ -0,0 +1,9 @@
+# Exibição das estatísticas de notas por curso e por matéria; as consultas às visões
+# materializadas da migração 6 ficam no repositorio
+
+# Rótulos das faixas de nota final da coluna `faixas` das visões
+FAIXAS_NOTA = ['0-2', '2-4', '4-6', '6-8', '8-10']
+
+def taxa_aprovacao(aprovados, notas):
+    """Percentual de notas aprovadas, para exibição"""
+    return f'{100 * aprovados / notas:.1f}%' if notas else ''
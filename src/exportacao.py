@@ -0,0 +1,95 @@
+import argparse
+import csv
+import json
+import time
+from decimal import Decimal
+from itertools import groupby
+import repositorio
+from banco import inicializar_banco
+
+COLUNAS_NOTA = ['materia', 'trabalho', 'simulado1', 'simulado2', 'prova', 'nota_final', 'status']
+COLUNAS_BOLETIM = ['aluno_id', 'aluno', 'curso'] + COLUNAS_NOTA
+COLUNAS_PLANILHA = ['curso', 'materia', 'alunos', 'media_final', 'aprovados', 'reprovados', 'pendentes']
+
+def valor_json(valor):
+    return float(valor) if isinstance(valor, Decimal) else valor
+
+def formato_do_arquivo(caminho):
+    return 'json' if caminho.lower().endswith('.json') else 'csv'
+
+def notas_do_aluno(linhas):
+    """Notas do aluno entre as suas linhas; a de um aluno sem notas vem sem status e fica de fora"""
+    return [linha[3:] for linha in linhas if linha[-1] is not None]
+
+def exportar_boletins(con, caminho, curso_id=None, formato=None):
+    """Grava o boletim de cada aluno (de um curso ou da escola) e devolve quantos foram exportados.
+
+    Nota final e status são as colunas calculadas pelo banco, as mesmas da lista
+    de notas. As linhas vêm de um cursor no servidor e são gravadas conforme
+    chegam: em CSV, uma linha por nota; em JSON, um objeto por aluno com suas notas.
+    Alunos sem notas entram nos dois formatos sem nenhuma nota: no CSV, uma linha
+    com as colunas da nota vazias; no JSON, a lista de notas vazia.
+    """
+    formato = formato or formato_do_arquivo(caminho)
+    linhas = repositorio.linhas_boletins(con, curso_id)
+    alunos = 0
+    with open(caminho, 'w', encoding='utf-8', newline='') as arquivo:
+        if formato == 'csv':
+            escritor = csv.writer(arquivo, delimiter=';')
+            escritor.writerow(COLUNAS_BOLETIM)
+            for aluno, linhas_aluno in groupby(linhas, key=lambda linha: linha[:3]):
+                notas = notas_do_aluno(linhas_aluno)
+                escritor.writerows((*aluno, *nota) for nota in notas or [[None] * len(COLUNAS_NOTA)])
+                alunos += 1
+            return alunos
+        # JSON escrito em partes: um objeto do array por aluno
+        arquivo.write('[')
+        for (aluno_id, aluno, curso), linhas_aluno in groupby(linhas, key=lambda linha: linha[:3]):
+            boletim = {'aluno_id': aluno_id, 'aluno': aluno, 'curso': curso, 'notas': [
+                dict(zip(COLUNAS_NOTA, map(valor_json, nota))) for nota in notas_do_aluno(linhas_aluno)
+            ]}
+            arquivo.write(',\n' if alunos else '\n')
+            arquivo.write(json.dumps(boletim, ensure_ascii=False))
+            alunos += 1
+        arquivo.write('\n]\n')
+    return alunos
+
+def exportar_planilha_cursos(con, caminho, curso_id=None, formato=None):
+    """Grava, por curso e matéria, a média final e o total de alunos em cada status"""
+    formato = formato or formato_do_arquivo(caminho)
+    linhas = repositorio.linhas_planilha_cursos(con, curso_id)
+    return escrever_linhas(caminho, formato, COLUNAS_PLANILHA, linhas)
+
+def escrever_linhas(caminho, formato, colunas, linhas):
+    """Grava as linhas conforme são geradas, em CSV (;) ou em um array JSON de objetos"""
+    total = 0
+    with open(caminho, 'w', encoding='utf-8', newline='') as arquivo:
+        if formato == 'csv':
+            escritor = csv.writer(arquivo, delimiter=';')
+            escritor.writerow(colunas)
+            for linha in linhas:
+                escritor.writerow(linha)
+                total += 1
+            return total
+        arquivo.write('[')
+        for linha in linhas:
+            arquivo.write(',\n' if total else '\n')
+            arquivo.write(json.dumps(dict(zip(colunas, map(valor_json, linha))), ensure_ascii=False))
+            total += 1
+        arquivo.write('\n]\n')
+    return total
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Exporta boletins dos alunos ou a planilha de notas dos cursos.')
+    parser.add_argument('tipo', choices=['boletins', 'planilha'])
+    parser.add_argument('arquivo', help='arquivo de saída (.csv ou .json)')
+    parser.add_argument('--curso', type=int, help='id do curso (padrão: toda a escola)')
+    args = parser.parse_args()
+    con = inicializar_banco()
+    inicio = time.perf_counter()
+    exportar = exportar_boletins if args.tipo == 'boletins' else exportar_planilha_cursos
+    total = exportar(con, args.arquivo, args.curso)
+    con.commit()
+    con.close()
+    unidade = 'boletins exportados' if args.tipo == 'boletins' else 'linhas exportadas'
+    print(f'{total} {unidade} para {args.arquivo} em {time.perf_counter() - inicio:.1f}s')
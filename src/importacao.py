@@ -0,0 +1,116 @@
+import argparse
+import csv
+import time
+from collections import namedtuple
+import repositorio
+from banco import inicializar_banco, linha_copy
+from validacao import converter_nota
+
+# Colunas esperadas no cabeçalho do arquivo e o tipo de validação de cada nota
+COLUNAS_NOTAS = [('trabalho', 'trabalho'), ('simulado1', 'simulado'),
+                 ('simulado2', 'simulado'), ('prova', 'prova')]
+COLUNAS_ARQUIVO = ['aluno_id', 'materia_id'] + [coluna for coluna, _ in COLUNAS_NOTAS]
+
+ResultadoImportacao = namedtuple('ResultadoImportacao', ['inseridas', 'atualizadas', 'erros'])
+
+def ler_id(texto):
+    """Converte o id do arquivo; None se não for um inteiro positivo de 32 bits"""
+    if not (texto.isascii() and texto.isdigit()):
+        return None
+    valor = int(texto)
+    return valor if 0 < valor < 2 ** 31 else None
+
+def ler_arquivo(arquivo, erros):
+    """Gera as linhas válidas do CSV no formato do COPY e registra em `erros` as inválidas.
+
+    O separador (';', ',' ou tabulação) é detectado pelo cabeçalho, e as notas
+    aceitam vírgula decimal.
+    """
+    amostra = arquivo.readline()
+    try:
+        separador = csv.Sniffer().sniff(amostra, delimiters=';,\t').delimiter
+    except csv.Error:
+        separador = ';'
+    cabecalho = [coluna.strip().lower() for coluna in next(csv.reader([amostra], delimiter=separador), [])]
+    faltando = [coluna for coluna in COLUNAS_ARQUIVO if coluna not in cabecalho]
+    if faltando:
+        raise ValueError(f"Colunas ausentes no arquivo: {', '.join(faltando)}")
+    posicoes = [cabecalho.index(coluna) for coluna in COLUNAS_ARQUIVO]
+
+    leitor = csv.reader(arquivo, delimiter=separador)
+    for campos in leitor:
+        # O cabeçalho é a linha 1
+        linha = leitor.line_num + 1
+        if not any(campo.strip() for campo in campos):
+            continue
+        campos += [''] * (len(cabecalho) - len(campos))
+        aluno_id, materia_id, *notas = (campos[i].strip() for i in posicoes)
+        problemas = []
+        ids = []
+        for coluna, texto in (('aluno_id', aluno_id), ('materia_id', materia_id)):
+            ids.append(ler_id(texto))
+            if ids[-1] is None:
+                problemas.append(f"{coluna} inválido '{texto}'")
+        valores = []
+        for (coluna, tipo), valor in zip(COLUNAS_NOTAS, notas):
+            try:
+                valores.append(converter_nota(valor, tipo))
+            except ValueError as e:
+                problemas.append(f'{coluna}: {e}')
+        if not problemas and all(valor is None for valor in valores):
+            problemas.append('nenhuma nota informada')
+        if problemas:
+            erros.append((linha, '; '.join(problemas)))
+            continue
+        yield linha_copy(linha, *ids, *valores)
+
+def importar_notas(con, caminho):
+    """Importa as notas de um CSV em uma transação da conexão (sem commit).
+
+    As linhas válidas vão por COPY para uma tabela temporária; alunos, matérias e
+    currículos são conferidos de uma vez e as notas são gravadas com um único
+    INSERT ... ON CONFLICT, substituindo as existentes como na tela de notas.
+    Devolve as quantidades gravadas e a lista de erros (linha do arquivo, motivo).
+    """
+    erros = []
+    repositorio.criar_tabela_importacao(con)
+    with open(caminho, encoding='utf-8-sig', newline='') as arquivo:
+        repositorio.copiar_importacao(con, ['linha'] + COLUNAS_ARQUIVO, ler_arquivo(arquivo, erros))
+    erros += [(linha, f'aluno e matéria repetidos (vale a linha {ultima})')
+              for linha, ultima in repositorio.remover_repetidas_importacao(con)]
+    erros += repositorio.remover_invalidas_importacao(con)
+    inseridas, atualizadas = repositorio.gravar_importacao(con)
+    return ResultadoImportacao(inseridas, atualizadas, sorted(erros))
+
+def gravar_relatorio(erros, caminho):
+    """Grava o relatório de erros da importação (linha do arquivo e motivo)"""
+    with open(caminho, 'w', encoding='utf-8', newline='') as arquivo:
+        escritor = csv.writer(arquivo, delimiter=';')
+        escritor.writerow(['linha', 'erro'])
+        escritor.writerows(erros)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Importa notas de um CSV com as colunas ' + ', '.join(COLUNAS_ARQUIVO) + '.')
+    parser.add_argument('arquivo')
+    parser.add_argument('--relatorio', help='grava os erros encontrados neste CSV')
+    parser.add_argument('--validar', action='store_true', help='apenas valida, sem gravar as notas')
+    args = parser.parse_args()
+    con = inicializar_banco()
+    inicio = time.perf_counter()
+    resultado = importar_notas(con, args.arquivo)
+    if args.validar:
+        con.rollback()
+    else:
+        con.commit()
+    con.close()
+    acao = 'seriam gravadas' if args.validar else 'gravadas'
+    print(f'{resultado.inseridas} notas novas e {resultado.atualizadas} atualizadas {acao} '
+          f'em {time.perf_counter() - inicio:.1f}s; {len(resultado.erros)} linhas com erro.')
+    if args.relatorio:
+        gravar_relatorio(resultado.erros, args.relatorio)
+    else:
+        for linha, motivo in resultado.erros[:20]:
+            print(f'  linha {linha}: {motivo}')
+        if len(resultado.erros) > 20:
+            print('  ... (use --relatorio para a lista completa)')
@@ -0,0 +1,128 @@
+import json
+import logging
+import os
+import queue
+import sqlite3
+import sys
+import threading
+from migracoes import VERSAO_ATUAL
+
+# Cópia local (SQLite, na pasta de cache do usuário) das últimas listas carregadas, para
+# a janela abrir já preenchida. Cada lista guarda as versões das tabelas de que depende
+# (migração 7); ao abrir, a aplicação compara essas versões com as do banco e recarrega
+# só o que mudou.
+
+# Muda quando o formato das listas gravadas muda; cópias de outro formato são descartadas
+FORMATO = f'1/{VERSAO_ATUAL}'
+
+# Espera máxima (s), ao fechar, pelas gravações pendentes
+TEMPO_ENCERRAMENTO = 5
+
+log = logging.getLogger('miniescola.instantaneo')
+
+# Tabelas de que cada lista depende
+TABELAS_LISTA = {
+    'cursos': ('cursos',),
+    'materias': ('materias',),
+    'alunos': ('alunos',),
+    # Alunos com notas (id, nome, curso) da lista de notas sem filtros
+    'arvore_notas': ('alunos', 'cursos', 'notas'),
+}
+
+def pasta_cache():
+    if sys.platform == 'win32':
+        base = os.getenv('LOCALAPPDATA') or os.path.expanduser(os.path.join('~', 'AppData', 'Local'))
+    elif sys.platform == 'darwin':
+        base = os.path.expanduser(os.path.join('~', 'Library', 'Caches'))
+    else:
+        base = os.getenv('XDG_CACHE_HOME') or os.path.expanduser(os.path.join('~', '.cache'))
+    return os.path.join(base, 'miniescola')
+
+def caminho_padrao(dbname=None):
+    """Arquivo da cópia local do banco (uma por banco)"""
+    return os.path.join(pasta_cache(), f"{dbname or os.getenv('db_name', 'escola')}.sqlite3")
+
+def assinatura(nome, versoes):
+    """Versões das tabelas de que a lista depende"""
+    return {tabela: versoes.get(tabela) for tabela in TABELAS_LISTA.get(nome, ())}
+
+def desatualizadas(assinaturas, versoes):
+    """Listas cuja assinatura gravada difere das versões atuais do banco"""
+    return [nome for nome, gravada in assinaturas.items()
+            if nome not in TABELAS_LISTA or gravada != assinatura(nome, versoes)]
+
+class Instantaneo:
+    """Listas gravadas em SQLite: nome -> (assinatura, linhas).
+
+    A leitura é feita na thread de quem abriu a cópia. As gravações vão para uma
+    thread com conexão própria, para a serialização das listas não travar a interface.
+    """
+
+    def __init__(self, caminho):
+        self.caminho = caminho
+        os.makedirs(os.path.dirname(caminho), exist_ok=True)
+        self.con = sqlite3.connect(caminho)
+        # É só um cache: perder a última gravação numa queda não tem problema
+        self.con.execute('PRAGMA journal_mode=WAL')
+        self.con.execute('PRAGMA synchronous=OFF')
+        self.con.execute('CREATE TABLE IF NOT EXISTS meta (chave TEXT PRIMARY KEY, valor TEXT)')
+        self.con.execute('CREATE TABLE IF NOT EXISTS listas (nome TEXT PRIMARY KEY, assinatura TEXT, linhas TEXT)')
+        linha = self.con.execute("SELECT valor FROM meta WHERE chave = 'formato'").fetchone()
+        if linha is None or linha[0] != FORMATO:
+            self.con.execute('DELETE FROM listas')
+            self.con.execute("INSERT OR REPLACE INTO meta VALUES ('formato', ?)", (FORMATO,))
+        self.con.commit()
+        self.pendentes = queue.Queue()
+        self.thread = threading.Thread(target=self.trabalhar, name='instantaneo', daemon=True)
+        self.thread.start()
+
+    def ler_todas(self):
+        return {nome: (json.loads(gravada), [tuple(linha) for linha in json.loads(linhas)])
+                for nome, gravada, linhas in self.con.execute('SELECT nome, assinatura, linhas FROM listas')}
+
+    def gravar(self, nome, versoes, linhas):
+        """Agenda a gravação da lista; `linhas` não pode ser alterada depois"""
+        self.pendentes.put((nome, dict(versoes), linhas))
+
+    def trabalhar(self):
+        con = None
+        encerrar = False
+        while not encerrar:
+            tarefa = self.pendentes.get()
+            if tarefa is None:
+                break
+            # Só a gravação mais recente de cada lista importa
+            tarefas = {tarefa[0]: tarefa}
+            while True:
+                try:
+                    tarefa = self.pendentes.get_nowait()
+                except queue.Empty:
+                    break
+                if tarefa is None:
+                    encerrar = True
+                    break
+                tarefas[tarefa[0]] = tarefa
+            for nome, versoes, linhas in tarefas.values():
+                try:
+                    if con is None:
+                        con = sqlite3.connect(self.caminho)
+                    con.execute('INSERT OR REPLACE INTO listas VALUES (?, ?, ?)',
+                                (nome, json.dumps(assinatura(nome, versoes)), json.dumps(linhas)))
+                    con.commit()
+                except (sqlite3.Error, TypeError, ValueError) as erro:
+                    log.warning('Cópia local da lista %s não gravada: %s', nome, erro)
+        if con is not None:
+            con.close()
+
+    def fechar(self):
+        """Conclui as gravações pendentes e fecha a cópia"""
+        self.pendentes.put(None)
+        self.thread.join(TEMPO_ENCERRAMENTO)
+        self.con.close()
+
+def abrir(caminho):
+    """Instantaneo no caminho, ou None se o arquivo não puder ser usado: a aplicação segue sem a cópia"""
+    try:
+        return Instantaneo(caminho)
+    except (sqlite3.Error, OSError, ValueError):
+        return None
@@ -0,0 +1,247 @@
+import tkinter as tk
+from tkinter import ttk, messagebox
+from repositorio import consultar_turma, curriculo_curso, remover_notas_em_lote, salvar_notas_em_lote
+from validacao import converter_nota
+
+# Colunas editáveis da grade e o tipo de validação de cada uma
+TIPOS_COLUNA = {'trabalho': 'trabalho', 'sim1': 'simulado', 'sim2': 'simulado', 'prova': 'prova'}
+COLUNAS_EDITAVEIS = list(TIPOS_COLUNA)
+
+def texto_nota(valor):
+    return '' if valor is None else str(valor)
+
+class JanelaLancamento(tk.Toplevel):
+    """Grade para lançar as notas de uma matéria para todos os alunos de um curso.
+
+    As células são validadas ao serem editadas e as linhas alteradas são gravadas
+    juntas, em um único comando.
+    """
+
+    def __init__(self, app):
+        super().__init__(app)
+        self.app = app
+        self.title('Lançar Notas em Lote')
+        self.geometry('900x600')
+        self.cursos = []
+        self.materias = []
+        self.materia_id = None
+        self.alteradas = set()  # itens (ids de aluno) com edições não salvas
+        self.invalidas = set()  # (item, coluna) com valores fora da faixa
+        self.entrada_edicao = None
+        self.celula_edicao = None  # (item, coluna) da caixa de edição aberta
+
+        # Seleção de curso e matéria
+        frame_topo = ttk.Frame(self)
+        frame_topo.pack(fill='x', padx=5, pady=5)
+        ttk.Label(frame_topo, text='Curso:').pack(side='left')
+        self.combo_curso = ttk.Combobox(frame_topo, state='readonly', width=30)
+        self.combo_curso.pack(side='left', padx=(5,10))
+        self.combo_curso.bind('<<ComboboxSelected>>', self.carregar_materias)
+        ttk.Label(frame_topo, text='Matéria:').pack(side='left')
+        self.combo_materia = ttk.Combobox(frame_topo, state='readonly', width=30)
+        self.combo_materia.pack(side='left', padx=(5,10))
+        self.combo_materia.bind('<<ComboboxSelected>>', self.carregar_turma)
+        ttk.Button(frame_topo, text='Salvar Notas', command=self.salvar).pack(side='right')
+
+        self.status_label = ttk.Label(self, text='Dê um duplo clique (ou Enter) em uma nota para editá-la; '
+                                                 'Tab avança para a próxima coluna.', anchor='w')
+        self.status_label.pack(fill='x', padx=5)
+
+        # Grade de alunos
+        frame_lista = ttk.Frame(self)
+        frame_lista.pack(fill='both', expand=True, padx=5, pady=5)
+        self.lista = ttk.Treeview(frame_lista, columns=('aluno', 'trabalho', 'sim1', 'sim2', 'prova', 'final', 'status'),
+                                  show='headings')
+        for coluna, titulo, largura in [('aluno', 'Aluno', 250), ('trabalho', 'Trabalho (0-5)', 90),
+                                        ('sim1', 'Simulado 1 (0-1)', 90), ('sim2', 'Simulado 2 (0-1)', 90),
+                                        ('prova', 'Prova (0-5)', 90), ('final', 'Nota Final', 80),
+                                        ('status', 'Status', 80)]:
+            self.lista.heading(coluna, text=titulo)
+            self.lista.column(coluna, width=largura, anchor='w' if coluna == 'aluno' else 'center')
+        scrollbar = ttk.Scrollbar(frame_lista, orient='vertical', command=self.lista.yview)
+        self.lista.configure(yscrollcommand=scrollbar.set)
+        scrollbar.pack(side='right', fill='y')
+        self.lista.pack(side='left', fill='both', expand=True)
+        self.lista.tag_configure('alterada', background='#fff6d5')
+        self.lista.tag_configure('invalida', background='#f8d7da')
+        self.lista.bind('<Double-1>', self.editar_celula_clicada)
+        self.lista.bind('<Return>', lambda _: self.editar_celula(self.lista.focus(), COLUNAS_EDITAVEIS[0]))
+
+        self.app.obter_referencia('cursos', 'notas', self.preencher_cursos)
+
+    def preencher_cursos(self, cursos):
+        # As respostas do banco podem chegar depois de a janela ser fechada
+        if not self.winfo_exists():
+            return
+        self.cursos = cursos
+        self.combo_curso['values'] = [nome for _, nome in cursos]
+
+    def descartar_alteracoes(self):
+        """Confirma com o usuário antes de trocar a turma com edições pendentes"""
+        return not self.alteradas or messagebox.askyesno(
+            'Lançar Notas', 'Há notas alteradas que não foram salvas. Descartar?', parent=self)
+
+    def carregar_materias(self, event=None):
+        if not self.descartar_alteracoes():
+            return
+        curso_id = self.cursos[self.combo_curso.current()][0]
+        def preencher(materias):
+            if not self.winfo_exists():
+                return
+            self.materias = materias
+            self.combo_materia['values'] = [nome for _, nome in materias]
+            self.combo_materia.set('')
+            self.limpar_grade()
+        self.app.consultar('notas', curriculo_curso, curso_id, ao_concluir=preencher, chave='lancamento_materias')
+
+    def limpar_grade(self):
+        self.cancelar_edicao()
+        self.lista.delete(*self.lista.get_children())
+        self.alteradas.clear()
+        self.invalidas.clear()
+        self.materia_id = None
+
+    def carregar_turma(self, event=None):
+        if not self.descartar_alteracoes():
+            return
+        curso_id = self.cursos[self.combo_curso.current()][0]
+        materia_id = self.materias[self.combo_materia.current()][0]
+        def preencher(alunos):
+            if not self.winfo_exists():
+                return
+            self.limpar_grade()
+            self.materia_id = materia_id
+            for aluno_id, nome, trabalho, sim1, sim2, prova, nota_final, status in alunos:
+                self.lista.insert('', 'end', iid=str(aluno_id), values=(
+                    nome, *map(texto_nota, (trabalho, sim1, sim2, prova, nota_final)), status or ''))
+            self.status_label.config(text=f'{len(alunos)} alunos.', foreground='black')
+        self.app.executar('notas', lambda con: consultar_turma(con, curso_id, materia_id), preencher,
+                          chave='lancamento_turma')
+
+    def editar_celula_clicada(self, event):
+        item = self.lista.identify_row(event.y)
+        coluna = self.lista.column(self.lista.identify_column(event.x), 'id')
+        if item and coluna in TIPOS_COLUNA:
+            self.editar_celula(item, coluna)
+
+    def editar_celula(self, item, coluna):
+        """Abre uma caixa de texto sobre a célula"""
+        self.cancelar_edicao()
+        if not item:
+            return
+        self.lista.see(item)
+        caixa = self.lista.bbox(item, coluna)
+        if not caixa:
+            return
+        x, y, largura, altura = caixa
+        entrada = ttk.Entry(self.lista, justify='center')
+        entrada.place(x=x, y=y, width=largura, height=altura)
+        entrada.insert(0, self.lista.set(item, coluna))
+        entrada.select_range(0, tk.END)
+        entrada.focus_set()
+        self.entrada_edicao = entrada
+        self.celula_edicao = (item, coluna)
+        def confirmar_e_ir(proximo_item, proxima_coluna):
+            self.confirmar_edicao(item, coluna, entrada.get())
+            if proximo_item:
+                self.lista.focus(proximo_item)
+                self.lista.selection_set(proximo_item)
+                self.editar_celula(proximo_item, proxima_coluna)
+            else:
+                self.lista.focus_set()
+            return 'break'
+        indice = COLUNAS_EDITAVEIS.index(coluna)
+        # Enter desce para o próximo aluno; Tab avança para a próxima nota
+        entrada.bind('<Return>', lambda _: confirmar_e_ir(self.lista.next(item), coluna))
+        if indice + 1 < len(COLUNAS_EDITAVEIS):
+            entrada.bind('<Tab>', lambda _: confirmar_e_ir(item, COLUNAS_EDITAVEIS[indice + 1]))
+        else:
+            entrada.bind('<Tab>', lambda _: confirmar_e_ir(self.lista.next(item), COLUNAS_EDITAVEIS[0]))
+        entrada.bind('<Escape>', lambda _: self.cancelar_edicao())
+        entrada.bind('<FocusOut>', lambda _: self.confirmar_edicao(item, coluna, entrada.get()))
+
+    def cancelar_edicao(self):
+        if self.entrada_edicao is not None:
+            entrada, self.entrada_edicao = self.entrada_edicao, None
+            entrada.destroy()
+
+    def confirmar_edicao_aberta(self):
+        """Confirma a célula que ainda está sendo editada"""
+        if self.entrada_edicao is not None:
+            self.confirmar_edicao(*self.celula_edicao, self.entrada_edicao.get())
+
+    def confirmar_edicao(self, item, coluna, texto):
+        """Valida a célula editada e marca a linha como alterada (ou inválida)"""
+        if self.entrada_edicao is None or not self.lista.exists(item):
+            return
+        self.cancelar_edicao()
+        texto = texto.strip()
+        if texto == self.lista.set(item, coluna):
+            return
+        self.lista.set(item, coluna, texto)
+        try:
+            converter_nota(texto, TIPOS_COLUNA[coluna])
+            self.invalidas.discard((item, coluna))
+        except ValueError as e:
+            self.invalidas.add((item, coluna))
+            self.status_label.config(text=f"{self.lista.set(item, 'aluno')}: {e}", foreground='red')
+        self.alteradas.add(item)
+        invalida = any((item, c) in self.invalidas for c in COLUNAS_EDITAVEIS)
+        self.lista.item(item, tags=('invalida' if invalida else 'alterada',))
+
+    def salvar(self):
+        # O clique no botão não tira o foco da caixa de edição: a nota digitada nela
+        # é confirmada aqui, antes de reunir as linhas alteradas
+        self.confirmar_edicao_aberta()
+        self.cancelar_edicao()
+        if self.invalidas:
+            messagebox.showwarning('Lançar Notas', 'Corrija as notas marcadas em vermelho antes de salvar.', parent=self)
+            return
+        materia_id = self.materia_id
+        # Valores enviados de cada linha: ao concluir, só deixam de estar alteradas as
+        # linhas que não foram editadas de novo enquanto a gravação estava em andamento
+        enviadas = {item: tuple(self.lista.set(item, coluna) for coluna in TIPOS_COLUNA) for item in self.alteradas}
+        if not enviadas:
+            self.status_label.config(text='Nenhuma nota alterada para salvar.', foreground='black')
+            return
+        linhas = []
+        limpas = []
+        for item, valores in enviadas.items():
+            notas = [converter_nota(valor, tipo) for valor, tipo in zip(valores, TIPOS_COLUNA.values())]
+            # Linhas com todas as notas apagadas removem a nota do aluno na matéria
+            if any(nota is not None for nota in notas):
+                linhas.append((int(item), materia_id, *notas))
+            else:
+                limpas.append(int(item))
+        def gravar(con):
+            return (salvar_notas_em_lote(con, linhas) if linhas else [],
+                    remover_notas_em_lote(con, materia_id, limpas) if limpas else [])
+        def concluido(resultado):
+            gravadas, removidas = resultado
+            # As notas foram gravadas mesmo com a janela já fechada: as listas da
+            # aplicação são atualizadas em qualquer caso
+            self.app.filtrar_notas()
+            self.app.carregar_notas_edicao()
+            self.app.agendar_estatisticas()
+            # A grade pode ter sido fechada ou trocada de turma durante a gravação
+            if not self.winfo_exists() or self.materia_id != materia_id:
+                return
+            concluidas = [(str(aluno_id), texto_nota(nota_final), status) for aluno_id, nota_final, status in gravadas]
+            # As linhas limpas ficam sem nota, tenha ou não havido nota a apagar
+            concluidas += [(str(aluno_id), '', '') for aluno_id in limpas]
+            for item, final, status in concluidas:
+                if not self.lista.exists(item):
+                    continue
+                self.lista.set(item, 'final', final)
+                self.lista.set(item, 'status', status)
+                if tuple(self.lista.set(item, coluna) for coluna in TIPOS_COLUNA) == enviadas[item]:
+                    self.lista.item(item, tags=())
+                    self.alteradas.discard(item)
+            mensagem = f'{len(gravadas)} notas salvas.'
+            if removidas:
+                mensagem += f' {len(removidas)} removidas.'
+            if len(gravadas) < len(linhas):
+                mensagem += f' {len(linhas) - len(gravadas)} não foram gravadas (matéria fora do curso do aluno).'
+            self.status_label.config(text=mensagem, foreground='green' if len(gravadas) == len(linhas) else 'red')
+        # Todas as linhas alteradas vão em um único comando (e as limpas em outro), na mesma transação
+        self.app.executar('notas', gravar, concluido)
@@ -1,75 +1,144 @@
+import logging
+import time
 import tkinter as tk
-from tkinter import ttk, messagebox
-import psycopg2
-import os
-from dotenv import load_dotenv
-
-# Carregar variáveis de ambiente do arquivo .env
-load_dotenv()
-
-# Conexão e inicialização do banco
-
-def inicializar_banco():
-    db_password = os.getenv('db_password')
-    if not db_password:
-        raise ValueError('db_password não encontrado no arquivo .env')
-    
-    con = psycopg2.connect(
-        dbname='escola', user='postgres', password=db_password, host='localhost',
-        client_encoding='UTF8')
-    cur = con.cursor()
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS cursos (
-            id SERIAL PRIMARY KEY,
-            nome VARCHAR(50)
-        )
-    """)
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS materias (
-            id SERIAL PRIMARY KEY,
-            nome VARCHAR(50)
-        )
-    """)
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS curso_materia (
-            curso_id INTEGER REFERENCES cursos(id),
-            materia_id INTEGER REFERENCES materias(id),
-            PRIMARY KEY(curso_id, materia_id)
-        )
-    """)
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS alunos (
-            id SERIAL PRIMARY KEY,
-            nome VARCHAR(100),
-            curso_id INTEGER REFERENCES cursos(id)
-        )
-    """)
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS notas (
-            id SERIAL PRIMARY KEY,
-            aluno_id INTEGER REFERENCES alunos(id),
-            materia_id INTEGER REFERENCES materias(id),
-            trabalho DECIMAL(4,2) CHECK (trabalho >= 0 AND trabalho <= 5),
-            simulado1 DECIMAL(4,2) CHECK (simulado1 >= 0 AND simulado1 <= 1),
-            simulado2 DECIMAL(4,2) CHECK (simulado2 >= 0 AND simulado2 <= 1),
-            prova DECIMAL(4,2) CHECK (prova >= 0 AND prova <= 5)
-        )
-    """)
-    con.commit()
-    return con
+from tkinter import ttk, messagebox, filedialog
+import repositorio
+from banco import ExecutorBanco, inicializar_banco
+from diagnostico import JanelaDiagnostico, JanelaMonitor, MonitorInterface, acao_da_interface
+from estatisticas import FAIXAS_NOTA, taxa_aprovacao
+from exportacao import exportar_boletins, exportar_planilha_cursos
+from importacao import importar_notas, gravar_relatorio
+from instantaneo import abrir, caminho_padrao, desatualizadas
+from lancamento import JanelaLancamento
+from validacao import converter_nota, nota_valida
+
+log = logging.getLogger('miniescola.interface')
+
+# Tempo de espera (ms) após a última tecla antes de buscar alunos
+ATRASO_BUSCA_MS = 300
+
+# Linhas por página nas listas paginadas e fração rolada que dispara a página seguinte
+TAMANHO_PAGINA = 200
+LIMIAR_PROXIMA_PAGINA = 0.9
+
+# Alunos da árvore de notas guardados em memória para a busca incremental e a cópia
+# local; resultados maiores ficam só na árvore e cada nova busca vai ao banco
+LINHAS_GUARDADAS_BUSCA = 20000
+
+# Espera (ms) após a última gravação de notas antes de recalcular as estatísticas, e
+# intervalo da atualização periódica, que inclui as gravações feitas por outras instâncias
+ATRASO_ESTATISTICAS_MS = 2000
+INTERVALO_ESTATISTICAS_MS = 10 * 60 * 1000
+
+def sigla_curso(nome):
+    """Abrevia o nome do curso para exibição na lista de notas"""
+    stopwords = {'de', 'da', 'do', 'das', 'dos', 'e'}
+    palavras = [p for p in (nome or '').split() if p not in stopwords]
+    if not palavras:
+        return ''
+    if len(palavras) == 1:
+        return palavras[0][:3]
+    return f"{palavras[0][:3]}. {palavras[1]}"
+
+def valores_nota(materia_nome, trabalho, sim1, sim2, prova, nota_final, status):
+    """Monta as colunas de uma linha de nota na lista de notas.
+
+    nota_final e status são colunas calculadas pelo banco (migração 5).
+    """
+    t, s1, s2, p = trabalho or 0, sim1 or 0, sim2 or 0, prova or 0
+    valor_final = f'{nota_final:.1f}' if nota_final > 0 else ''
+    return (status, materia_nome, p if p else '', t if t else '', s1 if s1 else '', s2 if s2 else '', valor_final)
+
+def valores_estatistica(nome, valores):
+    """Monta as colunas de uma linha de estatísticas: [alunos,] notas, médias e totais por status"""
+    notas, aprovados = valores[-9], valores[-3]
+    return (nome, *('' if valor is None else valor for valor in valores), taxa_aprovacao(aprovados, notas))
 
 class MiniEscolaApp(tk.Tk):
-    def __init__(self):
+    def __init__(self, assincrono=True, instantaneo=None):
+        self.inicio = time.perf_counter()
         super().__init__()
+        # Antes do monitor: se a conexão ou as migrações falharem, o CallWrapper do tkinter
+        # não fica substituído por um monitor que ninguém encerra
+        self.con = inicializar_banco()
+        # Mede os callbacks do Tk; precisa existir antes dos widgets que os registram
+        self.monitor = MonitorInterface(self)
         self.title('MiniEscola')
         self.geometry('1280x720')
-        self.con = inicializar_banco()
+        # Consultas rodam em segundo plano; no modo síncrono usam self.con diretamente
+        self.executor = ExecutorBanco(self, None if assincrono else self.con)
+        # Recálculo das estatísticas em conexão própria, sem atrasar as consultas dos painéis
+        self.executor_estatisticas = ExecutorBanco(self, None if assincrono else self.con)
+        self.agendamento_estatisticas = None
+        self.janela_diagnostico = None
+        self.janela_monitor = None
+        # Cópia local das últimas listas (caminho do arquivo SQLite): a janela abre com elas
+        # e confere em seguida, pelas versões das tabelas, quais precisam ser recarregadas
+        self.instantaneo = instantaneo and abrir(instantaneo)
+        gravadas = self.instantaneo.ler_todas() if self.instantaneo else {}
+        self.assinaturas_instantaneo = {nome: assinatura for nome, (assinatura, _) in gravadas.items()}
+        self.arvore_instantaneo = gravadas['arvore_notas'][1] if 'arvore_notas' in gravadas else None
+        # Estado de carregamento de cada painel
+        self.rotulos_carregando = {}
+        self.tarefas_painel = {}
+        # Estado das listas paginadas: str(treeview) -> dados da paginação
+        self.paginas = {}
+        # Cache das tabelas de referência: entidade -> (versão, linhas)
+        self.referencias = {entidade: (0, linhas) for entidade, (_, linhas) in gravadas.items()
+                            if entidade in repositorio.CONSULTAS_REFERENCIA}
+        self.versoes_referencia = {}
+        self.aguardando_referencia = {}  # entidade -> [(painel, callback)] à espera da carga em andamento
         # Largura padrão para o painel esquerdo
         self.largura_painel_esq = 300
+        self.criar_menu()
         self.iniciar_interface()
+        # Listas e combos que exibem cada tabela de referência
+        self.consumidores_referencia = {
+            'cursos': [self.carregar_cursos, self.carregar_cursos_combo_edicao,
+                       self.carregar_cursos_combo, self.carregar_filtro_cursos],
+            'materias': [self.carregar_materias, self.carregar_materias_combo_edicao,
+                         self.carregar_materias_curso],
+            'alunos': [self.carregar_alunos_combo_edicao, self.carregar_aluno_combo],
+        }
         # Label de status para mensagens
         self.status_label = ttk.Label(self, text='', foreground='green', background='#f5f5f5', font=('Arial', 12, 'bold'), anchor='w')
         self.status_label.pack(side='bottom', fill='x')
+        self.after(INTERVALO_ESTATISTICAS_MS, self.atualizacao_periodica_estatisticas)
+        if self.assinaturas_instantaneo:
+            self.conferir_instantaneo()
+        self.after_idle(self.janela_pronta)
+
+    def destroy(self):
+        self.executor.encerrar()
+        self.executor_estatisticas.encerrar()
+        self.monitor.encerrar()
+        if self.instantaneo:
+            self.instantaneo.fechar()
+        super().destroy()
+
+    def criar_menu(self):
+        menu = tk.Menu(self)
+        ferramentas = tk.Menu(menu, tearoff=False)
+        ferramentas.add_command(label='Diagnóstico de Consultas...', accelerator='F12',
+                                command=self.abrir_diagnostico)
+        ferramentas.add_command(label='Monitor da Interface...', command=self.abrir_monitor)
+        menu.add_cascade(label='Ferramentas', menu=ferramentas)
+        self.config(menu=menu)
+        self.bind_all('<F12>', lambda _: self.abrir_diagnostico())
+
+    def abrir_diagnostico(self):
+        """Abre (ou traz para frente) a janela com o resumo das consultas por ação"""
+        if self.janela_diagnostico is not None and self.janela_diagnostico.winfo_exists():
+            self.janela_diagnostico.lift()
+            return
+        self.janela_diagnostico = JanelaDiagnostico(self)
+
+    def abrir_monitor(self):
+        """Abre (ou traz para frente) a janela com a duração dos callbacks e o perfil sob pedido"""
+        if self.janela_monitor is not None and self.janela_monitor.winfo_exists():
+            self.janela_monitor.lift()
+            return
+        self.janela_monitor = JanelaMonitor(self)
 
     def iniciar_interface(self):
         # Frame principal que conterá o notebook
@@ -80,10 +149,61 @@ class MiniEscolaApp(tk.Tk):
         nb = ttk.Notebook(frame_principal)
         nb.pack(expand=True, fill='both')
         
-        nb.add(self.painel_cursos(), text='Cursos')
-        nb.add(self.painel_materias(), text='Matérias')
-        nb.add(self.painel_alunos(), text='Alunos')
-        nb.add(self.painel_notas(), text='Notas')
+        self.notebook = nb
+
+        # Os widgets de todas as abas são criados agora, mas cada aba só carrega seus
+        # dados quando é mostrada pela primeira vez
+        self.paineis_aba = {}  # aba do notebook -> painel
+        self.cargas_aba = {}  # painel -> carga inicial, até a aba ser mostrada
+        for painel, titulo, criar, carregar in [
+                ('cursos', 'Cursos', self.painel_cursos, self.carregar_aba_cursos),
+                ('materias', 'Matérias', self.painel_materias, self.carregar_aba_materias),
+                ('alunos', 'Alunos', self.painel_alunos, self.carregar_aba_alunos),
+                ('notas', 'Notas', self.painel_notas, self.carregar_aba_notas),
+                ('estatisticas', 'Estatísticas', self.painel_estatisticas, self.carregar_estatisticas)]:
+            aba = criar()
+            nb.add(aba, text=titulo)
+            self.paineis_aba[str(aba)] = painel
+            self.cargas_aba[painel] = carregar
+        nb.bind('<<NotebookTabChanged>>', self.carregar_aba_selecionada)
+        self.carregar_aba_selecionada()
+
+    def carregar_aba_selecionada(self, event=None):
+        carregar = self.cargas_aba.pop(self.paineis_aba.get(self.notebook.select()), None)
+        if carregar is not None:
+            carregar()
+
+    def aba_carregada(self, painel):
+        return painel not in self.cargas_aba
+
+    def recarregar_aba(self, painel, carregar):
+        """Recarrega uma lista de outra aba após uma gravação; a aba ainda não mostrada
+        fica como está, já que carregará os dados atuais ao ser aberta"""
+        if self.aba_carregada(painel):
+            carregar()
+
+    def janela_pronta(self):
+        """Informa o tempo desde a criação da aplicação até a janela ficar utilizável"""
+        self.update_idletasks()
+        self.tempo_abertura = time.perf_counter() - self.inicio
+        log.debug('Janela pronta em %.0f ms', self.tempo_abertura * 1000)
+        self.mostrar_status(f'Pronto em {self.tempo_abertura:.2f}s')
+
+    def conferir_instantaneo(self):
+        """Recarrega as listas da cópia local cujas tabelas mudaram desde que foram gravadas"""
+        def conferir(versoes):
+            for nome in desatualizadas(self.assinaturas_instantaneo, versoes):
+                if nome == 'arvore_notas':
+                    self.arvore_instantaneo = None
+                    self.recarregar_aba('notas', self.filtrar_notas)
+                elif nome in self.consumidores_referencia:
+                    self.recarregar_referencia(nome)
+            self.assinaturas_instantaneo = {}
+        def ler_versoes(con):
+            # Aproveita a abertura para compactar o registro de alterações
+            repositorio.compactar_alteracoes(con)
+            return repositorio.versoes_tabelas(con)
+        self.executar('cursos', ler_versoes, conferir)
 
     def painel_cursos(self):
         frame = ttk.Frame(self)
@@ -94,6 +214,7 @@ class MiniEscolaApp(tk.Tk):
         
         # Botão de atualizar para cursos
         ttk.Button(esq, text='Atualizar', command=self.atualizar_cursos).pack(fill='x', pady=2)
+        self.criar_rotulo_carregando(esq, 'cursos')
         ttk.Separator(esq, orient='horizontal').pack(fill='x', pady=5)
         
         # Dropdown de cursos existentes
@@ -128,25 +249,31 @@ class MiniEscolaApp(tk.Tk):
         self.frame_dir.pack(side='left', fill='both', expand=True, padx=5, pady=5)
         self.vars_check = {}  # materia_id -> IntVar
         self.botoes_check = {}
-        self.carregar_cursos_combo_edicao()
+        self.catalogo_materias = None  # [(id, nome)] exibido nos checkboxes
+        self.materias_visiveis = set()
+        self.curso_checklist = None  # curso cujas matérias estão nos checkboxes
+        self.curriculo_salvo = set()  # matérias do curso gravadas no banco
+        self.alteracoes_curriculo = {}  # materia_id -> marcada, ainda não aplicada
+        self.montar_checklist_materias()
         return frame
 
-    def atualizar_cursos(self):
+    def carregar_aba_cursos(self):
         self.carregar_cursos()
-        self.carregar_materias_curso()
+        self.carregar_cursos_combo_edicao()
+
+    def atualizar_cursos(self):
+        self.recarregar_referencia('cursos')
+        self.recarregar_referencia('materias')
 
     def carregar_cursos(self):
-        self.carregar_lista(
-            self.lista_cursos,
-            'SELECT id, nome FROM cursos ORDER BY nome'
-        )
+        self.obter_referencia('cursos', 'cursos', lambda cursos: self.preencher_lista(self.lista_cursos, cursos))
 
     def carregar_cursos_combo_edicao(self):
-        cur = self.con.cursor()
-        cur.execute('SELECT id, nome FROM cursos ORDER BY nome')
-        self.combo_curso_edicao['values'] = [f"{id_}: {nome}" for id_, nome in cur.fetchall()]
-        self.combo_curso_edicao.set('')
-        self.entrada_curso.delete(0, tk.END)
+        def preencher(cursos):
+            self.combo_curso_edicao['values'] = [f"{id_}: {nome}" for id_, nome in cursos]
+            self.combo_curso_edicao.set('')
+            self.entrada_curso.delete(0, tk.END)
+        self.obter_referencia('cursos', 'cursos', preencher)
 
     def preencher_curso_edicao(self, event=None):
         sel = self.combo_curso_edicao.get()
@@ -154,13 +281,11 @@ class MiniEscolaApp(tk.Tk):
             self.entrada_curso.delete(0, tk.END)
             return
         curso_id = sel.split(':')[0]
-        cur = self.con.cursor()
-        cur.execute('SELECT nome FROM cursos WHERE id=%s', (curso_id,))
-        res = cur.fetchone()
-        if res:
-            nome = res[0]
-            self.entrada_curso.delete(0, tk.END)
-            self.entrada_curso.insert(0, nome)
+        def preencher(nome):
+            if nome is not None:
+                self.entrada_curso.delete(0, tk.END)
+                self.entrada_curso.insert(0, nome)
+        self.consultar('cursos', repositorio.nome_curso, curso_id, ao_concluir=preencher, chave='edicao_curso')
 
     def salvar_alteracoes_curso(self):
         sel = self.combo_curso_edicao.get()
@@ -172,21 +297,21 @@ class MiniEscolaApp(tk.Tk):
         if not nome:
             self.mostrar_status('Nome inválido.', 'red')
             return
-        if self.operacao_banco('UPDATE cursos SET nome=%s WHERE id=%s', (nome, curso_id)):
-            self.carregar_cursos()
-            self.carregar_cursos_combo_edicao()
+        def concluido():
+            self.recarregar_referencia('cursos')
             self.mostrar_status('Curso atualizado com sucesso!')
+        self.operacao_banco('cursos', repositorio.atualizar_curso, curso_id, nome, ao_concluir=concluido)
 
     def adicionar_curso(self):
         nome = self.validar_entrada(self.entrada_curso.get())
         if not nome:
             self.mostrar_status('Nome inválido.', 'red')
             return
-        if self.operacao_banco('INSERT INTO cursos(nome) VALUES(%s)', (nome,)):
+        def concluido():
             self.entrada_curso.delete(0, tk.END)
-            self.carregar_cursos()
-            self.carregar_cursos_combo_edicao()
+            self.recarregar_referencia('cursos')
             self.mostrar_status('Curso adicionado com sucesso!')
+        self.operacao_banco('cursos', repositorio.inserir_curso, nome, ao_concluir=concluido)
 
     def remover_curso(self):
         sel = self.combo_curso_edicao.get()
@@ -194,52 +319,49 @@ class MiniEscolaApp(tk.Tk):
             self.mostrar_status('Selecione um curso para remover.', 'red')
             return
         curso_id = sel.split(':')[0]
-        # Executa as remoções em cascata na ordem correta
-        if self.operacao_banco('DELETE FROM notas WHERE aluno_id IN (SELECT id FROM alunos WHERE curso_id=%s)', (curso_id,)) and \
-           self.operacao_banco('UPDATE alunos SET curso_id = NULL WHERE curso_id = %s', (curso_id,)) and \
-           self.operacao_banco('DELETE FROM curso_materia WHERE curso_id=%s', (curso_id,)) and \
-           self.operacao_banco('DELETE FROM cursos WHERE id=%s', (curso_id,)):
-            self.carregar_cursos()
-            self.carregar_cursos_combo_edicao()
-            # Limpa os checkboxes de matérias
-            for cb in self.botoes_check.values():
-                cb.destroy()
-            self.vars_check.clear()
-            self.botoes_check.clear()
+        def concluido():
+            self.recarregar_referencia('cursos')
+            # Esconde os checkboxes de matérias do curso removido
+            self.frame_materias.pack_forget()
+            self.curso_checklist = None
+            self.alteracoes_curriculo.clear()
+            self.atualizar_pendencias_curriculo()
+            self.agendar_estatisticas()
             self.mostrar_status('Curso removido!','red')
+        self.operacao_banco('cursos', repositorio.remover_curso, curso_id, ao_concluir=concluido)
 
-    def carregar_materias_curso(self):
-        sel = self.lista_cursos.selection()
-        if not sel: return
-        id_curso = self.lista_cursos.item(sel[0])['values'][0]
-        
-        cur = self.con.cursor()
-        cur.execute('SELECT id, nome FROM materias ORDER BY nome')
-        cur.execute('SELECT materia_id FROM curso_materia WHERE curso_id=%s', (id_curso,))
-        ligadas = {row[0] for row in cur.fetchall()}
-        
-        # Limpar frame_dir completamente
-        for widget in self.frame_dir.winfo_children():
-            widget.destroy()
-        
-        # Limpar variáveis de controle
-        self.vars_check.clear()
-        self.botoes_check.clear()
-        
-        # Frame para a lista de matérias com scrollbar
-        frame_materias = ttk.Frame(self.frame_dir)
-        frame_materias.pack(fill='both', expand=True, padx=5, pady=5)
+    def montar_checklist_materias(self):
+        """Cria uma única vez o campo de busca e a área rolável dos checkboxes"""
+        # Frame para a lista de matérias com scrollbar (exibido ao selecionar um curso)
+        self.frame_materias = ttk.Frame(self.frame_dir)
         
         # Campo de busca
-        frame_busca = ttk.Frame(frame_materias)
+        frame_busca = ttk.Frame(self.frame_materias)
         frame_busca.pack(fill='x', pady=(0,5))
         ttk.Label(frame_busca, text='Buscar matéria:').pack(side='left')
         self.busca_materia = ttk.Entry(frame_busca)
         self.busca_materia.pack(side='left', fill='x', expand=True, padx=(5,0))
-        self.busca_materia.bind('<KeyRelease>', lambda e: self.filtrar_materias_curso(id_curso, ligadas))
+        self.busca_materia.bind('<KeyRelease>', self.filtrar_materias_curso)
+        
+        # Marcação em massa das matérias exibidas pela busca
+        frame_massa = ttk.Frame(self.frame_materias)
+        frame_massa.pack(fill='x', pady=(0,5))
+        ttk.Button(frame_massa, text='Marcar Filtradas', command=lambda: self.marcar_filtradas(True)).pack(side='left')
+        ttk.Button(frame_massa, text='Desmarcar Filtradas', command=lambda: self.marcar_filtradas(False)).pack(side='left', padx=5)
+        
+        # Alterações pendentes: aplicadas juntas em uma única transação
+        frame_aplicar = ttk.Frame(self.frame_materias)
+        frame_aplicar.pack(side='bottom', fill='x', pady=(5,0))
+        self.rotulo_pendencias = ttk.Label(frame_aplicar)
+        self.rotulo_pendencias.pack(side='left')
+        self.botao_descartar_curriculo = ttk.Button(frame_aplicar, text='Descartar', command=self.descartar_curriculo)
+        self.botao_descartar_curriculo.pack(side='right')
+        self.botao_aplicar_curriculo = ttk.Button(frame_aplicar, text='Aplicar Alterações', command=self.aplicar_curriculo)
+        self.botao_aplicar_curriculo.pack(side='right', padx=5)
+        self.atualizar_pendencias_curriculo()
         
         # Frame para scrollbar e lista
-        frame_lista = ttk.Frame(frame_materias)
+        frame_lista = ttk.Frame(self.frame_materias)
         frame_lista.pack(fill='both', expand=True)
         
         # Canvas e scrollbar
@@ -265,44 +387,125 @@ class MiniEscolaApp(tk.Tk):
         def configure_canvas(event):
             canvas.itemconfig(canvas_frame, width=event.width)
         canvas.bind('<Configure>', configure_canvas)
-        
-        # Inserir checkboxes iniciais
-        self.filtrar_materias_curso(id_curso, ligadas)
 
-    def filtrar_materias_curso(self, id_curso, ligadas):
-        # Limpar checkboxes existentes
-        for widget in self.frame_checkboxes.winfo_children():
-            widget.destroy()
-        self.vars_check.clear()
-        self.botoes_check.clear()
-        
-        # Obter texto de busca
-        texto_busca = self.busca_materia.get().lower()
-        
-        # Buscar matérias
-        cur = self.con.cursor()
-        cur.execute('SELECT id, nome FROM materias ORDER BY nome')
-        materias = cur.fetchall()
-        
-        # Criar checkboxes filtrados
-        for m_id, m_nome in materias:
-            if texto_busca in m_nome.lower():
-                var = tk.IntVar(value=1 if m_id in ligadas else 0)
-                cb = ttk.Checkbutton(self.frame_checkboxes, text=m_nome, variable=var,
-                                   command=lambda m_id=m_id, var=var: self.toggle_materia(id_curso, m_id, var.get()))
-                cb.pack(anchor='w')
+    def sincronizar_catalogo_materias(self, catalogo):
+        """Exibe o catálogo de matérias nos checkboxes, reaproveitando os existentes"""
+        if catalogo is self.catalogo_materias:
+            return
+        self.catalogo_materias = catalogo
+        ids = {m_id for m_id, _ in self.catalogo_materias}
+        # Remove apenas os checkboxes de matérias que deixaram de existir
+        for m_id in [m_id for m_id in self.botoes_check if m_id not in ids]:
+            self.botoes_check.pop(m_id).destroy()
+            del self.vars_check[m_id]
+        for linha, (m_id, m_nome) in enumerate(self.catalogo_materias):
+            cb = self.botoes_check.get(m_id)
+            if cb is None:
+                var = tk.IntVar(value=0)
+                cb = ttk.Checkbutton(self.frame_checkboxes, variable=var,
+                                   command=lambda m_id=m_id, var=var: self.marcar_materia(m_id, var.get()))
                 self.vars_check[m_id] = var
                 self.botoes_check[m_id] = cb
+            cb.configure(text=m_nome)
+            cb.grid(row=linha, column=0, sticky='w')
+        self.materias_visiveis = ids
+
+    def carregar_materias_curso(self):
+        sel = self.lista_cursos.selection()
+        if not sel: return
+        id_curso = self.lista_cursos.item(sel[0])['values'][0]
+        if self.alteracoes_curriculo and id_curso != self.curso_checklist:
+            if messagebox.askyesno('Matérias do Curso', 'Aplicar as alterações pendentes do curso anterior?'):
+                self.aplicar_curriculo()
+            self.alteracoes_curriculo.clear()
+        
+        def preencher(catalogo, ligadas):
+            self.sincronizar_catalogo_materias(catalogo)
+            # Reaproveita os checkboxes, apenas atualizando as marcações; alterações
+            # pendentes do mesmo curso são mantidas se a matéria ainda existir
+            self.curso_checklist = id_curso
+            self.curriculo_salvo = ligadas
+            self.alteracoes_curriculo = {m_id: ativo for m_id, ativo in self.alteracoes_curriculo.items()
+                                         if m_id in self.vars_check and ativo != (m_id in ligadas)}
+            for m_id, var in self.vars_check.items():
+                var.set(1 if self.alteracoes_curriculo.get(m_id, m_id in ligadas) else 0)
+            self.atualizar_pendencias_curriculo()
+            self.frame_materias.pack(fill='both', expand=True, padx=5, pady=5)
+            self.filtrar_materias_curso()
+        def buscar_ligadas(catalogo):
+            self.consultar('cursos', repositorio.materias_ligadas, id_curso,
+                           ao_concluir=lambda ligadas: preencher(catalogo, ligadas), chave='materias_curso')
+        # O catálogo vem do cache de referência; só as matérias ligadas ao curso são consultadas
+        self.obter_referencia('materias', 'cursos', buscar_ligadas)
 
-    def toggle_materia(self, curso_id, materia_id, ativo):
-        cur = self.con.cursor()
-        if ativo:
-            cur.execute('INSERT INTO curso_materia(curso_id,materia_id) VALUES(%s,%s) ON CONFLICT DO NOTHING',
-                       (curso_id, materia_id))
+    def filtrar_materias_curso(self, event=None):
+        """Mostra ou esconde os checkboxes conforme o texto de busca"""
+        if self.catalogo_materias is None:
+            return
+        texto_busca = self.busca_materia.get().lower()
+        for m_id, m_nome in self.catalogo_materias:
+            visivel = texto_busca in m_nome.lower()
+            if visivel == (m_id in self.materias_visiveis):
+                continue
+            if visivel:
+                self.botoes_check[m_id].grid()
+                self.materias_visiveis.add(m_id)
+            else:
+                self.botoes_check[m_id].grid_remove()
+                self.materias_visiveis.discard(m_id)
+
+    def marcar_materia(self, materia_id, ativo, atualizar=True):
+        """Registra a marcação como alteração pendente (ou a desfaz, se voltou ao que está gravado)"""
+        if bool(ativo) == (materia_id in self.curriculo_salvo):
+            self.alteracoes_curriculo.pop(materia_id, None)
         else:
-            cur.execute('DELETE FROM curso_materia WHERE curso_id=%s AND materia_id=%s',
-                        (curso_id, materia_id))
-        self.con.commit()
+            self.alteracoes_curriculo[materia_id] = bool(ativo)
+        if atualizar:
+            self.atualizar_pendencias_curriculo()
+
+    def marcar_filtradas(self, ativo):
+        """Marca ou desmarca todas as matérias exibidas pela busca"""
+        if self.curso_checklist is None:
+            return
+        for m_id in self.materias_visiveis:
+            self.vars_check[m_id].set(1 if ativo else 0)
+            self.marcar_materia(m_id, ativo, atualizar=False)
+        self.atualizar_pendencias_curriculo()
+
+    def atualizar_pendencias_curriculo(self):
+        total = len(self.alteracoes_curriculo)
+        self.rotulo_pendencias.config(text=f'{total} alterações pendentes' if total else 'Nenhuma alteração pendente')
+        estado = ['!disabled'] if total else ['disabled']
+        self.botao_aplicar_curriculo.state(estado)
+        self.botao_descartar_curriculo.state(estado)
+
+    def descartar_curriculo(self):
+        self.alteracoes_curriculo.clear()
+        for m_id, var in self.vars_check.items():
+            var.set(1 if m_id in self.curriculo_salvo else 0)
+        self.atualizar_pendencias_curriculo()
+
+    def aplicar_curriculo(self):
+        """Grava as alterações pendentes do currículo do curso exibido"""
+        if self.curso_checklist is None or not self.alteracoes_curriculo:
+            return
+        curso_id = self.curso_checklist
+        aplicadas = dict(self.alteracoes_curriculo)
+        incluir = [m_id for m_id, ativo in aplicadas.items() if ativo]
+        excluir = [m_id for m_id, ativo in aplicadas.items() if not ativo]
+        def concluido():
+            if self.curso_checklist == curso_id:
+                self.curriculo_salvo = (self.curriculo_salvo - set(excluir)) | set(incluir)
+                # Mantém o que foi marcado enquanto a gravação estava em andamento
+                for m_id, ativo in aplicadas.items():
+                    if self.alteracoes_curriculo.get(m_id) == ativo:
+                        del self.alteracoes_curriculo[m_id]
+                self.atualizar_pendencias_curriculo()
+            self.mostrar_status(f'Currículo atualizado: {len(incluir)} matérias incluídas, {len(excluir)} removidas.')
+        self.salvar_curriculo(curso_id, incluir, excluir, concluido)
+
+    def salvar_curriculo(self, curso_id, incluir, excluir, ao_concluir=None):
+        self.operacao_banco('cursos', repositorio.salvar_curriculo, curso_id, incluir, excluir, ao_concluir=ao_concluir)
 
     def painel_materias(self):
         f = ttk.Frame(self)
@@ -314,6 +517,7 @@ class MiniEscolaApp(tk.Tk):
         
         # Botão de atualizar para matérias
         ttk.Button(esq, text='Atualizar', command=self.atualizar_materias).pack(fill='x', pady=2)
+        self.criar_rotulo_carregando(esq, 'materias')
         ttk.Separator(esq, orient='horizontal').pack(fill='x', pady=5)
         
         # Dropdown de matérias existentes
@@ -344,25 +548,24 @@ class MiniEscolaApp(tk.Tk):
         self.lista_materias.column('nome', width=200, stretch=True)
         self.lista_materias.pack(fill='both', expand=True)
         
+        return f
+
+    def carregar_aba_materias(self):
         self.carregar_materias_combo_edicao()
         self.carregar_materias()
-        return f
 
     def atualizar_materias(self):
-        self.carregar_materias()
+        self.recarregar_referencia('materias')
 
     def carregar_materias(self):
-        self.carregar_lista(
-            self.lista_materias,
-            'SELECT id, nome FROM materias ORDER BY nome'
-        )
+        self.obter_referencia('materias', 'materias', lambda materias: self.preencher_lista(self.lista_materias, materias))
 
     def carregar_materias_combo_edicao(self):
-        cur = self.con.cursor()
-        cur.execute('SELECT id, nome FROM materias ORDER BY nome')
-        self.combo_mat_edicao['values'] = [f"{id_}: {nome}" for id_, nome in cur.fetchall()]
-        self.combo_mat_edicao.set('')
-        self.entrada_mat.delete(0, tk.END)
+        def preencher(materias):
+            self.combo_mat_edicao['values'] = [f"{id_}: {nome}" for id_, nome in materias]
+            self.combo_mat_edicao.set('')
+            self.entrada_mat.delete(0, tk.END)
+        self.obter_referencia('materias', 'materias', preencher)
 
     def preencher_mat_edicao(self, event=None):
         sel = self.combo_mat_edicao.get()
@@ -370,13 +573,11 @@ class MiniEscolaApp(tk.Tk):
             self.entrada_mat.delete(0, tk.END)
             return
         mat_id = sel.split(':')[0]
-        cur = self.con.cursor()
-        cur.execute('SELECT nome FROM materias WHERE id=%s', (mat_id,))
-        res = cur.fetchone()
-        if res:
-            nome = res[0]
-            self.entrada_mat.delete(0, tk.END)
-            self.entrada_mat.insert(0, nome)
+        def preencher(nome):
+            if nome is not None:
+                self.entrada_mat.delete(0, tk.END)
+                self.entrada_mat.insert(0, nome)
+        self.consultar('materias', repositorio.nome_materia, mat_id, ao_concluir=preencher, chave='edicao_materia')
 
     def salvar_alteracoes_materia(self):
         sel = self.combo_mat_edicao.get()
@@ -388,23 +589,22 @@ class MiniEscolaApp(tk.Tk):
         if not nome:
             self.mostrar_status('Nome inválido.', 'red')
             return
-        if self.operacao_banco('UPDATE materias SET nome=%s WHERE id=%s', (nome, mat_id)):
-            self.carregar_materias()
-            self.carregar_materias_combo_edicao()
+        def concluido():
+            self.recarregar_referencia('materias')
             self.mostrar_status('Matéria atualizada com sucesso!')
+        self.operacao_banco('materias', repositorio.atualizar_materia, mat_id, nome, ao_concluir=concluido)
 
     def adicionar_materia(self):
         nome = self.validar_entrada(self.entrada_mat.get())
         if not nome:
             self.mostrar_status('Nome inválido.', 'red')
             return
-        if self.operacao_banco('INSERT INTO materias(nome) VALUES(%s)', (nome,)):
+        def concluido():
             self.entrada_mat.delete(0, tk.END)
-            self.carregar_materias()
-            self.carregar_materias_combo_edicao()
+            self.recarregar_referencia('materias')
             self.carregar_mat_combo()
-            self.carregar_materias_curso()
             self.mostrar_status('Matéria adicionada com sucesso!')
+        self.operacao_banco('materias', repositorio.inserir_materia, nome, ao_concluir=concluido)
 
     def remover_materia(self):
         sel = self.combo_mat_edicao.get()
@@ -412,15 +612,12 @@ class MiniEscolaApp(tk.Tk):
             self.mostrar_status('Selecione uma matéria para remover.', 'red')
             return
         mat_id = sel.split(':')[0]
-        # Executa as remoções em cascata na ordem correta
-        if self.operacao_banco('DELETE FROM notas WHERE materia_id=%s', (mat_id,)) and \
-           self.operacao_banco('DELETE FROM curso_materia WHERE materia_id=%s', (mat_id,)) and \
-           self.operacao_banco('DELETE FROM materias WHERE id=%s', (mat_id,)):
-            self.carregar_materias()
-            self.carregar_materias_combo_edicao()
+        def concluido():
+            self.recarregar_referencia('materias')
             self.carregar_mat_combo()
-            self.carregar_materias_curso()
+            self.agendar_estatisticas()
             self.mostrar_status('Matéria removida!','red')
+        self.operacao_banco('materias', repositorio.remover_materia, mat_id, ao_concluir=concluido)
 
     def painel_alunos(self):
         f = ttk.Frame(self)
@@ -432,6 +629,7 @@ class MiniEscolaApp(tk.Tk):
         
         # Botão de atualizar para alunos
         ttk.Button(esq, text='Atualizar', command=self.atualizar_alunos).pack(fill='x', pady=2)
+        self.criar_rotulo_carregando(esq, 'alunos')
         ttk.Separator(esq, orient='horizontal').pack(fill='x', pady=5)
         
         # Dropdown de alunos existentes
@@ -467,40 +665,38 @@ class MiniEscolaApp(tk.Tk):
         self.lista_alunos.column('id', width=30, minwidth=10, stretch=False, anchor='center')
         self.lista_alunos.column('nome', width=100, stretch=True)
         self.lista_alunos.column('curso', width=200, stretch=True)
-        self.lista_alunos.pack(fill='both', expand=True)
+        scrollbar = ttk.Scrollbar(dir, orient='vertical', command=self.lista_alunos.yview)
+        scrollbar.pack(side='right', fill='y')
+        self.lista_alunos.pack(side='left', fill='both', expand=True)
+        self.configurar_rolagem_paginada(self.lista_alunos, scrollbar)
         
+        return f
+
+    def carregar_aba_alunos(self):
         self.carregar_cursos_combo()
         self.carregar_alunos()
         self.carregar_alunos_combo_edicao()
-        return f
 
     def atualizar_alunos(self):
         self.carregar_alunos()
-        self.carregar_cursos_combo()
+        self.recarregar_referencia('alunos')
+        self.recarregar_referencia('cursos')
 
     def carregar_cursos_combo(self):
-        cur = self.con.cursor()
-        cur.execute('SELECT id, nome FROM cursos ORDER BY nome')
-        self.combo_cursos['values'] = [f"{id_}: {nome}" for id_, nome in cur.fetchall()]
+        def preencher(cursos):
+            self.combo_cursos['values'] = [f"{id_}: {nome}" for id_, nome in cursos]
+        self.obter_referencia('cursos', 'alunos', preencher)
 
     def carregar_alunos(self):
-        self.carregar_lista(
-            self.lista_alunos,
-            '''
-            SELECT a.id, a.nome, c.nome 
-            FROM alunos a 
-            LEFT JOIN cursos c ON a.curso_id = c.id 
-            ORDER BY a.id
-            '''
-        )
+        self.carregar_lista('alunos', self.lista_alunos, repositorio.pagina_alunos, paginada=True)
 
     def carregar_alunos_combo_edicao(self):
-        cur = self.con.cursor()
-        cur.execute('SELECT id, nome FROM alunos ORDER BY nome')
-        self.combo_aluno_edicao['values'] = [f"{id_}: {nome}" for id_, nome in cur.fetchall()]
-        self.combo_aluno_edicao.set('')
-        self.entrada_aluno.delete(0, tk.END)
-        self.combo_cursos.set('')
+        def preencher(alunos):
+            self.combo_aluno_edicao['values'] = [f"{id_}: {nome}" for id_, nome in alunos]
+            self.combo_aluno_edicao.set('')
+            self.entrada_aluno.delete(0, tk.END)
+            self.combo_cursos.set('')
+        self.obter_referencia('alunos', 'alunos', preencher)
 
     def preencher_aluno_edicao(self, event=None):
         sel = self.combo_aluno_edicao.get()
@@ -509,23 +705,19 @@ class MiniEscolaApp(tk.Tk):
             self.combo_cursos.set('')
             return
         aluno_id = sel.split(':')[0]
-        cur = self.con.cursor()
-        cur.execute('SELECT nome, curso_id FROM alunos WHERE id=%s', (aluno_id,))
-        res = cur.fetchone()
-        if res:
-            nome, curso_id = res
+        def preencher(aluno):
+            if not aluno:
+                return
+            nome, curso_id = aluno
             self.entrada_aluno.delete(0, tk.END)
             self.entrada_aluno.insert(0, nome)
+            self.combo_cursos.set('')
             if curso_id:
-                cur.execute('SELECT nome FROM cursos WHERE id=%s', (curso_id,))
-                curso_nome = cur.fetchone()
-                if curso_nome:
-                    for v in self.combo_cursos['values']:
-                        if v.endswith(curso_nome[0]):
-                            self.combo_cursos.set(v)
-                            break
-            else:
-                self.combo_cursos.set('')
+                for v in self.combo_cursos['values']:
+                    if v.split(':')[0] == str(curso_id):
+                        self.combo_cursos.set(v)
+                        break
+        self.consultar('alunos', repositorio.dados_aluno, aluno_id, ao_concluir=preencher, chave='edicao_aluno')
 
     def salvar_alteracoes_aluno(self):
         sel = self.combo_aluno_edicao.get()
@@ -538,11 +730,14 @@ class MiniEscolaApp(tk.Tk):
         if not nome:
             self.mostrar_status('Nome inválido.', 'red')
             return
-        if self.operacao_banco('UPDATE alunos SET nome=%s, curso_id=%s WHERE id=%s', (nome, curso, aluno_id)):
+        def concluido():
             self.carregar_alunos()
-            self.carregar_alunos_combo_edicao()
-            self.filtrar_notas()
+            self.recarregar_referencia('alunos')
+            self.recarregar_aba('notas', self.filtrar_notas)
+            # A troca de curso move as notas do aluno entre as estatísticas dos cursos
+            self.agendar_estatisticas()
             self.mostrar_status('Aluno atualizado com sucesso!')
+        self.operacao_banco('alunos', repositorio.atualizar_aluno, aluno_id, nome, curso, ao_concluir=concluido)
 
     def adicionar_aluno(self):
         nome = self.validar_entrada(self.entrada_aluno.get())
@@ -550,12 +745,13 @@ class MiniEscolaApp(tk.Tk):
         if not nome:
             self.mostrar_status('Nome inválido.', 'red')
             return
-        if self.operacao_banco('INSERT INTO alunos(nome,curso_id) VALUES(%s,%s)', (nome, curso)):
+        def concluido():
             self.entrada_aluno.delete(0, tk.END)
             self.carregar_alunos()
-            self.carregar_alunos_combo_edicao()
-            self.filtrar_notas()
+            self.recarregar_referencia('alunos')
+            self.recarregar_aba('notas', self.filtrar_notas)
             self.mostrar_status('Aluno adicionado com sucesso!')
+        self.operacao_banco('alunos', repositorio.inserir_aluno, nome, curso, ao_concluir=concluido)
 
     def remover_aluno(self):
         sel = self.combo_aluno_edicao.get()
@@ -563,15 +759,16 @@ class MiniEscolaApp(tk.Tk):
             self.mostrar_status('Selecione um aluno para remover.', 'red')
             return
         aluno_id = sel.split(':')[0]
-        if self.operacao_banco('DELETE FROM notas WHERE aluno_id=%s', (aluno_id,)) and \
-           self.operacao_banco('DELETE FROM alunos WHERE id=%s', (aluno_id,)):
+        def concluido():
             self.carregar_alunos()
-            self.carregar_alunos_combo_edicao()
-            self.filtrar_notas()
+            self.recarregar_referencia('alunos')
+            self.recarregar_aba('notas', self.filtrar_notas)
             self.entrada_aluno.delete(0, tk.END)
             self.combo_cursos.set('')
             self.combo_aluno_edicao.set('')
+            self.agendar_estatisticas()
             self.mostrar_status('Aluno removido!','red')
+        self.operacao_banco('alunos', repositorio.remover_aluno, aluno_id, ao_concluir=concluido)
 
     def painel_notas(self):
         f = ttk.Frame(self)
@@ -583,6 +780,7 @@ class MiniEscolaApp(tk.Tk):
         
         # Botão de atualizar para notas
         ttk.Button(esq, text='Atualizar', command=self.atualizar_notas).pack(fill='x', pady=2)
+        self.criar_rotulo_carregando(esq, 'notas')
         ttk.Separator(esq, orient='horizontal').pack(fill='x', pady=5)
         
         ttk.Label(esq, text='Selecione o Aluno:').pack(fill='x')
@@ -612,6 +810,10 @@ class MiniEscolaApp(tk.Tk):
         # Botões Salvar e Remover Notas (vertical)
         ttk.Button(esq, text='Salvar Notas', command=self.adicionar_nota).pack(fill='x', pady=2)
         ttk.Button(esq, text='Remover Notas', command=self.remover_notas).pack(fill='x', pady=(0,5))
+        ttk.Button(esq, text='Lançar Notas em Grade...', command=lambda: JanelaLancamento(self)).pack(fill='x', pady=(0,5))
+        ttk.Button(esq, text='Importar Notas (CSV)...', command=self.importar_notas_csv).pack(fill='x', pady=(0,5))
+        ttk.Button(esq, text='Exportar Boletins...', command=self.exportar_boletins_arquivo).pack(fill='x', pady=(0,5))
+        ttk.Button(esq, text='Exportar Planilha dos Cursos...', command=self.exportar_planilha_arquivo).pack(fill='x', pady=(0,5))
         
         # Caixa de explicação da equação da nota final
         frame_equacao = ttk.LabelFrame(esq, text='Cálculo da Nota Final')
@@ -648,14 +850,23 @@ class MiniEscolaApp(tk.Tk):
         ttk.Label(frame_filtros, text='Buscar aluno:').pack(side='left')
         self.busca_aluno = ttk.Entry(frame_filtros)
         self.busca_aluno.pack(side='left', fill='x', expand=True, padx=(5,10))
-        self.busca_aluno.bind('<KeyRelease>', self.filtrar_notas)
+        self.busca_aluno.bind('<KeyRelease>', self.agendar_busca_aluno)
         
         # Combobox para filtrar por curso
         ttk.Label(frame_filtros, text='Filtrar por curso:').pack(side='left')
         self.filtro_curso = ttk.Combobox(frame_filtros, state='readonly', width=20)
+        self.ids_filtro_curso = [None]  # id do curso de cada opção do filtro (None: todos)
         self.filtro_curso.pack(side='left', padx=(5,0))
         self.filtro_curso.bind('<<ComboboxSelected>>', self.filtrar_notas)
         
+        # Combobox para filtrar por status (calculado pelo banco)
+        ttk.Label(frame_filtros, text='Status:').pack(side='left', padx=(10,0))
+        self.filtro_status = ttk.Combobox(frame_filtros, state='readonly', width=12,
+                                          values=['Todos', 'Aprovado', 'Reprovado', 'Pendente'])
+        self.filtro_status.set('Todos')
+        self.filtro_status.pack(side='left', padx=(5,0))
+        self.filtro_status.bind('<<ComboboxSelected>>', self.filtrar_notas)
+        
         # Criar Treeview para notas
         self.lista_notas = ttk.Treeview(dir, columns=('status', 'materia', 'prova', 'trabalho', 'sim1', 'sim2', 'final'), show='tree headings')
         self.lista_notas.heading('#0', text='Aluno')
@@ -676,17 +887,27 @@ class MiniEscolaApp(tk.Tk):
         self.lista_notas.column('final', width=30, anchor='center')
         
         self.lista_notas.pack(fill='both', expand=True)
+        # Duas tags compartilhadas para as linhas zebradas
+        self.lista_notas.tag_configure('par', background='#f0f0f0')
+        self.lista_notas.tag_configure('impar', background='white')
+        self.lista_notas.bind('<<TreeviewOpen>>', self.expandir_aluno_notas)
+        
+        # Estado da busca incremental por aluno
+        self.busca_agendada = None
+        self.cache_busca = None  # (texto, filtros, linhas) da última consulta
         
+        return f
+
+    def carregar_aba_notas(self):
         self.carregar_filtro_cursos()
         self.filtrar_notas()
         self.carregar_aluno_combo()
         self.carregar_mat_combo()
-        return f
 
     def atualizar_notas(self):
-        self.carregar_filtro_cursos()
+        self.recarregar_referencia('cursos')
+        self.recarregar_referencia('alunos')
         self.filtrar_notas()
-        self.carregar_aluno_combo()
         self.carregar_mat_combo()
 
     def atualizar_materias_aluno(self, event=None):
@@ -694,111 +915,142 @@ class MiniEscolaApp(tk.Tk):
         self.carregar_mat_combo()
 
     def carregar_aluno_combo(self):
-        cur = self.con.cursor()
-        cur.execute('SELECT id, nome FROM alunos ORDER BY nome')
-        self.combo_aluno['values'] = [f"{id_}: {nome}" for id_, nome in cur.fetchall()]
+        def preencher(alunos):
+            self.combo_aluno['values'] = [f"{id_}: {nome}" for id_, nome in alunos]
+        self.obter_referencia('alunos', 'notas', preencher)
 
     def carregar_mat_combo(self):
         aluno_id = self.combo_aluno.get().split(':')[0] if self.combo_aluno.get() else None
         if not aluno_id:
             self.combo_mat['values'] = []
             return
-            
-        cur = self.con.cursor()
-        cur.execute('SELECT curso_id FROM alunos WHERE id=%s', (aluno_id,))
-        result = cur.fetchone()
-        if not result or not result[0]:
-            self.combo_mat['values'] = []
-            return
-            
-        curso_id = result[0]
-        cur.execute('''
-            SELECT m.id, m.nome 
-            FROM materias m 
-            JOIN curso_materia cm ON m.id = cm.materia_id 
-            WHERE cm.curso_id = %s 
-            ORDER BY m.nome
-        ''', (curso_id,))
-        self.combo_mat['values'] = [f"{id_}: {nome}" for id_, nome in cur.fetchall()]
+        
+        def preencher(materias):
+            self.combo_mat['values'] = [f"{id_}: {nome}" for id_, nome in materias]
+        self.consultar('notas', repositorio.materias_do_aluno, aluno_id, ao_concluir=preencher, chave='combo_mat')
 
     def carregar_filtro_cursos(self):
-        cur = self.con.cursor()
-        cur.execute('SELECT id, nome FROM cursos ORDER BY nome')
-        cursos = [('', 'Todos os cursos')] + cur.fetchall()
-        self.filtro_curso['values'] = [nome for _, nome in cursos]
-        self.filtro_curso.set('Todos os cursos')
+        def preencher(cursos):
+            cursos = [(None, 'Todos os cursos')] + cursos
+            self.ids_filtro_curso = [id_ for id_, _ in cursos]
+            self.filtro_curso['values'] = [nome for _, nome in cursos]
+            # Mantém o filtro escolhido se o curso ainda existir
+            if self.filtro_curso.get() not in self.filtro_curso['values']:
+                self.filtro_curso.set('Todos os cursos')
+        self.obter_referencia('cursos', 'notas', preencher)
+
+    def agendar_busca_aluno(self, event=None):
+        """Adia a busca por aluno até o usuário parar de digitar"""
+        if self.busca_agendada is not None:
+            self.after_cancel(self.busca_agendada)
+        self.busca_agendada = self.after(ATRASO_BUSCA_MS, self.buscar_aluno_incremental)
+
+    def buscar_aluno_incremental(self):
+        """Reaproveita o último resultado quando a busca apenas estende o texto anterior"""
+        self.busca_agendada = None
+        texto_busca = self.busca_aluno.get().lower()
+        filtros = (self.filtro_curso.get(), self.filtro_status.get())
+        if self.cache_busca is not None:
+            texto_anterior, filtros_anteriores, linhas = self.cache_busca
+            if filtros == filtros_anteriores and texto_busca.startswith(texto_anterior):
+                # Uma busca no banco ainda em andamento (de um texto anterior) não pode
+                # sobrescrever o resultado filtrado aqui
+                self.executor.descartar('arvore_notas')
+                if texto_busca != texto_anterior:
+                    linhas = [linha for linha in linhas if texto_busca in linha[1].lower()]
+                    self.cache_busca = (texto_busca, filtros, linhas)
+                    self.preencher_arvore_notas(linhas)
+                return
+        self.filtrar_notas()
 
     def filtrar_notas(self, event=None):
-        # Limpar lista atual
-        for item in self.lista_notas.get_children():
-            self.lista_notas.delete(item)
+        if self.busca_agendada is not None:
+            self.after_cancel(self.busca_agendada)
+            self.busca_agendada = None
         texto_busca = self.busca_aluno.get().lower()
         curso_filtro = self.filtro_curso.get()
-        cur = self.con.cursor()
-        query = """
-            SELECT DISTINCT a.id, a.nome, c.nome as curso_nome
-            FROM alunos a 
-            INNER JOIN notas n ON a.id = n.aluno_id 
-            LEFT JOIN cursos c ON a.curso_id = c.id
-            WHERE a.nome ILIKE %s
-        """
-        params = [f'%{texto_busca}%']
-        if curso_filtro != 'Todos os cursos':
-            query += " AND c.nome = %s"
-            params.append(curso_filtro)
-        query += " ORDER BY a.nome"
-        cur.execute(query, params)
-        alunos = cur.fetchall()
-        for i, (aluno_id, aluno_nome, curso_nome) in enumerate(alunos):
-            bg_color = '#f0f0f0' if i % 2 == 0 else 'white'
-            def sigla_curso(nome):
-                stopwords = {'de', 'da', 'do', 'das', 'dos', 'e'}
-                palavras = [p for p in nome.split() if p not in stopwords]
-                if not palavras:
-                    return ''
-                if len(palavras) == 1:
-                    return palavras[0][:3]
-                return f"{palavras[0][:3]}. {palavras[1]}"
-            sigla = sigla_curso(curso_nome)
-            nome_exibicao = f"{aluno_nome} ({sigla})"
-            aluno_item = self.lista_notas.insert('', 'end', text=nome_exibicao, values=('', '', '', '', '', ''))
-            self.lista_notas.item(aluno_item, tags=(f'aluno_{i}',))
-            self.lista_notas.tag_configure(f'aluno_{i}', background=bg_color)
-            cur.execute("""
-                SELECT m.nome, n.trabalho, n.simulado1, n.simulado2, n.prova, n.id
-                FROM notas n
-                INNER JOIN materias m ON n.materia_id = m.id
-                WHERE n.aluno_id = %s
-                ORDER BY m.nome
-            """, (aluno_id,))
-            notas = cur.fetchall()
-            nota_geral = 0
-            for materia_nome, trabalho, sim1, sim2, prova, nota_id in notas:
-                t = trabalho or 0
-                s1 = sim1 or 0
-                s2 = sim2 or 0
-                p = prova or 0
-                status = ''
-                if trabalho is None or prova is None:
-                    status = 'Pendente'
-                else:
-                    nota_final = t + s1 + s2 + p
-                    if nota_final > 10:
-                        nota_final = 10
-                    if nota_final > 6:
-                        status = 'Aprovado'
-                    else:
-                        status = 'Reprovado'
-                nota_final = t + s1 + s2 + p
-                if nota_final > 10:
-                    nota_final = 10
-                nota_geral += nota_final
-                valor_final = f'{nota_final:.1f}' if nota_final > 0 else ''
-                nota_item = self.lista_notas.insert(aluno_item, 'end', text='', values=(
-                    status, materia_nome, p if p else '', t if t else '', s1 if s1 else '', s2 if s2 else '', valor_final
-                ))
-                self.lista_notas.item(nota_item, tags=(f'aluno_{i}',))
-            self.lista_notas.item(aluno_item, open=True)
+        status_filtro = self.filtro_status.get()
+        sem_filtros = not texto_busca and curso_filtro == 'Todos os cursos' and status_filtro == 'Todos'
+        # A árvore da cópia local vale só para a primeira carga, sem filtros
+        arvore, self.arvore_instantaneo = self.arvore_instantaneo, None
+        if sem_filtros and arvore is not None:
+            self.executor.descartar('arvore_notas')
+            self.preencher_arvore_notas(arvore)
+            self.cache_busca = (texto_busca, (curso_filtro, status_filtro), arvore)
+            return
+        linhas = []  # None quando o resultado passa de LINHAS_GUARDADAS_BUSCA
+        recebidas = 0
+        versoes = {}
+        def receber_lote(lote):
+            nonlocal linhas, recebidas
+            # A árvore anterior continua visível até chegar o primeiro lote
+            if not recebidas:
+                self.lista_notas.delete(*self.lista_notas.get_children())
+            self.inserir_alunos_notas(lote, recebidas)
+            recebidas += len(lote)
+            if recebidas > LINHAS_GUARDADAS_BUSCA:
+                linhas = None
+            elif linhas is not None:
+                linhas.extend(lote)
+        def concluido():
+            if not recebidas:
+                self.lista_notas.delete(*self.lista_notas.get_children())
+            if linhas is None:
+                self.cache_busca = None
+                return
+            self.cache_busca = (texto_busca, (curso_filtro, status_filtro), linhas)
+            if versoes:
+                self.instantaneo.gravar('arvore_notas', versoes, linhas)
+        gerar = repositorio.buscar_alunos_com_notas
+        if sem_filtros and self.instantaneo:
+            gerar = repositorio.lendo_versoes(gerar, versoes)
+        # Apenas os alunos, em lotes de um cursor no servidor; as notas são carregadas ao
+        # expandir cada aluno. Uma busca nova substitui (e cancela no servidor) a anterior
+        self.consultar_em_lotes('notas', gerar, texto_busca,
+                                None if curso_filtro == 'Todos os cursos' else curso_filtro,
+                                None if status_filtro == 'Todos' else status_filtro,
+                                ao_lote=receber_lote, ao_concluir=concluido, chave='arvore_notas')
+
+    def preencher_arvore_notas(self, alunos):
+        """Monta a árvore de notas com os alunos recolhidos"""
+        # Limpar lista atual
+        self.lista_notas.delete(*self.lista_notas.get_children())
+        self.inserir_alunos_notas(alunos)
+
+    def inserir_alunos_notas(self, alunos, inicio=0):
+        """Acrescenta os alunos à árvore; `inicio` mantém a alternância das cores entre lotes"""
+        for i, (aluno_id, aluno_nome, curso_nome) in enumerate(alunos, inicio):
+            tag = 'par' if i % 2 == 0 else 'impar'
+            nome_exibicao = f"{aluno_nome} ({sigla_curso(curso_nome)})"
+            aluno_item = self.lista_notas.insert('', 'end', iid=f'aluno_{aluno_id}', text=nome_exibicao,
+                                                 values=('', '', '', '', '', ''), tags=(tag,))
+            # Filho provisório para exibir o indicador de expansão
+            self.lista_notas.insert(aluno_item, 'end', text='Carregando...', tags=(tag, 'carregando'))
+
+    def expandir_aluno_notas(self, event=None):
+        """Carrega as notas do aluno na primeira vez que o nó é expandido"""
+        aluno_item = self.lista_notas.focus()
+        if not aluno_item:
+            return
+        filhos = self.lista_notas.get_children(aluno_item)
+        if not filhos or 'carregando' not in self.lista_notas.item(filhos[0], 'tags'):
+            return
+        aluno_id = aluno_item.split('_')[1]
+        def preencher(notas):
+            # A árvore pode ter sido recarregada enquanto a consulta rodava
+            if not self.lista_notas.exists(aluno_item):
+                return
+            filhos = self.lista_notas.get_children(aluno_item)
+            if not filhos or 'carregando' not in self.lista_notas.item(filhos[0], 'tags'):
+                return
+            tag = self.lista_notas.item(aluno_item, 'tags')[0]
+            self.lista_notas.delete(*filhos)
+            for nota in notas:
+                self.lista_notas.insert(aluno_item, 'end', text='', values=valores_nota(*nota), tags=(tag,))
+        # Com filtro de status, o aluno mostra apenas as notas nesse status
+        status = self.filtro_status.get()
+        self.consultar('notas', repositorio.notas_do_aluno, aluno_id, None if status == 'Todos' else status,
+                       ao_concluir=preencher)
 
     def adicionar_nota(self):
         a = self.combo_aluno.get().split(':')[0]
@@ -810,35 +1062,48 @@ class MiniEscolaApp(tk.Tk):
         if not a or not m:
             messagebox.showwarning('Aviso', 'Selecione aluno e matéria')
             return
-        if not any(self.validar_entrada(v, tipo) for v, tipo in [
-            (t, 'trabalho'), (s1, 'simulado'), (s2, 'simulado'), (p, 'prova')]):
+        # Cada campo é convertido uma única vez; valores inválidos ficam vazios
+        notas = tuple(nota_valida(v, tipo) for v, tipo in [
+            (t, 'trabalho'), (s1, 'simulado'), (s2, 'simulado'), (p, 'prova')])
+        if all(nota is None for nota in notas):
             messagebox.showwarning('Aviso', 'Insira pelo menos uma nota válida')
             return
-        cur = self.con.cursor()
-        cur.execute('''
-            SELECT 1 FROM curso_materia cm
-            JOIN alunos a ON a.curso_id = cm.curso_id
-            WHERE a.id = %s AND cm.materia_id = %s
-        ''', (a, m))
-        if not cur.fetchone():
-            messagebox.showerror('Erro', 'Matéria não pertence ao curso do aluno')
-            return
-        if self.operacao_banco('DELETE FROM notas WHERE aluno_id=%s AND materia_id=%s', (a, m)) and \
-           self.operacao_banco(
-               'INSERT INTO notas(aluno_id,materia_id,trabalho,simulado1,simulado2,prova) VALUES(%s,%s,%s,%s,%s,%s)',
-               (a, m, 
-                float(t.replace(',', '.')) if self.validar_entrada(t, 'trabalho') else None,
-                float(s1.replace(',', '.')) if self.validar_entrada(s1, 'simulado') else None,
-                float(s2.replace(',', '.')) if self.validar_entrada(s2, 'simulado') else None,
-                float(p.replace(',', '.')) if self.validar_entrada(p, 'prova') else None
-               )
-           ):
+        def concluido(salva):
+            if not salva:
+                messagebox.showerror('Erro', 'Matéria não pertence ao curso do aluno')
+                return
             self.entrada_trabalho.delete(0, tk.END)
             self.entrada_sim1.delete(0, tk.END)
             self.entrada_sim2.delete(0, tk.END)
             self.entrada_prova.delete(0, tk.END)
-            self.filtrar_notas()
+            self.atualizar_no_nota(*salva)
+            self.agendar_estatisticas()
             self.mostrar_status('Nota salva com sucesso!')
+        self.executar('notas', lambda con: repositorio.salvar_nota(con, a, m, *notas), concluido)
+
+    def atualizar_no_nota(self, aluno_id, materia_nome, trabalho, sim1, sim2, prova, nota_final, status):
+        """Atualiza na árvore apenas a linha da nota salva, sem recarregar a lista"""
+        aluno_item = f'aluno_{aluno_id}'
+        if not self.lista_notas.exists(aluno_item) or self.filtro_status.get() not in ('Todos', status):
+            # Aluno ainda não aparece na lista (primeira nota) ou a nota mudou de status
+            # em relação ao filtro: recarrega o filtro atual
+            self.filtrar_notas()
+            return
+        filhos = self.lista_notas.get_children(aluno_item)
+        if filhos and 'carregando' in self.lista_notas.item(filhos[0], 'tags'):
+            return  # As notas serão lidas do banco quando o aluno for expandido
+        valores = valores_nota(materia_nome, trabalho, sim1, sim2, prova, nota_final, status)
+        posicao = len(filhos)
+        for i, filho in enumerate(filhos):
+            nome = self.lista_notas.set(filho, 'materia')
+            if nome == materia_nome:
+                self.lista_notas.item(filho, values=valores)
+                return
+            if nome > materia_nome:
+                posicao = i
+                break
+        tag = self.lista_notas.item(aluno_item, 'tags')[0]
+        self.lista_notas.insert(aluno_item, posicao, text='', values=valores, tags=(tag,))
 
     def remover_notas(self):
         a = self.combo_aluno.get().split(':')[0]
@@ -846,25 +1111,326 @@ class MiniEscolaApp(tk.Tk):
         if not a or not m:
             messagebox.showwarning('Aviso', 'Selecione aluno e matéria')
             return
-        cur = self.con.cursor()
-        cur.execute('DELETE FROM notas WHERE aluno_id=%s AND materia_id=%s', (a, m))
-        self.con.commit()
-        self.filtrar_notas()
-        self.entrada_trabalho.delete(0, tk.END)
-        self.entrada_sim1.delete(0, tk.END)
-        self.entrada_sim2.delete(0, tk.END)
-        self.entrada_prova.delete(0, tk.END)
-        self.mostrar_status('Nota removida!','red')
-
-    def carregar_lista(self, treeview, query, params=None):
-        """Função utilitária para carregar dados em um Treeview"""
-        for item in treeview.get_children():
-            treeview.delete(item)
-        cur = self.con.cursor()
-        cur.execute(query, params or ())
-        for valores in cur.fetchall():
+        def concluido():
+            self.filtrar_notas()
+            self.entrada_trabalho.delete(0, tk.END)
+            self.entrada_sim1.delete(0, tk.END)
+            self.entrada_sim2.delete(0, tk.END)
+            self.entrada_prova.delete(0, tk.END)
+            self.agendar_estatisticas()
+            self.mostrar_status('Nota removida!','red')
+        self.operacao_banco('notas', repositorio.remover_nota, a, m, ao_concluir=concluido)
+
+    def importar_notas_csv(self):
+        """Importa um CSV de notas (aluno_id, materia_id, trabalho, simulado1, simulado2, prova)"""
+        caminho = filedialog.askopenfilename(title='Importar notas',
+                                             filetypes=[('CSV', '*.csv'), ('Todos os arquivos', '*.*')])
+        if not caminho:
+            return
+        def concluido(resultado):
+            self.filtrar_notas()
+            self.carregar_notas_edicao()
+            self.agendar_estatisticas()
+            self.mostrar_status(f'Notas importadas: {resultado.inseridas} novas, {resultado.atualizadas} atualizadas.')
+            if resultado.erros and messagebox.askyesno(
+                    'Importação', f'{len(resultado.erros)} linhas não foram importadas. Salvar o relatório de erros?'):
+                destino = filedialog.asksaveasfilename(title='Relatório de erros', defaultextension='.csv',
+                                                       filetypes=[('CSV', '*.csv')])
+                if destino:
+                    gravar_relatorio(resultado.erros, destino)
+        # Validação, conferência e gravação acontecem em uma única transação
+        self.executar('notas', lambda con: importar_notas(con, caminho), concluido)
+
+    def exportar_boletins_arquivo(self):
+        """Exporta os boletins do curso escolhido no filtro (ou de todos) para CSV ou JSON"""
+        self.exportar_arquivo('Exportar boletins', exportar_boletins, 'boletins exportados')
+
+    def exportar_planilha_arquivo(self):
+        """Exporta a média e os totais por status de cada matéria do curso do filtro (ou de todos)"""
+        self.exportar_arquivo('Exportar planilha dos cursos', exportar_planilha_cursos, 'linhas de planilha exportadas')
+
+    def exportar_arquivo(self, titulo, exportar_dados, descricao):
+        """Pede o arquivo e grava nele exportar_dados(con, caminho, curso_id) em segundo plano"""
+        caminho = filedialog.asksaveasfilename(title=titulo, defaultextension='.csv',
+                                               filetypes=[('CSV', '*.csv'), ('JSON', '*.json')])
+        if not caminho:
+            return
+        # Pela posição da opção escolhida, e não pelo nome: dois cursos podem ter o mesmo nome
+        indice = self.filtro_curso.current()
+        curso_id = self.ids_filtro_curso[indice] if 0 <= indice < len(self.ids_filtro_curso) else None
+        self.executar('notas', lambda con: exportar_dados(con, caminho, curso_id),
+                      lambda total: self.mostrar_status(f'{total} {descricao}.'))
+
+    def painel_estatisticas(self):
+        f = ttk.Frame(self)
+        
+        # Painel esquerdo: atualização e histograma da linha selecionada
+        esq = ttk.Frame(f, width=self.largura_painel_esq)
+        esq.pack(side='left', fill='y', padx=5, pady=5)
+        esq.pack_propagate(False)  # Impede que o frame encolha
+        ttk.Button(esq, text='Atualizar', command=self.atualizar_estatisticas_agora).pack(fill='x', pady=2)
+        self.criar_rotulo_carregando(esq, 'estatisticas')
+        self.rotulo_estatisticas = ttk.Label(esq, text='', foreground='gray', anchor='w')
+        self.rotulo_estatisticas.pack(fill='x')
+        ttk.Separator(esq, orient='horizontal').pack(fill='x', pady=5)
+        ttk.Label(esq, text='Distribuição da nota final:').pack(fill='x')
+        self.titulo_histograma = ttk.Label(esq, text='', anchor='w', font=('Arial', 10, 'bold'))
+        self.titulo_histograma.pack(fill='x')
+        self.canvas_histograma = tk.Canvas(esq, height=220, background='white', highlightthickness=0)
+        self.canvas_histograma.pack(fill='x', pady=5)
+        
+        # Painel direito: cursos e matérias do curso selecionado
+        dir = ttk.Frame(f)
+        dir.pack(side='left', fill='both', expand=True, padx=5, pady=5)
+        frame_cursos = ttk.LabelFrame(dir, text='Cursos')
+        frame_cursos.pack(fill='both', expand=True)
+        self.lista_estatisticas_cursos = self.criar_lista_estatisticas(frame_cursos, 'Curso', alunos=True)
+        frame_materias = ttk.LabelFrame(dir, text='Matérias do Curso')
+        frame_materias.pack(fill='both', expand=True, pady=(5,0))
+        self.lista_estatisticas_materias = self.criar_lista_estatisticas(frame_materias, 'Matéria')
+        self.faixas_estatisticas = {}  # item do Treeview -> contagem por faixa de nota
+        self.lista_estatisticas_cursos.bind('<<TreeviewSelect>>', lambda _: self.selecionar_estatistica_curso())
+        self.lista_estatisticas_materias.bind('<<TreeviewSelect>>',
+                                              lambda _: self.desenhar_histograma(self.lista_estatisticas_materias))
+        return f
+
+    def criar_lista_estatisticas(self, pai, titulo, alunos=False):
+        colunas = [('nome', titulo, 220)]
+        if alunos:
+            colunas.append(('alunos', 'Alunos', 60))
+        colunas += [('notas', 'Notas', 60), ('trabalho', 'Trabalho', 70), ('sim1', 'Simulado 1', 75),
+                    ('sim2', 'Simulado 2', 75), ('prova', 'Prova', 60), ('final', 'Nota Final', 75),
+                    ('aprovados', 'Aprovados', 75), ('reprovados', 'Reprovados', 75),
+                    ('pendentes', 'Pendentes', 75), ('taxa', 'Aprovação', 75)]
+        lista = ttk.Treeview(pai, columns=[coluna for coluna, _, _ in colunas], show='headings')
+        for coluna, texto, largura in colunas:
+            lista.heading(coluna, text=texto)
+            lista.column(coluna, width=largura, anchor='w' if coluna == 'nome' else 'center')
+        scrollbar = ttk.Scrollbar(pai, orient='vertical', command=lista.yview)
+        lista.configure(yscrollcommand=scrollbar.set)
+        scrollbar.pack(side='right', fill='y')
+        lista.pack(side='left', fill='both', expand=True)
+        return lista
+
+    def carregar_estatisticas(self):
+        """Lê as estatísticas por curso das visões materializadas, mantendo a seleção"""
+        lista = self.lista_estatisticas_cursos
+        selecionado = lista.selection()[0] if lista.selection() else None
+        def preencher(cursos):
+            lista.delete(*lista.get_children())
+            for curso_id, nome, *valores, faixas in cursos:
+                item = lista.insert('', 'end', iid=f'curso_{curso_id}', values=valores_estatistica(nome, valores))
+                self.faixas_estatisticas[item] = faixas
+            if selecionado and lista.exists(selecionado):
+                lista.selection_set(selecionado)
+                self.selecionar_estatistica_curso()
+            else:
+                self.lista_estatisticas_materias.delete(*self.lista_estatisticas_materias.get_children())
+                self.desenhar_histograma(lista)
+        self.executar('estatisticas', repositorio.consultar_estatisticas_cursos, preencher, chave='estatisticas_cursos')
+
+    def selecionar_estatistica_curso(self):
+        lista = self.lista_estatisticas_cursos
+        if not lista.selection():
+            return
+        self.desenhar_histograma(lista)
+        curso_id = int(lista.selection()[0].split('_')[1])
+        materias = self.lista_estatisticas_materias
+        def preencher(linhas):
+            materias.delete(*materias.get_children())
+            for materia_id, nome, *valores, faixas in linhas:
+                item = materias.insert('', 'end', iid=f'materia_{materia_id}', values=valores_estatistica(nome, valores))
+                self.faixas_estatisticas[item] = faixas
+        self.executar('estatisticas', lambda con: repositorio.consultar_estatisticas_materias(con, curso_id), preencher,
+                      chave='estatisticas_materias')
+
+    def desenhar_histograma(self, lista):
+        """Desenha as faixas de nota final da linha selecionada na lista"""
+        canvas = self.canvas_histograma
+        canvas.delete('all')
+        selecao = lista.selection()
+        if not selecao:
+            self.titulo_histograma.config(text='')
+            return
+        self.titulo_histograma.config(text=lista.set(selecao[0], 'nome'))
+        faixas = self.faixas_estatisticas.get(selecao[0], [])
+        largura = max(canvas.winfo_width(), self.largura_painel_esq - 10)
+        altura = int(canvas['height'])
+        maior = max(faixas, default=0) or 1
+        passo = largura / max(len(faixas), 1)
+        for i, (rotulo, total) in enumerate(zip(FAIXAS_NOTA, faixas)):
+            x0, x1 = i * passo + 6, (i + 1) * passo - 6
+            topo = altura - 20 - (altura - 45) * total / maior
+            canvas.create_rectangle(x0, topo, x1, altura - 20, fill='#5b8def', outline='')
+            canvas.create_text((x0 + x1) / 2, topo - 8, text=str(total))
+            canvas.create_text((x0 + x1) / 2, altura - 10, text=rotulo)
+
+    def agendar_estatisticas(self):
+        """Recalcula as estatísticas pouco depois da última gravação que afeta as notas"""
+        if self.agendamento_estatisticas is not None:
+            self.after_cancel(self.agendamento_estatisticas)
+        self.agendamento_estatisticas = self.after(ATRASO_ESTATISTICAS_MS, self.atualizar_estatisticas_agora)
+
+    def atualizacao_periodica_estatisticas(self):
+        self.atualizar_estatisticas_agora()
+        # Sem isso o registro de alterações só diminuiria quando a janela fosse reaberta
+        self.executor_estatisticas.submeter(
+            repositorio.compactar_alteracoes,
+            ao_falhar=lambda erro: log.warning('Registro de alterações não compactado: %s', erro))
+        self.after(INTERVALO_ESTATISTICAS_MS, self.atualizacao_periodica_estatisticas)
+
+    def atualizar_estatisticas_agora(self):
+        """Recalcula as visões de estatísticas em segundo plano e recarrega a aba"""
+        if self.agendamento_estatisticas is not None:
+            self.after_cancel(self.agendamento_estatisticas)
+            self.agendamento_estatisticas = None
+        def concluido(_):
+            self.rotulo_estatisticas.config(text=f"Atualizadas às {time.strftime('%H:%M:%S')}")
+            self.recarregar_aba('estatisticas', self.carregar_estatisticas)
+        self.definir_carregando('estatisticas', 1)
+        self.executor_estatisticas.submeter(
+            repositorio.atualizar_estatisticas, concluido,
+            lambda erro: self.mostrar_status(f'Erro ao atualizar as estatísticas: {erro}', 'red'),
+            ao_finalizar=lambda: self.definir_carregando('estatisticas', -1), acao=acao_da_interface())
+
+    def carregar_lista(self, painel, treeview, buscar, *args, paginada=False):
+        """Função utilitária para carregar em um Treeview as linhas de buscar(con, *args).
+
+        No modo paginado a primeira coluna é a chave de ordenação e a busca recebe
+        também a última chave e o tamanho da página (paginação por keyset); só a
+        primeira página é carregada, e as demais quando a rolagem chega ao fim.
+        """
+        if not paginada:
+            self.consultar(painel, buscar, *args, ao_concluir=lambda linhas: self.preencher_lista(treeview, linhas),
+                           chave=str(treeview))
+            return
+        self.paginas[str(treeview)] = {'painel': painel, 'buscar': buscar, 'args': args,
+                                       'ultima_chave': 0, 'fim': False, 'carregando': False}
+        self.carregar_pagina(treeview, primeira=True)
+
+    def carregar_pagina(self, treeview, primeira=False):
+        pagina = self.paginas[str(treeview)]
+        if not primeira and (pagina['carregando'] or pagina['fim']):
+            return
+        pagina['carregando'] = True
+        args = pagina['args'] + (pagina['ultima_chave'], TAMANHO_PAGINA)
+        def preencher(linhas):
+            if primeira:
+                treeview.delete(*treeview.get_children())
+            for valores in linhas:
+                treeview.insert('', 'end', values=valores)
+            if linhas:
+                pagina['ultima_chave'] = linhas[-1][0]
+            pagina['fim'] = len(linhas) < TAMANHO_PAGINA
+            pagina['carregando'] = False
+        def falhar(erro):
+            pagina['carregando'] = False
+            self.mostrar_erro_banco(erro)
+        # Recarregar a lista substitui (e cancela) a busca de uma página pendente
+        self.executar(pagina['painel'], lambda con: pagina['buscar'](con, *args),
+                      preencher, chave=str(treeview), ao_falhar=falhar)
+
+    def configurar_rolagem_paginada(self, treeview, scrollbar):
+        """Liga a scrollbar ao Treeview e busca a próxima página perto do fim da lista"""
+        def rolar(primeiro, ultimo):
+            scrollbar.set(primeiro, ultimo)
+            # Listas fora da tela (outras abas) não buscam páginas
+            if (float(ultimo) >= LIMIAR_PROXIMA_PAGINA and str(treeview) in self.paginas
+                    and treeview.winfo_ismapped()):
+                self.carregar_pagina(treeview)
+        treeview.configure(yscrollcommand=rolar)
+
+    def preencher_lista(self, treeview, linhas):
+        treeview.delete(*treeview.get_children())
+        for valores in linhas:
             treeview.insert('', 'end', values=valores)
 
+    def obter_referencia(self, entidade, painel, ao_concluir):
+        """Entrega as linhas da tabela de referência, consultando o banco só se o cache estiver vencido.
+
+        Pedidos feitos enquanto a carga está em andamento aguardam essa mesma consulta.
+        """
+        versao = self.versoes_referencia.get(entidade, 0)
+        em_cache = self.referencias.get(entidade)
+        if em_cache is not None and em_cache[0] == versao:
+            ao_concluir(em_cache[1])
+            return
+        aguardando = self.aguardando_referencia.setdefault(entidade, [])
+        aguardando.append((painel, ao_concluir))
+        if len(aguardando) == 1:
+            self.consultar_referencia(entidade)
+
+    def consultar_referencia(self, entidade):
+        versao = self.versoes_referencia.get(entidade, 0)
+        painel = self.aguardando_referencia[entidade][0][0]
+        versoes = {}
+        def preencher(linhas):
+            self.referencias[entidade] = (versao, linhas)
+            if versoes:
+                self.instantaneo.gravar(entidade, versoes, linhas)
+            for _, callback in self.aguardando_referencia.pop(entidade, []):
+                callback(linhas)
+        def falhar(erro):
+            self.aguardando_referencia.pop(entidade, None)
+            self.mostrar_erro_banco(erro)
+        # A chave faz uma carga mais nova (após uma invalidação) substituir a anterior
+        buscar = lambda con: self.buscar_todas(con, repositorio.CONSULTAS_REFERENCIA[entidade])
+        if self.instantaneo:
+            buscar = repositorio.lendo_versoes(buscar, versoes)
+        self.executar(painel, buscar, preencher, chave=f'referencia_{entidade}', ao_falhar=falhar)
+
+    def invalidar_referencia(self, entidade):
+        """Descarta o cache da entidade; chamado pelas operações que a alteram"""
+        self.versoes_referencia[entidade] = self.versoes_referencia.get(entidade, 0) + 1
+        self.referencias.pop(entidade, None)
+        # Quem aguardava a carga anterior passa a aguardar a da nova versão
+        if self.aguardando_referencia.get(entidade):
+            self.consultar_referencia(entidade)
+
+    def recarregar_referencia(self, entidade):
+        """Invalida a entidade e atualiza, com uma única consulta, todas as listas que a exibem"""
+        self.invalidar_referencia(entidade)
+        for carregar in self.consumidores_referencia[entidade]:
+            carregar()
+
+    def criar_rotulo_carregando(self, pai, painel):
+        """Cria o indicador de carregamento exibido enquanto o painel aguarda o banco"""
+        rotulo = ttk.Label(pai, text='', foreground='gray', anchor='w')
+        rotulo.pack(fill='x')
+        self.rotulos_carregando[painel] = rotulo
+
+    def definir_carregando(self, painel, delta):
+        self.tarefas_painel[painel] = self.tarefas_painel.get(painel, 0) + delta
+        rotulo = self.rotulos_carregando.get(painel)
+        if rotulo is not None:
+            rotulo.config(text='Carregando...' if self.tarefas_painel[painel] > 0 else '')
+
+    def executar(self, painel, funcao, ao_concluir=None, chave=None, ao_falhar=None, ao_lote=None):
+        """Executa funcao(con) em segundo plano e entrega o resultado a ao_concluir na thread do Tk.
+
+        Os comandos da tarefa são rastreados sob o nome do tratador da interface que a originou.
+        """
+        self.definir_carregando(painel, 1)
+        self.executor.submeter(funcao, ao_concluir, ao_falhar or self.mostrar_erro_banco, chave=chave,
+                               ao_finalizar=lambda: self.definir_carregando(painel, -1), ao_lote=ao_lote,
+                               acao=acao_da_interface() or painel)
+
+    def consultar(self, painel, buscar, *args, ao_concluir=None, chave=None):
+        """Função utilitária para leituras: entrega a ao_concluir o resultado de buscar(con, *args)"""
+        self.executar(painel, lambda con: buscar(con, *args), ao_concluir, chave)
+
+    def consultar_em_lotes(self, painel, gerar, *args, ao_lote=None, ao_concluir=None, chave=None):
+        """Leitura com cursor no servidor: gerar(con, *args) produz lotes de linhas, entregues
+        sem guardar o resultado inteiro em memória. ao_concluir é chamado sem argumentos."""
+        self.executar(painel, lambda con: gerar(con, *args), ao_concluir and (lambda _: ao_concluir()),
+                      chave, ao_lote=ao_lote)
+
+    def buscar_todas(self, con, query, params=None):
+        return repositorio.buscar_todas(con, query, params)
+
+    def mostrar_erro_banco(self, erro):
+        messagebox.showerror('Erro', str(erro))
+
     def validar_entrada(self, valor, tipo='texto'):
         """Função utilitária para validação de entradas"""
         if tipo == 'texto':
@@ -877,38 +1443,17 @@ class MiniEscolaApp(tk.Tk):
             elif len(valor) > 50:
                 return False
             return valor.strip()
-        elif tipo == 'trabalho':
-            try:
-                v = float(valor.replace(',', '.'))
-                return 0 <= v <= 5
-            except:
-                return False
-        elif tipo == 'simulado':
-            try:
-                v = float(valor.replace(',', '.'))
-                return 0 <= v <= 1
-            except:
-                return False
-        elif tipo == 'prova':
+        else:
+            # Faixas de trabalho, simulado e prova compartilhadas com a importação
             try:
-                v = float(valor.replace(',', '.'))
-                return 0 <= v <= 5
-            except:
+                return converter_nota(valor, tipo) is not None
+            except ValueError:
                 return False
 
-    def operacao_banco(self, query, params=None, commit=True):
-        """Função utilitária para operações no banco de dados"""
-        cur = self.con.cursor()
-        try:
-            cur.execute(query, params or ())
-            if commit:
-                self.con.commit()
-            return True
-        except Exception as e:
-            if commit:
-                self.con.rollback()
-            messagebox.showerror('Erro', str(e))
-            return False
+    def operacao_banco(self, painel, gravar, *args, ao_concluir=None):
+        """Função utilitária para gravações: executa gravar(con, *args) em uma transação;
+        ao_concluir (sem argumentos) é chamado apenas se ela for confirmada."""
+        self.executar(painel, lambda con: gravar(con, *args), ao_concluir and (lambda _: ao_concluir()))
 
     def carregar_notas_edicao(self, event=None):
         a = self.combo_aluno.get().split(':')[0] if self.combo_aluno.get() else None
@@ -920,9 +1465,10 @@ class MiniEscolaApp(tk.Tk):
             self.entrada_sim2.delete(0, tk.END)
             self.entrada_prova.delete(0, tk.END)
             return
-        cur = self.con.cursor()
-        cur.execute('SELECT trabalho, simulado1, simulado2, prova FROM notas WHERE aluno_id=%s AND materia_id=%s', (a, m))
-        resultado = cur.fetchone()
+        self.consultar('notas', repositorio.nota_edicao, a, m, ao_concluir=self.preencher_notas_edicao,
+                       chave='notas_edicao')
+
+    def preencher_notas_edicao(self, resultado):
         # Preenche campos se houver nota, senão limpa
         if resultado:
             t, s1, s2, p = resultado
@@ -945,6 +1491,6 @@ class MiniEscolaApp(tk.Tk):
         self.after(tempo, lambda: self.status_label.config(text='', background='#f5f5f5', foreground='green'))
 
 if __name__ == '__main__':
-    app = MiniEscolaApp()
+    app = MiniEscolaApp(instantaneo=caminho_padrao())
     app.mainloop()
 
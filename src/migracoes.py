@@ -0,0 +1,338 @@
+from collections import namedtuple
+from psycopg2 import errors
+
+# Índice criado com CREATE INDEX CONCURRENTLY (fora de transação, sem bloquear escritas)
+Indice = namedtuple('Indice', ['nome', 'definicao', 'unico'], defaults=[False])
+
+# Tentativas de criar um índice único quando a construção encontra duplicatas gravadas
+# depois dos comandos que as removeram (ver aplicar_migracao)
+TENTATIVAS_INDICE_UNICO = 3
+
+# Chave do advisory lock que impede duas instâncias de migrarem ao mesmo tempo
+CHAVE_TRAVA_MIGRACAO = 7310001
+
+# Agregados das notas comuns às visões de estatísticas: médias de cada componente,
+# total em cada status e a distribuição da nota final em faixas de 2 pontos
+AGREGADOS_NOTAS = """
+    count(*) AS notas,
+    round(avg(n.trabalho), 2) AS media_trabalho,
+    round(avg(n.simulado1), 2) AS media_simulado1,
+    round(avg(n.simulado2), 2) AS media_simulado2,
+    round(avg(n.prova), 2) AS media_prova,
+    round(avg(n.nota_final), 2) AS media_final,
+    count(*) FILTER (WHERE n.status = 'Aprovado') AS aprovados,
+    count(*) FILTER (WHERE n.status = 'Reprovado') AS reprovados,
+    count(*) FILTER (WHERE n.status = 'Pendente') AS pendentes,
+    ARRAY[
+        count(*) FILTER (WHERE n.nota_final < 2),
+        count(*) FILTER (WHERE n.nota_final >= 2 AND n.nota_final < 4),
+        count(*) FILTER (WHERE n.nota_final >= 4 AND n.nota_final < 6),
+        count(*) FILTER (WHERE n.nota_final >= 6 AND n.nota_final < 8),
+        count(*) FILTER (WHERE n.nota_final >= 8)
+    ] AS faixas
+"""
+
+# Tabelas com contador de versão (migração 7)
+TABELAS_VERSIONADAS = ('cursos', 'materias', 'alunos', 'curso_materia', 'notas')
+
+# Migrações em ordem: (versão, descrição, passos). Cada passo é um comando SQL ou um
+# Indice. Migrações com índices rodam em autocommit, um passo por vez; as demais
+# rodam em uma única transação junto com o registro da versão.
+MIGRACOES = [
+    (1, 'Tabelas iniciais', [
+        """
+        CREATE TABLE IF NOT EXISTS cursos (
+            id SERIAL PRIMARY KEY,
+            nome VARCHAR(50)
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS materias (
+            id SERIAL PRIMARY KEY,
+            nome VARCHAR(50)
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS curso_materia (
+            curso_id INTEGER REFERENCES cursos(id),
+            materia_id INTEGER REFERENCES materias(id),
+            PRIMARY KEY(curso_id, materia_id)
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS alunos (
+            id SERIAL PRIMARY KEY,
+            nome VARCHAR(100),
+            curso_id INTEGER REFERENCES cursos(id)
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS notas (
+            id SERIAL PRIMARY KEY,
+            aluno_id INTEGER REFERENCES alunos(id),
+            materia_id INTEGER REFERENCES materias(id),
+            trabalho DECIMAL(4,2) CHECK (trabalho >= 0 AND trabalho <= 5),
+            simulado1 DECIMAL(4,2) CHECK (simulado1 >= 0 AND simulado1 <= 1),
+            simulado2 DECIMAL(4,2) CHECK (simulado2 >= 0 AND simulado2 <= 1),
+            prova DECIMAL(4,2) CHECK (prova >= 0 AND prova <= 5)
+        )
+        """,
+    ]),
+    (2, 'Índices das chaves estrangeiras usadas em buscas e remoções', [
+        Indice('idx_notas_aluno', 'notas (aluno_id)'),
+        Indice('idx_notas_materia', 'notas (materia_id)'),
+        Indice('idx_alunos_curso', 'alunos (curso_id)'),
+        Indice('idx_curso_materia_materia', 'curso_materia (materia_id)'),
+    ]),
+    (3, 'Uma única nota por aluno e matéria', [
+        # Mantém apenas a nota mais recente de cada par duplicado. Em autocommit, a remoção
+        # é confirmada antes de o índice começar a ser construído, e uma versão antiga da
+        # aplicação ainda pode gravar um par repetido nesse intervalo: a construção falha
+        # e deixa o índice inválido. aplicar_migracao então descarta o índice, repete a
+        # remoção e tenta de novo
+        """
+        DELETE FROM notas n USING notas recente
+        WHERE n.aluno_id = recente.aluno_id AND n.materia_id = recente.materia_id
+          AND n.id < recente.id
+        """,
+        Indice('notas_aluno_materia_key', 'notas (aluno_id, materia_id)', unico=True),
+        """
+        DO $$ BEGIN
+            IF NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conname = 'notas_aluno_materia_key') THEN
+                ALTER TABLE notas ADD CONSTRAINT notas_aluno_materia_key
+                    UNIQUE USING INDEX notas_aluno_materia_key;
+            END IF;
+        END $$
+        """,
+        # O índice único começa por aluno_id e já atende as buscas por aluno
+        'DROP INDEX CONCURRENTLY IF EXISTS idx_notas_aluno',
+    ]),
+    (4, 'Remoções em cascata pelas chaves estrangeiras', [
+        # As restrições antigas já garantiam os dados, então as novas entram como NOT VALID
+        # e são validadas em seguida, sem reescrever as tabelas. A validação roda na mesma
+        # transação: a trava ACCESS EXCLUSIVE do ALTER TABLE, que bloqueia leituras e
+        # gravações, fica mantida enquanto as tabelas são lidas inteiras, até o commit
+        """
+        ALTER TABLE notas
+            DROP CONSTRAINT IF EXISTS notas_aluno_id_fkey,
+            ADD CONSTRAINT notas_aluno_id_fkey FOREIGN KEY (aluno_id)
+                REFERENCES alunos(id) ON DELETE CASCADE NOT VALID,
+            DROP CONSTRAINT IF EXISTS notas_materia_id_fkey,
+            ADD CONSTRAINT notas_materia_id_fkey FOREIGN KEY (materia_id)
+                REFERENCES materias(id) ON DELETE CASCADE NOT VALID
+        """,
+        """
+        ALTER TABLE curso_materia
+            DROP CONSTRAINT IF EXISTS curso_materia_curso_id_fkey,
+            ADD CONSTRAINT curso_materia_curso_id_fkey FOREIGN KEY (curso_id)
+                REFERENCES cursos(id) ON DELETE CASCADE NOT VALID,
+            DROP CONSTRAINT IF EXISTS curso_materia_materia_id_fkey,
+            ADD CONSTRAINT curso_materia_materia_id_fkey FOREIGN KEY (materia_id)
+                REFERENCES materias(id) ON DELETE CASCADE NOT VALID
+        """,
+        """
+        ALTER TABLE alunos
+            DROP CONSTRAINT IF EXISTS alunos_curso_id_fkey,
+            ADD CONSTRAINT alunos_curso_id_fkey FOREIGN KEY (curso_id)
+                REFERENCES cursos(id) ON DELETE SET NULL NOT VALID
+        """,
+        'ALTER TABLE notas VALIDATE CONSTRAINT notas_aluno_id_fkey',
+        'ALTER TABLE notas VALIDATE CONSTRAINT notas_materia_id_fkey',
+        'ALTER TABLE curso_materia VALIDATE CONSTRAINT curso_materia_curso_id_fkey',
+        'ALTER TABLE curso_materia VALIDATE CONSTRAINT curso_materia_materia_id_fkey',
+        'ALTER TABLE alunos VALIDATE CONSTRAINT alunos_curso_id_fkey',
+    ]),
+    (5, 'Nota final e status calculados pelo banco', [
+        # Regra de aprovação: soma limitada a 10; Pendente sem trabalho ou prova;
+        # Aprovado acima de 6. Colunas geradas não podem usar umas às outras,
+        # por isso a soma se repete no status.
+        # Custo: acrescentar uma coluna gerada STORED reescreve a tabela notas inteira
+        # (cada linha ganha os valores calculados) e refaz os seus índices, sob trava
+        # ACCESS EXCLUSIVE. Leituras e gravações de notas ficam paradas até o commit,
+        # por um tempo proporcional ao tamanho da tabela: em bancos grandes, aplicar
+        # esta migração com a aplicação fora do ar.
+        """
+        ALTER TABLE notas
+            ADD COLUMN IF NOT EXISTS nota_final DECIMAL(4,2) GENERATED ALWAYS AS (
+                LEAST(COALESCE(trabalho, 0) + COALESCE(simulado1, 0)
+                      + COALESCE(simulado2, 0) + COALESCE(prova, 0), 10)
+            ) STORED,
+            ADD COLUMN IF NOT EXISTS status VARCHAR(10) GENERATED ALWAYS AS (
+                CASE
+                    WHEN trabalho IS NULL OR prova IS NULL THEN 'Pendente'
+                    WHEN LEAST(COALESCE(trabalho, 0) + COALESCE(simulado1, 0)
+                               + COALESCE(simulado2, 0) + COALESCE(prova, 0), 10) > 6 THEN 'Aprovado'
+                    ELSE 'Reprovado'
+                END
+            ) STORED
+        """,
+        # Filtro de alunos por status na lista de notas
+        Indice('idx_notas_status', 'notas (status, aluno_id)'),
+    ]),
+    (6, 'Visões materializadas de estatísticas por curso e por matéria', [
+        # Alunos sem curso ficam de fora. Os índices únicos permitem o
+        # REFRESH ... CONCURRENTLY, que não bloqueia a leitura das visões
+        f"""
+        CREATE MATERIALIZED VIEW IF NOT EXISTS estatisticas_curso AS
+        SELECT a.curso_id, count(DISTINCT a.id) AS alunos, {AGREGADOS_NOTAS}
+        FROM notas n
+        JOIN alunos a ON a.id = n.aluno_id
+        WHERE a.curso_id IS NOT NULL
+        GROUP BY a.curso_id
+        """,
+        'CREATE UNIQUE INDEX IF NOT EXISTS estatisticas_curso_key ON estatisticas_curso (curso_id)',
+        f"""
+        CREATE MATERIALIZED VIEW IF NOT EXISTS estatisticas_materia AS
+        SELECT a.curso_id, n.materia_id, {AGREGADOS_NOTAS}
+        FROM notas n
+        JOIN alunos a ON a.id = n.aluno_id
+        WHERE a.curso_id IS NOT NULL
+        GROUP BY a.curso_id, n.materia_id
+        """,
+        'CREATE UNIQUE INDEX IF NOT EXISTS estatisticas_materia_key ON estatisticas_materia (curso_id, materia_id)',
+    ]),
+    (7, 'Contadores de versão das tabelas', [
+        # Cada comando que altera uma tabela incrementa a versão dela: comparar as versões
+        # diz, com uma consulta barata, se a cópia local das listas ainda vale. O UPDATE
+        # do contador travava gravações simultâneas na mesma tabela; a migração 8 troca
+        # o gatilho por um registro de alterações sem essa trava
+        """
+        CREATE TABLE IF NOT EXISTS versoes_tabela (
+            tabela TEXT PRIMARY KEY,
+            versao BIGINT NOT NULL DEFAULT 0
+        )
+        """,
+        'INSERT INTO versoes_tabela(tabela) VALUES '
+        + ', '.join(f"('{tabela}')" for tabela in TABELAS_VERSIONADAS) + ' ON CONFLICT DO NOTHING',
+        """
+        CREATE OR REPLACE FUNCTION incrementar_versao_tabela() RETURNS trigger AS $$
+        BEGIN
+            UPDATE versoes_tabela SET versao = versao + 1 WHERE tabela = TG_TABLE_NAME;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+        """,
+        *(comando for tabela in TABELAS_VERSIONADAS for comando in (
+            f'DROP TRIGGER IF EXISTS versao_{tabela} ON {tabela}',
+            f"""
+            CREATE TRIGGER versao_{tabela} AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON {tabela}
+            FOR EACH STATEMENT EXECUTE FUNCTION incrementar_versao_tabela()
+            """)),
+    ]),
+    (8, 'Registro de alterações das tabelas', [
+        # O gatilho passa a só acrescentar uma linha ao registro, sem disputar uma linha
+        # comum entre transações. A versão de uma tabela é o contador compactado somado
+        # às linhas do registro (repositorio.versoes_tabelas). Cada linha fica visível no
+        # commit de quem a gravou, então a soma sobe exatamente quando uma alteração é
+        # confirmada, em qualquer ordem de commit (o que não vale para max(id) ou xmin)
+        """
+        CREATE TABLE IF NOT EXISTS alteracoes_tabela (
+            id BIGSERIAL PRIMARY KEY,
+            tabela TEXT NOT NULL
+        )
+        """,
+        """
+        CREATE OR REPLACE FUNCTION incrementar_versao_tabela() RETURNS trigger AS $$
+        BEGIN
+            INSERT INTO alteracoes_tabela(tabela) VALUES (TG_TABLE_NAME);
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+        """,
+    ]),
+    (9, 'Validação das chaves estrangeiras da migração 4', [
+        # A migração 4 já valida as chaves, então aqui não há o que fazer: VALIDATE de uma
+        # restrição válida retorna sem ler a tabela. Fica como conferência, já que bancos
+        # podem ter aplicado uma versão da migração 4 que deixava as chaves NOT VALID
+        'ALTER TABLE notas VALIDATE CONSTRAINT notas_aluno_id_fkey',
+        'ALTER TABLE notas VALIDATE CONSTRAINT notas_materia_id_fkey',
+        'ALTER TABLE curso_materia VALIDATE CONSTRAINT curso_materia_curso_id_fkey',
+        'ALTER TABLE curso_materia VALIDATE CONSTRAINT curso_materia_materia_id_fkey',
+        'ALTER TABLE alunos VALIDATE CONSTRAINT alunos_curso_id_fkey',
+    ]),
+]
+
+VERSAO_ATUAL = MIGRACOES[-1][0]
+
+def versao_banco(cur):
+    """Versão do esquema registrada no banco (0 se nunca foi migrado)"""
+    cur.execute('SELECT max(versao) FROM schema_version')
+    return cur.fetchone()[0] or 0
+
+def aplicar_migracoes(con):
+    """Leva o esquema até VERSAO_ATUAL; se já estiver atualizado, custa uma consulta"""
+    cur = con.cursor()
+    try:
+        versao = versao_banco(cur)
+    except errors.UndefinedTable:
+        versao = 0
+    con.rollback()
+    if versao >= VERSAO_ATUAL:
+        return
+    cur.execute('SELECT pg_advisory_lock(%s)', (CHAVE_TRAVA_MIGRACAO,))
+    try:
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS schema_version (
+                versao INTEGER PRIMARY KEY,
+                descricao TEXT,
+                aplicada_em TIMESTAMP DEFAULT now()
+            )
+        """)
+        con.commit()
+        # Outra instância pode ter migrado enquanto esperávamos a trava
+        versao = versao_banco(cur)
+        con.commit()
+        for numero, descricao, passos in MIGRACOES:
+            if numero > versao:
+                aplicar_migracao(con, numero, descricao, passos)
+    finally:
+        con.rollback()
+        cur.execute('SELECT pg_advisory_unlock(%s)', (CHAVE_TRAVA_MIGRACAO,))
+        con.commit()
+
+def aplicar_migracao(con, numero, descricao, passos):
+    cur = con.cursor()
+    if any(isinstance(passo, Indice) for passo in passos):
+        con.autocommit = True
+        try:
+            preparo = []  # comandos desde o índice anterior, que preparam os dados para o próximo
+            for passo in passos:
+                if isinstance(passo, Indice):
+                    criar_indice_repetindo_preparo(cur, passo, preparo)
+                    preparo = []
+                else:
+                    cur.execute(passo)
+                    preparo.append(passo)
+        finally:
+            con.autocommit = False
+    else:
+        for passo in passos:
+            cur.execute(passo)
+    cur.execute('INSERT INTO schema_version(versao, descricao) VALUES(%s, %s)', (numero, descricao))
+    con.commit()
+
+def criar_indice_repetindo_preparo(cur, indice, preparo):
+    """Cria o índice; se for único e falhar por duplicatas, repete o preparo e tenta de novo"""
+    for tentativa in range(1, TENTATIVAS_INDICE_UNICO + 1):
+        try:
+            criar_indice_concorrente(cur, indice)
+            return
+        except errors.UniqueViolation:
+            # O índice inválido que ficou é descartado por criar_indice_concorrente
+            if not indice.unico or tentativa == TENTATIVAS_INDICE_UNICO:
+                raise
+            for comando in preparo:
+                cur.execute(comando)
+
+def criar_indice_concorrente(cur, indice):
+    # Um CREATE INDEX CONCURRENTLY interrompido deixa o índice inválido para trás;
+    # ele é descartado para que o IF NOT EXISTS não o aceite como pronto
+    cur.execute("""
+        SELECT 1 FROM pg_index i
+        JOIN pg_class c ON c.oid = i.indexrelid
+        WHERE c.relname = %s AND NOT i.indisvalid
+    """, (indice.nome,))
+    if cur.fetchone():
+        cur.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {indice.nome}')
+    unico = 'UNIQUE ' if indice.unico else ''
+    cur.execute(f'CREATE {unico}INDEX CONCURRENTLY IF NOT EXISTS {indice.nome} ON {indice.definicao}')
@@ -1,200 +1,124 @@
-from main import inicializar_banco
+import argparse
+import random
+import time
+from banco import copiar, inicializar_banco, linha_copy
+from repositorio import atualizar_estatisticas
 
-def inserir_dados_mock():
-    # Conectar ao banco de dados
-    con = inicializar_banco()
+# Bases para os nomes gerados; combinações repetidas recebem um número
+NOMES = ['João', 'Maria', 'Pedro', 'Ana', 'Carlos', 'Juliana', 'Lucas', 'Fernanda',
+         'Rafael', 'Beatriz', 'Gabriel', 'Larissa', 'Mateus', 'Camila', 'Felipe', 'Letícia']
+SOBRENOMES = ['Silva', 'Oliveira', 'Santos', 'Costa', 'Ferreira', 'Lima', 'Souza', 'Pereira',
+              'Almeida', 'Ribeiro', 'Carvalho', 'Gomes', 'Martins', 'Rocha', 'Barbosa', 'Araújo']
+CURSOS = ['Ciência da Computação', 'Engenharia de Software', 'Sistemas de Informação',
+          'Análise e Desenvolvimento de Sistemas', 'Engenharia de Computação', 'Redes de Computadores']
+MATERIAS = ['Programação', 'Banco de Dados', 'Redes de Computadores', 'Engenharia de Software',
+            'Algoritmos', 'Estrutura de Dados', 'Sistemas Operacionais', 'Inteligência Artificial',
+            'Desenvolvimento Web', 'Segurança da Informação', 'Cálculo', 'Compiladores']
+
+def nome_numerado(base, i):
+    """Usa os nomes base em sequência e numera as voltas seguintes (ex.: 'Cálculo 2')"""
+    nome = base[i % len(base)]
+    volta = i // len(base)
+    return f'{nome} {volta + 1}' if volta else nome
+
+def suspender_chaves_estrangeiras(cur, tabela):
+    """Remove as chaves estrangeiras da tabela e devolve suas definições"""
+    cur.execute("""
+        SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint
+        WHERE conrelid = %s::regclass AND contype = 'f'
+    """, (tabela,))
+    chaves = cur.fetchall()
+    for nome, _ in chaves:
+        cur.execute(f'ALTER TABLE {tabela} DROP CONSTRAINT {nome}')
+    return chaves
+
+def restaurar_chaves_estrangeiras(cur, tabela, chaves):
+    for nome, definicao in chaves:
+        cur.execute(f'ALTER TABLE {tabela} ADD CONSTRAINT {nome} {definicao}')
+
+def inserir_dados_mock(cursos=4, materias=10, materias_por_curso=7, alunos=8,
+                       densidade=0.9, nulos=0.15, semente=42, con=None):
+    """Substitui os dados do banco por um conjunto sintético reproduzível.
+
+    Cada aluno recebe nota em cada matéria do seu curso com probabilidade
+    `densidade`, e cada componente da nota fica vazio com probabilidade `nulos`.
+    As linhas são geradas sob demanda e enviadas com COPY FROM STDIN.
+    """
+    rng = random.Random(semente)
+    fechar = con is None
+    if con is None:
+        con = inicializar_banco()
     cur = con.cursor()
-    
-    # Limpar dados existentes
-    cur.execute('DELETE FROM notas')
-    cur.execute('DELETE FROM alunos')
-    cur.execute('DELETE FROM curso_materia')
-    cur.execute('DELETE FROM materias')
-    cur.execute('DELETE FROM cursos')
-    
-    # Inserir cursos
-    cursos = [
-        ('Ciência da Computação',),
-        ('Engenharia de Software',),
-        ('Sistemas de Informação',),
-        ('Análise e Desenvolvimento de Sistemas',)
-    ]
-    
-    # Inserir cursos um por um para obter os IDs
-    curso_ids = []
-    for curso in cursos:
-        cur.execute('INSERT INTO cursos(nome) VALUES(%s) RETURNING id', curso)
-        curso_ids.append(cur.fetchone()[0])
-    
-    # Inserir matérias
-    materias = [
-        ('Programação I',),
-        ('Banco de Dados',),
-        ('Redes de Computadores',),
-        ('Engenharia de Software',),
-        ('Algoritmos',),
-        ('Estrutura de Dados',),
-        ('Sistemas Operacionais',),
-        ('Inteligência Artificial',),
-        ('Desenvolvimento Web',),
-        ('Segurança da Informação',)
-    ]
-    
-    # Inserir matérias uma por uma para obter os IDs
-    materia_ids = []
-    for materia in materias:
-        cur.execute('INSERT INTO materias(nome) VALUES(%s) RETURNING id', materia)
-        materia_ids.append(cur.fetchone()[0])
-    
-    # Associar matérias aos cursos
-    # Ciência da Computação
-    for materia_id in materia_ids[:8]:  # Todas as matérias exceto as duas últimas
-        cur.execute('INSERT INTO curso_materia(curso_id, materia_id) VALUES(%s, %s)', 
-                   (curso_ids[0], materia_id))
-    
-    # Engenharia de Software
-    for materia_id in [materia_ids[0], materia_ids[1], materia_ids[3], materia_ids[4], 
-                      materia_ids[5], materia_ids[8], materia_ids[9]]:
-        cur.execute('INSERT INTO curso_materia(curso_id, materia_id) VALUES(%s, %s)', 
-                   (curso_ids[1], materia_id))
-    
-    # Sistemas de Informação
-    for materia_id in [materia_ids[0], materia_ids[1], materia_ids[3], materia_ids[4], 
-                      materia_ids[5], materia_ids[8], materia_ids[9]]:
-        cur.execute('INSERT INTO curso_materia(curso_id, materia_id) VALUES(%s, %s)', 
-                   (curso_ids[2], materia_id))
-    
-    # Análise e Desenvolvimento de Sistemas
-    for materia_id in [materia_ids[0], materia_ids[1], materia_ids[3], materia_ids[4], 
-                      materia_ids[5], materia_ids[8], materia_ids[9]]:
-        cur.execute('INSERT INTO curso_materia(curso_id, materia_id) VALUES(%s, %s)', 
-                   (curso_ids[3], materia_id))
-    
-    # Inserir alunos
-    alunos = [
-        ('João Silva', curso_ids[0]),
-        ('Maria Oliveira', curso_ids[0]),
-        ('Pedro Santos', curso_ids[1]),
-        ('Ana Costa', curso_ids[1]),
-        ('Carlos Ferreira', curso_ids[2]),
-        ('Juliana Lima', curso_ids[2]),
-        ('Lucas Souza', curso_ids[3]),
-        ('Fernanda Pereira', curso_ids[3])
-    ]
-    
-    # Inserir alunos um por um para obter os IDs
-    aluno_ids = []
-    for aluno in alunos:
-        cur.execute('INSERT INTO alunos(nome, curso_id) VALUES(%s, %s) RETURNING id', aluno)
-        aluno_ids.append(cur.fetchone()[0])
-    
-    # Inserir notas
-    # João Silva - Ciência da Computação
-    notas_joao = [
-        (aluno_ids[0], materia_ids[0], 4.5, 1.0, 1.0, 4.5),  # Aprovado
-        (aluno_ids[0], materia_ids[1], 2.0, None, None, 3.0),  # Reprovado
-        (aluno_ids[0], materia_ids[2], 3.0, 1.0, None, 2.0),  # Reprovado
-        (aluno_ids[0], materia_ids[3], 4.0, None, 1.0, 4.5),  # Aprovado
-        (aluno_ids[0], materia_ids[4], 5.0, 1.0, 1.0, None),  # Prova ausente
-        (aluno_ids[0], materia_ids[5], None, 1.0, 1.0, 5.0),  # Trabalho ausente
-        (aluno_ids[0], materia_ids[6], 4.0, None, None, None),  # Só trabalho
-        (aluno_ids[0], materia_ids[7], None, None, None, 5.0)   # Só prova
-    ]
-    
-    # Maria Oliveira - Ciência da Computação
-    notas_maria = [
-        (aluno_ids[1], materia_ids[0], 5.0, 1.0, 1.0, 5.0),  # Aprovado
-        (aluno_ids[1], materia_ids[1], 2.0, None, 1.0, 2.0),  # Reprovado
-        (aluno_ids[1], materia_ids[2], 4.0, 1.0, None, 5.0),  # Aprovado
-        (aluno_ids[1], materia_ids[3], 5.0, None, None, 5.0),  # Aprovado
-        (aluno_ids[1], materia_ids[4], None, 1.0, 1.0, 5.0),  # Trabalho ausente
-        (aluno_ids[1], materia_ids[5], 4.5, 1.0, None, None),  # Prova ausente
-        (aluno_ids[1], materia_ids[6], None, None, 1.0, 2.0),  # Reprovado
-        (aluno_ids[1], materia_ids[7], 5.0, None, None, None)   # Só trabalho
-    ]
-    
-    # Pedro Santos - Engenharia de Software
-    notas_pedro = [
-        (aluno_ids[2], materia_ids[0], 3.5, 1.0, 1.0, 4.5),  # Aprovado
-        (aluno_ids[2], materia_ids[1], 2.0, None, 1.0, 2.0),  # Reprovado
-        (aluno_ids[2], materia_ids[3], 5.0, 1.0, None, 5.0),  # Aprovado
-        (aluno_ids[2], materia_ids[4], None, 1.0, 1.0, 5.0),  # Trabalho ausente
-        (aluno_ids[2], materia_ids[5], 4.5, None, None, 4.5),  # Aprovado
-        (aluno_ids[2], materia_ids[8], 2.0, 1.0, 1.0, 2.0),  # Reprovado
-        (aluno_ids[2], materia_ids[9], None, None, None, 5.0)   # Só prova
-    ]
-    
-    # Ana Costa - Engenharia de Software
-    notas_ana = [
-        (aluno_ids[3], materia_ids[0], 5.0, 1.0, 1.0, 5.0),
-        (aluno_ids[3], materia_ids[1], 4.0, None, 1.0, 4.0),
-        (aluno_ids[3], materia_ids[3], 5.0, 1.0, None, 5.0),
-        (aluno_ids[3], materia_ids[4], None, 1.0, 1.0, 5.0),
-        (aluno_ids[3], materia_ids[5], 4.5, None, None, 4.5),
-        (aluno_ids[3], materia_ids[8], 5.0, 1.0, 1.0, None),
-        (aluno_ids[3], materia_ids[9], None, None, None, 5.0)
-    ]
-    
-    # Carlos Ferreira - Sistemas de Informação
-    notas_carlos = [
-        (aluno_ids[4], materia_ids[0], 4.0, 1.0, 1.0, 4.0),
-        (aluno_ids[4], materia_ids[1], 5.0, None, 1.0, 5.0),
-        (aluno_ids[4], materia_ids[3], 4.5, 1.0, None, 4.5),
-        (aluno_ids[4], materia_ids[4], None, 1.0, 1.0, 5.0),
-        (aluno_ids[4], materia_ids[5], 4.0, None, None, 4.0),
-        (aluno_ids[4], materia_ids[8], 5.0, 1.0, 1.0, None),
-        (aluno_ids[4], materia_ids[9], None, None, None, 5.0)
-    ]
-    
-    # Juliana Lima - Sistemas de Informação
-    notas_juliana = [
-        (aluno_ids[5], materia_ids[0], 5.0, 1.0, 1.0, 5.0),
-        (aluno_ids[5], materia_ids[1], 4.5, None, 1.0, 4.5),
-        (aluno_ids[5], materia_ids[3], 4.0, 1.0, None, 5.0),
-        (aluno_ids[5], materia_ids[4], None, 1.0, 1.0, 5.0),
-        (aluno_ids[5], materia_ids[5], 4.5, None, None, 4.5),
-        (aluno_ids[5], materia_ids[8], 5.0, 1.0, 1.0, None),
-        (aluno_ids[5], materia_ids[9], None, None, None, 5.0)
-    ]
-    
-    # Lucas Souza - Análise e Desenvolvimento de Sistemas
-    notas_lucas = [
-        (aluno_ids[6], materia_ids[0], 4.0, 1.0, 1.0, 4.0),
-        (aluno_ids[6], materia_ids[1], 5.0, None, 1.0, 5.0),
-        (aluno_ids[6], materia_ids[3], 4.5, 1.0, None, 4.5),
-        (aluno_ids[6], materia_ids[4], None, 1.0, 1.0, 5.0),
-        (aluno_ids[6], materia_ids[5], 4.0, None, None, 4.0),
-        (aluno_ids[6], materia_ids[8], 5.0, 1.0, 1.0, None),
-        (aluno_ids[6], materia_ids[9], None, None, None, 5.0)
-    ]
-    
-    # Fernanda Pereira - Análise e Desenvolvimento de Sistemas
-    notas_fernanda = [
-        (aluno_ids[7], materia_ids[0], 5.0, 1.0, 1.0, 5.0),
-        (aluno_ids[7], materia_ids[1], 4.5, None, 1.0, 4.5),
-        (aluno_ids[7], materia_ids[3], 4.0, 1.0, None, 5.0),
-        (aluno_ids[7], materia_ids[4], None, 1.0, 1.0, 5.0),
-        (aluno_ids[7], materia_ids[5], 4.5, None, None, 4.5),
-        (aluno_ids[7], materia_ids[8], 5.0, 1.0, 1.0, None),
-        (aluno_ids[7], materia_ids[9], None, None, None, 5.0)
-    ]
-    
-    # Inserir todas as notas
-    todas_notas = (notas_joao + notas_maria + notas_pedro + notas_ana + 
-                  notas_carlos + notas_juliana + notas_lucas + notas_fernanda)
-    
-    # Inserir notas uma por uma
-    for nota in todas_notas:
-        cur.execute('''
-            INSERT INTO notas(aluno_id, materia_id, trabalho, simulado1, simulado2, prova) 
-            VALUES(%s, %s, %s, %s, %s, %s)
-        ''', nota)
-    
+    materias_por_curso = min(materias_por_curso, materias)
+
+    # Limpar dados existentes (os ids recomeçam para que a semente gere sempre o mesmo banco)
+    cur.execute('TRUNCATE notas, alunos, curso_materia, materias, cursos RESTART IDENTITY')
+
+    copiar(cur, 'cursos', ['id', 'nome'],
+           (linha_copy(i + 1, nome_numerado(CURSOS, i)) for i in range(cursos)))
+    copiar(cur, 'materias', ['id', 'nome'],
+           (linha_copy(i + 1, nome_numerado(MATERIAS, i)) for i in range(materias)))
+
+    # Currículo de cada curso: amostra fixa de matérias
+    curriculos = [sorted(rng.sample(range(1, materias + 1), materias_por_curso)) for _ in range(cursos)]
+    copiar(cur, 'curso_materia', ['curso_id', 'materia_id'],
+           (linha_copy(c + 1, m) for c, curriculo in enumerate(curriculos) for m in curriculo))
+
+    curso_aluno = [rng.randrange(cursos) for _ in range(alunos)] if cursos else [None] * alunos
+    copiar(cur, 'alunos', ['id', 'nome', 'curso_id'], (
+        linha_copy(a + 1, f'{rng.choice(NOMES)} {rng.choice(SOBRENOMES)}',
+                   None if curso_aluno[a] is None else curso_aluno[a] + 1)
+        for a in range(alunos)))
+
+    sortear = rng.random
+    def componente(maximo):
+        return '\\N' if sortear() < nulos else f'{sortear() * maximo:.2f}'
+
+    def gerar_notas():
+        nota_id = 0
+        for a in range(alunos):
+            if curso_aluno[a] is None:
+                continue
+            for m in curriculos[curso_aluno[a]]:
+                if sortear() >= densidade:
+                    continue
+                nota_id += 1
+                yield f'{nota_id}\t{a + 1}\t{m}\t{componente(5)}\t{componente(1)}\t{componente(1)}\t{componente(5)}\n'
+    # Checar as chaves estrangeiras linha a linha domina o tempo da carga; elas são
+    # recriadas ao final, validando todas as notas de uma vez
+    chaves = suspender_chaves_estrangeiras(cur, 'notas')
+    copiar(cur, 'notas', ['id', 'aluno_id', 'materia_id', 'trabalho', 'simulado1', 'simulado2', 'prova'],
+           gerar_notas())
+    restaurar_chaves_estrangeiras(cur, 'notas', chaves)
+
+    # Ajusta as sequências aos ids inseridos explicitamente
+    totais = {}
+    for tabela in ('cursos', 'materias', 'alunos', 'notas'):
+        cur.execute(f"SELECT setval(pg_get_serial_sequence('{tabela}', 'id'), coalesce(max(id), 0) + 1, false), "
+                    f"count(*) FROM {tabela}")
+        totais[tabela] = cur.fetchone()[1]
+    atualizar_estatisticas(con)
+
     # Commit das alterações
     con.commit()
-    con.close()
-    
-    print("Dados de exemplo inseridos com sucesso!")
+    if fechar:
+        con.close()
+    return totais
 
 if __name__ == '__main__':
-    inserir_dados_mock() 
\ No newline at end of file
+    parser = argparse.ArgumentParser(description='Gera dados sintéticos para o MiniEscola (substitui os dados atuais).')
+    parser.add_argument('--cursos', type=int, default=4)
+    parser.add_argument('--materias', type=int, default=10, help='tamanho do catálogo de matérias')
+    parser.add_argument('--materias-por-curso', type=int, default=7)
+    parser.add_argument('--alunos', type=int, default=8)
+    parser.add_argument('--densidade', type=float, default=0.9,
+                        help='probabilidade de um aluno ter nota em cada matéria do curso')
+    parser.add_argument('--nulos', type=float, default=0.15,
+                        help='probabilidade de cada componente da nota ficar vazio')
+    parser.add_argument('--semente', type=int, default=42)
+    args = parser.parse_args()
+    inicio = time.perf_counter()
+    totais = inserir_dados_mock(args.cursos, args.materias, args.materias_por_curso, args.alunos,
+                                args.densidade, args.nulos, args.semente)
+    print(f"Dados de exemplo inseridos com sucesso em {time.perf_counter() - inicio:.1f}s: "
+          + ', '.join(f'{total} {tabela}' for tabela, total in totais.items()))
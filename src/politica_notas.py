@@ -0,0 +1,80 @@
+import argparse
+import time
+from collections import namedtuple
+import numpy as np
+import repositorio
+from banco import inicializar_banco
+
+COMPONENTES = ('trabalho', 'simulado1', 'simulado2', 'prova')
+
+# Códigos de status devolvidos por avaliar(), na ordem dos nomes em STATUS
+PENDENTE, REPROVADO, APROVADO = 0, 1, 2
+STATUS = np.array(['Pendente', 'Reprovado', 'Aprovado'])
+
+# Pesos na ordem de COMPONENTES; aprovação exige nota final acima de `aprovacao`
+PoliticaNotas = namedtuple('PoliticaNotas', ['pesos', 'limite', 'aprovacao', 'obrigatorios'],
+                           defaults=[(1, 1, 1, 1), 10, 6, ('trabalho', 'prova')])
+
+# A regra das colunas nota_final e status do banco (migração 5)
+POLITICA_ATUAL = PoliticaNotas()
+
+Simulacao = namedtuple('Simulacao', ['notas', 'atual', 'proposta', 'mudancas'])
+
+def avaliar(politica, notas):
+    """Calcula nota final e status de uma matriz (n, 4) de notas, com NaN nas vazias.
+
+    As contas são feitas em centésimos, como o DECIMAL(4,2) do banco: a soma
+    ponderada é arredondada para o centésimo (meio para cima) e limitada, e só
+    então comparada com a nota de aprovação. Devolve (nota_final, códigos de status).
+    """
+    notas = np.asarray(notas, dtype=float)
+    centesimos = np.rint(np.nan_to_num(notas) * 100)
+    soma = centesimos @ np.asarray(politica.pesos, dtype=float)
+    final = np.minimum(np.floor(soma + 0.5), politica.limite * 100)
+    obrigatorias = [COMPONENTES.index(componente) for componente in politica.obrigatorios]
+    pendente = np.isnan(notas[:, obrigatorias]).any(axis=1)
+    status = np.where(pendente, PENDENTE,
+                      np.where(final > politica.aprovacao * 100, APROVADO, REPROVADO))
+    return final / 100, status
+
+def resumo(status):
+    """Total de notas em cada status"""
+    return dict(zip(STATUS, np.bincount(status, minlength=len(STATUS)).tolist()))
+
+def carregar_notas(con, curso_id=None):
+    """Lê as notas (de um curso ou da escola) como (ids, matriz (n, 4) com NaN nas vazias)"""
+    lotes = [np.array(lote, dtype=float) for lote in repositorio.lotes_componentes_notas(con, curso_id)]
+    if not lotes:
+        return np.empty(0, dtype=np.int64), np.empty((0, len(COMPONENTES)))
+    tabela = np.concatenate(lotes)
+    return tabela[:, 0].astype(np.int64), tabela[:, 1:]
+
+def simular(notas, proposta, atual=POLITICA_ATUAL):
+    """Compara os status das notas na política atual e na proposta"""
+    _, status_atual = avaliar(atual, notas)
+    _, status_proposta = avaliar(proposta, notas)
+    return Simulacao(len(status_atual), resumo(status_atual), resumo(status_proposta),
+                     int(np.count_nonzero(status_atual != status_proposta)))
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Simula uma política de notas sobre as notas gravadas.')
+    parser.add_argument('--pesos', type=float, nargs=4, default=POLITICA_ATUAL.pesos,
+                        metavar=('TRABALHO', 'SIMULADO1', 'SIMULADO2', 'PROVA'))
+    parser.add_argument('--limite', type=float, default=POLITICA_ATUAL.limite, help='nota final máxima')
+    parser.add_argument('--aprovacao', type=float, default=POLITICA_ATUAL.aprovacao,
+                        help='aprovado com nota final acima deste valor')
+    parser.add_argument('--obrigatorios', nargs='*', choices=COMPONENTES, default=POLITICA_ATUAL.obrigatorios)
+    parser.add_argument('--curso', type=int, help='id do curso (padrão: toda a escola)')
+    args = parser.parse_args()
+    con = inicializar_banco()
+    inicio = time.perf_counter()
+    _, notas = carregar_notas(con, args.curso)
+    con.close()
+    lidas = time.perf_counter()
+    simulacao = simular(notas, PoliticaNotas(tuple(args.pesos), args.limite, args.aprovacao,
+                                             tuple(args.obrigatorios)))
+    fim = time.perf_counter()
+    print(f'{simulacao.notas} notas lidas em {lidas - inicio:.1f}s e avaliadas em {(fim - lidas) * 1000:.0f} ms')
+    for nome in STATUS:
+        print(f'  {nome:<10} {simulacao.atual[nome]:>9} -> {simulacao.proposta[nome]:>9}')
+    print(f'  {simulacao.mudancas} notas mudam de status')
@@ -0,0 +1,194 @@
+import itertools
+import logging
+import os
+import re
+import threading
+import time
+from collections import deque
+import psycopg2.extensions
+from dotenv import load_dotenv
+
+# Rastreamento das consultas: o cursor de todas as conexões abertas por conectar()
+# mede cada comando e acumula, por ação da interface e por SQL normalizado,
+# execuções, tempo e linhas. Comandos acima do limite vão para o log de lentas.
+
+load_dotenv()
+
+# Comandos mais demorados que isto (ms) entram no log de consultas lentas
+LIMITE_LENTA_MS = float(os.getenv('db_consulta_lenta_ms', '200'))
+
+# Com db_explicar_lentas=1, o log inclui o plano (EXPLAIN, sem executar de novo)
+EXPLICAR_LENTAS = os.getenv('db_explicar_lentas', '') not in ('', '0')
+
+# Consultas lentas mantidas para a janela de diagnóstico
+MAXIMO_LENTAS = 100
+
+# Comandos que aceitam EXPLAIN
+EXPLICAVEIS = ('SELECT', 'WITH', 'INSERT', 'UPDATE', 'DELETE', 'EXECUTE')
+
+log = logging.getLogger('miniescola.sql')
+
+# Ação da interface que originou as tarefas da thread atual
+contexto = threading.local()
+
+trava = threading.Lock()
+medicoes = {}  # (ação, sql normalizado) -> [execuções, segundos, maior tempo, linhas, lentas]
+lentas = deque(maxlen=MAXIMO_LENTAS)  # (número, hora, ação, ms, sql normalizado, plano)
+numeros_lenta = itertools.count(1)
+
+LITERAIS = re.compile(r"'(?:[^']|'')*'|(?<![\w$])\d+(?:\.\d+)?|%\(\w+\)s|%s|(?<=[(,])\s*NULL\b")
+TUPLAS_REPETIDAS = re.compile(r'(\([^()]*\))(?:\s*,\s*\([^()]*\))+')
+ESPACOS = re.compile(r'\s+')
+
+def normalizar_sql(sql):
+    """Texto do comando sem valores: literais e parâmetros viram ?, e listas de VALUES
+    e espaços são compactadas, para agrupar as execuções do mesmo comando"""
+    if isinstance(sql, bytes):
+        sql = sql.decode('utf-8', 'replace')
+    elif not isinstance(sql, str):
+        sql = str(sql)
+    sql = LITERAIS.sub('?', sql)
+    sql = ESPACOS.sub(' ', sql).strip()
+    return TUPLAS_REPETIDAS.sub(r'\1, ...', sql)
+
+def definir_acao(acao):
+    """Define a ação dos próximos comandos da thread e devolve a anterior"""
+    anterior = getattr(contexto, 'acao', None)
+    contexto.acao = acao
+    return anterior
+
+def acao_atual():
+    return getattr(contexto, 'acao', None) or threading.current_thread().name
+
+def registrar(sql, duracao, linhas, acao=None):
+    """Acumula uma execução; devolve a chave (ação, sql) para somar as leituras seguintes"""
+    chave = (acao or acao_atual(), normalizar_sql(sql))
+    with trava:
+        medicao = medicoes.setdefault(chave, [0, 0.0, 0.0, 0, 0])
+        medicao[0] += 1
+        medicao[1] += duracao
+        medicao[2] = max(medicao[2], duracao)
+        medicao[3] += max(linhas, 0)
+    return chave
+
+def somar_leitura(chave, duracao, linhas):
+    """Soma a uma medição já registrada o tempo e as linhas de um fetch (cursores nomeados)"""
+    with trava:
+        medicao = medicoes.get(chave)
+        if medicao is not None:
+            medicao[1] += duracao
+            medicao[2] = max(medicao[2], duracao)
+            medicao[3] += linhas
+
+def registrar_lenta(chave, duracao, plano=None):
+    acao, sql = chave
+    with trava:
+        if chave in medicoes:
+            medicoes[chave][4] += 1
+        lentas.append((next(numeros_lenta), time.strftime('%H:%M:%S'), acao, duracao * 1000, sql, plano))
+    log.warning('Consulta lenta (%.0f ms, ação %s): %s%s', duracao * 1000, acao, sql,
+                f'\n{plano}' if plano else '')
+
+def resumo_por_acao():
+    """[(ação, execuções, ms, linhas, lentas, [(sql, execuções, ms, maior ms, linhas, lentas)])],
+    das ações mais demoradas para as mais rápidas"""
+    with trava:
+        itens = [(chave, list(medicao)) for chave, medicao in medicoes.items()]
+    acoes = {}
+    for (acao, sql), (execucoes, segundos, maior, linhas, lentas_sql) in itens:
+        acoes.setdefault(acao, []).append((sql, execucoes, segundos * 1000, maior * 1000, linhas, lentas_sql))
+    resumo = []
+    for acao, consultas in acoes.items():
+        consultas.sort(key=lambda consulta: consulta[2], reverse=True)
+        resumo.append((acao, *(sum(consulta[i] for consulta in consultas) for i in (1, 2, 4, 5)), consultas))
+    resumo.sort(key=lambda item: item[2], reverse=True)
+    return resumo
+
+def consultas_lentas():
+    with trava:
+        return list(lentas)
+
+def zerar():
+    with trava:
+        medicoes.clear()
+        lentas.clear()
+
+class CursorRastreado(psycopg2.extensions.cursor):
+    """Cursor que mede cada comando enviado ao servidor.
+
+    Nos cursores nomeados o execute só declara o cursor: o tempo e as linhas dos
+    fetch são somados à mesma medição.
+    """
+    medicao = None
+
+    def execute(self, query, vars=None):
+        inicio = time.perf_counter()
+        resultado = super().execute(query, vars)
+        self.medido(query, vars, time.perf_counter() - inicio)
+        return resultado
+
+    def executemany(self, query, vars_list):
+        inicio = time.perf_counter()
+        resultado = super().executemany(query, vars_list)
+        self.medido(query, None, time.perf_counter() - inicio)
+        return resultado
+
+    def copy_expert(self, sql, file, size=8192):
+        inicio = time.perf_counter()
+        resultado = super().copy_expert(sql, file, size)
+        self.medido(sql, None, time.perf_counter() - inicio)
+        return resultado
+
+    def fetchone(self):
+        inicio = time.perf_counter()
+        linha = super().fetchone()
+        self.lido(inicio, 1 if linha is not None else 0)
+        return linha
+
+    def fetchmany(self, size=None):
+        inicio = time.perf_counter()
+        linhas = super().fetchmany(size) if size is not None else super().fetchmany()
+        self.lido(inicio, len(linhas))
+        return linhas
+
+    def fetchall(self):
+        inicio = time.perf_counter()
+        linhas = super().fetchall()
+        self.lido(inicio, len(linhas))
+        return linhas
+
+    def medido(self, query, vars, duracao):
+        self.medicao = registrar(query, duracao, 0 if self.name else self.rowcount)
+        if duracao * 1000 >= LIMITE_LENTA_MS:
+            registrar_lenta(self.medicao, duracao, self.explicar(query, vars) if EXPLICAR_LENTAS else None)
+
+    def lido(self, inicio, linhas):
+        # Só os cursores nomeados buscam linhas no servidor durante o fetch
+        if self.name and self.medicao is not None:
+            duracao = time.perf_counter() - inicio
+            somar_leitura(self.medicao, duracao, linhas)
+            if duracao * 1000 >= LIMITE_LENTA_MS:
+                registrar_lenta(self.medicao, duracao)
+
+    def explicar(self, query, vars):
+        """Plano do comando, em um savepoint para não abortar a transação se o EXPLAIN falhar"""
+        texto = query.decode('utf-8', 'replace') if isinstance(query, bytes) else str(query)
+        if not texto.lstrip().upper().startswith(EXPLICAVEIS):
+            return None
+        # Cursor simples: não é medido e não interfere em um cursor nomeado aberto
+        cur = psycopg2.extensions.cursor(self.connection)
+        transacao = not self.connection.autocommit
+        try:
+            if transacao:
+                cur.execute('SAVEPOINT explicar_lenta')
+            cur.execute('EXPLAIN ' + texto, vars)
+            plano = '\n'.join(linha[0] for linha in cur.fetchall())
+            if transacao:
+                cur.execute('RELEASE SAVEPOINT explicar_lenta')
+            return plano
+        except psycopg2.Error as e:
+            if transacao:
+                cur.execute('ROLLBACK TO SAVEPOINT explicar_lenta')
+            return f'(EXPLAIN falhou: {e})'
+        finally:
+            cur.close()
@@ -0,0 +1,461 @@
+import weakref
+from psycopg2.extras import execute_values
+from banco import copiar, iterar_consulta, iterar_lotes
+
+# Todas as consultas da aplicação. As funções recebem a conexão e não dependem do Tk,
+# então servem também a scripts e ao benchmark. Nenhuma faz commit.
+
+# Tabelas de referência compartilhadas pelas listas e combos de todos os painéis
+CONSULTAS_REFERENCIA = {
+    'cursos': 'SELECT id, nome FROM cursos ORDER BY nome',
+    'materias': 'SELECT id, nome FROM materias ORDER BY nome',
+    'alunos': 'SELECT id, nome FROM alunos ORDER BY nome',
+}
+
+# Consultas frequentes, preparadas no servidor (PREPARE) na primeira execução em cada
+# conexão, para que o Postgres não as planeje de novo a cada chamada: nome -> (tipos, SQL)
+PREPARADAS = {
+    'nome_curso': ('int', 'SELECT nome FROM cursos WHERE id = $1'),
+    'nome_materia': ('int', 'SELECT nome FROM materias WHERE id = $1'),
+    'dados_aluno': ('int', 'SELECT nome, curso_id FROM alunos WHERE id = $1'),
+    'materias_ligadas': ('int', 'SELECT materia_id FROM curso_materia WHERE curso_id = $1'),
+    'curriculo_curso': ('int', '''
+        SELECT m.id, m.nome FROM curso_materia cm
+        JOIN materias m ON m.id = cm.materia_id
+        WHERE cm.curso_id = $1 ORDER BY m.nome
+    '''),
+    'pagina_alunos': ('int, int', '''
+        SELECT a.id, a.nome, c.nome
+        FROM alunos a
+        LEFT JOIN cursos c ON a.curso_id = c.id
+        WHERE a.id > $1
+        ORDER BY a.id
+        LIMIT $2
+    '''),
+    'materias_do_aluno': ('int', '''
+        SELECT m.id, m.nome
+        FROM alunos a
+        JOIN curso_materia cm ON cm.curso_id = a.curso_id
+        JOIN materias m ON m.id = cm.materia_id
+        WHERE a.id = $1
+        ORDER BY m.nome
+    '''),
+    # Com status, o aluno mostra apenas as notas nesse status
+    'notas_do_aluno': ('int, text', '''
+        SELECT m.nome, n.trabalho, n.simulado1, n.simulado2, n.prova, n.nota_final, n.status
+        FROM notas n
+        INNER JOIN materias m ON n.materia_id = m.id
+        WHERE n.aluno_id = $1 AND ($2::text IS NULL OR n.status = $2)
+        ORDER BY m.nome
+    '''),
+    'nota_edicao': ('int, int', '''
+        SELECT trabalho, simulado1, simulado2, prova FROM notas WHERE aluno_id = $1 AND materia_id = $2
+    '''),
+    # Grava (ou substitui) a nota em um único comando, só se a matéria for do curso do aluno
+    'salvar_nota': ('int, int, numeric, numeric, numeric, numeric', '''
+        WITH salva AS (
+            INSERT INTO notas(aluno_id, materia_id, trabalho, simulado1, simulado2, prova)
+            SELECT $1, $2, $3, $4, $5, $6
+            WHERE EXISTS (
+                SELECT 1 FROM curso_materia cm
+                JOIN alunos a ON a.curso_id = cm.curso_id
+                WHERE a.id = $1 AND cm.materia_id = $2
+            )
+            ON CONFLICT (aluno_id, materia_id) DO UPDATE SET
+                trabalho = EXCLUDED.trabalho, simulado1 = EXCLUDED.simulado1,
+                simulado2 = EXCLUDED.simulado2, prova = EXCLUDED.prova
+            RETURNING aluno_id, materia_id, trabalho, simulado1, simulado2, prova, nota_final, status
+        )
+        SELECT s.aluno_id, m.nome, s.trabalho, s.simulado1, s.simulado2, s.prova, s.nota_final, s.status
+        FROM salva s JOIN materias m ON m.id = s.materia_id
+    '''),
+}
+
+# Conexão -> nomes já preparados nela (os preparos somem quando a conexão é fechada)
+preparadas_por_conexao = weakref.WeakKeyDictionary()
+
+def executar_preparada(con, nome, *params):
+    """Executa a consulta preparada `nome`, preparando-a antes se for a primeira vez na conexão.
+
+    PREPARE não é transacional: o preparo continua valendo mesmo após um rollback.
+    """
+    cur = con.cursor()
+    preparadas = preparadas_por_conexao.setdefault(con, set())
+    if nome not in preparadas:
+        tipos, sql = PREPARADAS[nome]
+        cur.execute(f'PREPARE {nome}({tipos}) AS {sql}')
+        preparadas.add(nome)
+    cur.execute(f"EXECUTE {nome}({', '.join(['%s'] * len(params))})", params)
+    return cur
+
+def buscar_todas(con, query, params=None):
+    cur = con.cursor()
+    cur.execute(query, params)
+    return cur.fetchall()
+
+def executar_comando(con, query, params=None):
+    con.cursor().execute(query, params)
+
+# Cursos
+
+def nome_curso(con, curso_id):
+    linha = executar_preparada(con, 'nome_curso', curso_id).fetchone()
+    return linha[0] if linha else None
+
+def inserir_curso(con, nome):
+    executar_comando(con, 'INSERT INTO cursos(nome) VALUES(%s)', (nome,))
+
+def atualizar_curso(con, curso_id, nome):
+    executar_comando(con, 'UPDATE cursos SET nome=%s WHERE id=%s', (nome, curso_id))
+
+def remover_curso(con, curso_id):
+    # Um único comando: as notas dos alunos do curso saem pela CTE, e as chaves
+    # estrangeiras removem o currículo e deixam os alunos sem curso (NULL)
+    executar_comando(con, '''
+        WITH notas_removidas AS (
+            DELETE FROM notas WHERE aluno_id IN (SELECT id FROM alunos WHERE curso_id=%s)
+        )
+        DELETE FROM cursos WHERE id=%s
+    ''', (curso_id, curso_id))
+
+def materias_ligadas(con, curso_id):
+    """Ids das matérias do currículo do curso"""
+    return {linha[0] for linha in executar_preparada(con, 'materias_ligadas', curso_id)}
+
+def curriculo_curso(con, curso_id):
+    """(id, nome) das matérias do currículo do curso, por nome"""
+    return executar_preparada(con, 'curriculo_curso', curso_id).fetchall()
+
+def salvar_curriculo(con, curso_id, incluir, excluir):
+    """Inclui e remove matérias do currículo do curso em um único comando"""
+    executar_comando(con, '''
+        WITH removidas AS (
+            DELETE FROM curso_materia WHERE curso_id = %s AND materia_id = ANY(%s::int[])
+        )
+        INSERT INTO curso_materia(curso_id, materia_id)
+        SELECT %s, m.id FROM materias m WHERE m.id = ANY(%s::int[])
+        ON CONFLICT DO NOTHING
+    ''', (curso_id, list(excluir), curso_id, list(incluir)))
+
+# Matérias
+
+def nome_materia(con, materia_id):
+    linha = executar_preparada(con, 'nome_materia', materia_id).fetchone()
+    return linha[0] if linha else None
+
+def inserir_materia(con, nome):
+    executar_comando(con, 'INSERT INTO materias(nome) VALUES(%s)', (nome,))
+
+def atualizar_materia(con, materia_id, nome):
+    executar_comando(con, 'UPDATE materias SET nome=%s WHERE id=%s', (nome, materia_id))
+
+def remover_materia(con, materia_id):
+    # Notas e vínculos com cursos são removidos pelo ON DELETE CASCADE
+    executar_comando(con, 'DELETE FROM materias WHERE id=%s', (materia_id,))
+
+# Alunos
+
+def dados_aluno(con, aluno_id):
+    """(nome, curso_id) do aluno, ou None"""
+    return executar_preparada(con, 'dados_aluno', aluno_id).fetchone()
+
+def pagina_alunos(con, ultima_chave, tamanho):
+    """Página da lista de alunos por keyset: os `tamanho` alunos seguintes ao id `ultima_chave`"""
+    return executar_preparada(con, 'pagina_alunos', ultima_chave, tamanho).fetchall()
+
+def inserir_aluno(con, nome, curso_id):
+    executar_comando(con, 'INSERT INTO alunos(nome,curso_id) VALUES(%s,%s)', (nome, curso_id))
+
+def atualizar_aluno(con, aluno_id, nome, curso_id):
+    executar_comando(con, 'UPDATE alunos SET nome=%s, curso_id=%s WHERE id=%s', (nome, curso_id, aluno_id))
+
+def remover_aluno(con, aluno_id):
+    # As notas do aluno são removidas pelo ON DELETE CASCADE
+    executar_comando(con, 'DELETE FROM alunos WHERE id=%s', (aluno_id,))
+
+# Notas
+
+def materias_do_aluno(con, aluno_id):
+    """(id, nome) das matérias do curso do aluno"""
+    return executar_preparada(con, 'materias_do_aluno', aluno_id).fetchall()
+
+def escapar_like(texto):
+    """Escapa os curingas do LIKE para buscar o texto literalmente"""
+    return texto.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+def buscar_alunos_com_notas(con, texto, curso_nome=None, status=None):
+    """Gera, em lotes de um cursor no servidor, (id, nome, curso) dos alunos com notas.
+
+    Filtra pelo trecho do nome, pelo nome do curso e por ter alguma nota no status.
+    """
+    params = []
+    filtro_notas = ''
+    if status is not None:
+        filtro_notas = ' AND n.status = %s'
+        params.append(status)
+    query = f"""
+        SELECT a.id, a.nome, c.nome as curso_nome
+        FROM alunos a
+        LEFT JOIN cursos c ON a.curso_id = c.id
+        WHERE EXISTS (SELECT 1 FROM notas n WHERE n.aluno_id = a.id{filtro_notas})
+          AND a.nome ILIKE %s
+    """
+    params.append(f'%{escapar_like(texto)}%')
+    if curso_nome is not None:
+        query += " AND c.nome = %s"
+        params.append(curso_nome)
+    query += " ORDER BY a.nome, a.id"
+    return iterar_lotes(con, query, params)
+
+def notas_do_aluno(con, aluno_id, status=None):
+    """(matéria, trabalho, simulado1, simulado2, prova, nota_final, status) do aluno"""
+    return executar_preparada(con, 'notas_do_aluno', aluno_id, status).fetchall()
+
+def nota_edicao(con, aluno_id, materia_id):
+    """(trabalho, simulado1, simulado2, prova) da nota, ou None"""
+    return executar_preparada(con, 'nota_edicao', aluno_id, materia_id).fetchone()
+
+def salvar_nota(con, aluno_id, materia_id, trabalho, simulado1, simulado2, prova):
+    """Grava a nota e devolve a linha da lista de notas, ou None se a matéria não for do curso do aluno"""
+    return executar_preparada(con, 'salvar_nota', aluno_id, materia_id,
+                              trabalho, simulado1, simulado2, prova).fetchone()
+
+def remover_nota(con, aluno_id, materia_id):
+    executar_comando(con, 'DELETE FROM notas WHERE aluno_id=%s AND materia_id=%s', (aluno_id, materia_id))
+
+# Lançamento em grade
+
+def consultar_turma(con, curso_id, materia_id):
+    """Alunos do curso com a nota atual (ou vazia) na matéria"""
+    return buscar_todas(con, '''
+        SELECT a.id, a.nome, n.trabalho, n.simulado1, n.simulado2, n.prova, n.nota_final, n.status
+        FROM alunos a
+        LEFT JOIN notas n ON n.aluno_id = a.id AND n.materia_id = %s
+        WHERE a.curso_id = %s
+        ORDER BY a.nome, a.id
+    ''', (materia_id, curso_id))
+
+def salvar_notas_em_lote(con, linhas):
+    """Grava (aluno_id, materia_id, trabalho, sim1, sim2, prova) em um único INSERT ... ON CONFLICT.
+
+    Linhas cuja matéria não pertence ao curso do aluno são ignoradas, como em
+    salvar_nota. Devolve (aluno_id, nota_final, status) das notas gravadas.
+    """
+    cur = con.cursor()
+    return execute_values(cur, '''
+        INSERT INTO notas(aluno_id, materia_id, trabalho, simulado1, simulado2, prova)
+        SELECT v.aluno_id, v.materia_id, v.trabalho, v.simulado1, v.simulado2, v.prova
+        FROM (VALUES %s) AS v(aluno_id, materia_id, trabalho, simulado1, simulado2, prova)
+        WHERE EXISTS (
+            SELECT 1 FROM alunos a
+            JOIN curso_materia cm ON cm.curso_id = a.curso_id
+            WHERE a.id = v.aluno_id AND cm.materia_id = v.materia_id
+        )
+        ON CONFLICT (aluno_id, materia_id) DO UPDATE SET
+            trabalho = EXCLUDED.trabalho, simulado1 = EXCLUDED.simulado1,
+            simulado2 = EXCLUDED.simulado2, prova = EXCLUDED.prova
+        RETURNING aluno_id, nota_final, status
+    ''', linhas, template='(%s::int, %s::int, %s::numeric, %s::numeric, %s::numeric, %s::numeric)',
+        page_size=max(len(linhas), 1), fetch=True)
+
+def remover_notas_em_lote(con, materia_id, aluno_ids):
+    """Apaga as notas da matéria dos alunos em um único comando. Devolve os ids com nota apagada"""
+    return [aluno_id for aluno_id, in buscar_todas(con, '''
+        DELETE FROM notas WHERE materia_id = %s AND aluno_id = ANY(%s)
+        RETURNING aluno_id
+    ''', (materia_id, list(aluno_ids)))]
+
+# Importação de notas (tabela temporária da transação)
+#
+# A tabela é sempre referida como pg_temp.importacao_notas: um DROP sem o esquema
+# apagaria uma tabela permanente de mesmo nome quando não houvesse a temporária.
+
+def criar_tabela_importacao(con):
+    executar_comando(con, 'DROP TABLE IF EXISTS pg_temp.importacao_notas')
+    executar_comando(con, '''
+        CREATE TEMP TABLE pg_temp.importacao_notas (
+            linha INTEGER PRIMARY KEY,
+            aluno_id INTEGER,
+            materia_id INTEGER,
+            trabalho DECIMAL(4,2),
+            simulado1 DECIMAL(4,2),
+            simulado2 DECIMAL(4,2),
+            prova DECIMAL(4,2)
+        ) ON COMMIT DROP
+    ''')
+
+def copiar_importacao(con, colunas, linhas):
+    """Envia por COPY as linhas (no formato do COPY) para a tabela de importação"""
+    copiar(con.cursor(), 'pg_temp.importacao_notas', colunas, linhas)
+
+def remover_repetidas_importacao(con):
+    """Um mesmo par aluno/matéria repetido: fica a última linha. Devolve (linha, última) das removidas"""
+    return buscar_todas(con, '''
+        WITH repetidas AS (
+            SELECT i.linha, max(posterior.linha) AS ultima
+            FROM pg_temp.importacao_notas i
+            JOIN pg_temp.importacao_notas posterior ON posterior.aluno_id = i.aluno_id
+             AND posterior.materia_id = i.materia_id AND posterior.linha > i.linha
+            GROUP BY i.linha
+        ), removidas AS (
+            DELETE FROM pg_temp.importacao_notas i USING repetidas r WHERE i.linha = r.linha
+        )
+        SELECT linha, ultima FROM repetidas
+    ''')
+
+def remover_invalidas_importacao(con):
+    """Confere alunos, matérias e currículos em uma consulta; devolve (linha, motivo) das removidas"""
+    return buscar_todas(con, '''
+        WITH invalidas AS (
+            SELECT i.linha, CASE
+                WHEN a.id IS NULL THEN 'aluno ' || i.aluno_id || ' não encontrado'
+                WHEN m.id IS NULL THEN 'matéria ' || i.materia_id || ' não encontrada'
+                ELSE 'matéria ' || i.materia_id || ' não pertence ao curso do aluno'
+            END AS motivo
+            FROM pg_temp.importacao_notas i
+            LEFT JOIN alunos a ON a.id = i.aluno_id
+            LEFT JOIN materias m ON m.id = i.materia_id
+            WHERE NOT EXISTS (
+                SELECT 1 FROM curso_materia cm
+                WHERE cm.curso_id = a.curso_id AND cm.materia_id = i.materia_id
+            )
+        ), removidas AS (
+            DELETE FROM pg_temp.importacao_notas i USING invalidas v WHERE i.linha = v.linha
+        )
+        SELECT linha, motivo FROM invalidas
+    ''')
+
+def gravar_importacao(con):
+    """Grava as notas importadas em um único INSERT ... ON CONFLICT; devolve (inseridas, atualizadas)"""
+    inseridas, atualizadas = buscar_todas(con, '''
+        WITH gravadas AS (
+            INSERT INTO notas(aluno_id, materia_id, trabalho, simulado1, simulado2, prova)
+            SELECT aluno_id, materia_id, trabalho, simulado1, simulado2, prova
+            FROM pg_temp.importacao_notas
+            ON CONFLICT (aluno_id, materia_id) DO UPDATE SET
+                trabalho = EXCLUDED.trabalho, simulado1 = EXCLUDED.simulado1,
+                simulado2 = EXCLUDED.simulado2, prova = EXCLUDED.prova
+            RETURNING xmax = 0 AS inserida
+        )
+        SELECT count(*) FILTER (WHERE inserida), count(*) FILTER (WHERE NOT inserida) FROM gravadas
+    ''')[0]
+    executar_comando(con, 'DROP TABLE pg_temp.importacao_notas')
+    return inseridas, atualizadas
+
+# Exportação (linhas geradas por um cursor no servidor)
+
+def filtro_curso(curso_id):
+    return ('WHERE a.curso_id = %s', (curso_id,)) if curso_id is not None else ('', ())
+
+def linhas_boletins(con, curso_id=None):
+    """Gera (aluno_id, aluno, curso, matéria, trabalho, sim1, sim2, prova, nota_final, status).
+
+    Alunos sem notas vêm em uma linha com a matéria, as notas e o status vazios (o
+    status de uma nota gravada nunca é vazio). A ordem por id do aluno deixa o banco
+    seguir a chave primária e ordenar só as notas de cada aluno, sem ordenar o
+    resultado inteiro antes da primeira linha.
+    """
+    where, params = filtro_curso(curso_id)
+    return iterar_consulta(con, f'''
+        SELECT a.id, a.nome, c.nome, m.nome, n.trabalho, n.simulado1, n.simulado2, n.prova,
+               n.nota_final, n.status
+        FROM alunos a
+        LEFT JOIN cursos c ON c.id = a.curso_id
+        LEFT JOIN notas n ON n.aluno_id = a.id
+        LEFT JOIN materias m ON m.id = n.materia_id
+        {where}
+        ORDER BY a.id, m.nome
+    ''', params)
+
+def linhas_planilha_cursos(con, curso_id=None):
+    """Gera, por curso e matéria, (curso, matéria, notas, média final, aprovados, reprovados, pendentes)"""
+    where, params = filtro_curso(curso_id)
+    return iterar_consulta(con, f'''
+        SELECT c.nome, m.nome, count(*), round(avg(n.nota_final), 2),
+               count(*) FILTER (WHERE n.status = 'Aprovado'),
+               count(*) FILTER (WHERE n.status = 'Reprovado'),
+               count(*) FILTER (WHERE n.status = 'Pendente')
+        FROM notas n
+        JOIN alunos a ON a.id = n.aluno_id
+        JOIN cursos c ON c.id = a.curso_id
+        JOIN materias m ON m.id = n.materia_id
+        {where}
+        GROUP BY c.id, c.nome, m.id, m.nome
+        ORDER BY c.nome, m.nome
+    ''', params)
+
+# Estatísticas (visões materializadas da migração 6)
+
+COLUNAS_AGREGADAS = '''e.notas, e.media_trabalho, e.media_simulado1, e.media_simulado2, e.media_prova,
+               e.media_final, e.aprovados, e.reprovados, e.pendentes, e.faixas'''
+
+def atualizar_estatisticas(con):
+    """Recalcula as visões sem bloquear quem as estiver lendo"""
+    executar_comando(con, 'REFRESH MATERIALIZED VIEW CONCURRENTLY estatisticas_curso')
+    executar_comando(con, 'REFRESH MATERIALIZED VIEW CONCURRENTLY estatisticas_materia')
+
+def consultar_estatisticas_cursos(con):
+    """(curso_id, curso, alunos, notas, médias..., aprovados, reprovados, pendentes, faixas) por curso"""
+    return buscar_todas(con, f'''
+        SELECT c.id, c.nome, e.alunos, {COLUNAS_AGREGADAS}
+        FROM estatisticas_curso e
+        JOIN cursos c ON c.id = e.curso_id
+        ORDER BY c.nome
+    ''')
+
+def consultar_estatisticas_materias(con, curso_id):
+    """(materia_id, matéria, notas, médias..., aprovados, reprovados, pendentes, faixas) do curso"""
+    return buscar_todas(con, f'''
+        SELECT m.id, m.nome, {COLUNAS_AGREGADAS}
+        FROM estatisticas_materia e
+        JOIN materias m ON m.id = e.materia_id
+        WHERE e.curso_id = %s
+        ORDER BY m.nome
+    ''', (curso_id,))
+
+# Política de notas
+
+def lotes_componentes_notas(con, curso_id=None):
+    """Gera lotes de (id, trabalho, simulado1, simulado2, prova) em float, de um curso ou da escola"""
+    filtro = 'JOIN alunos a ON a.id = n.aluno_id WHERE a.curso_id = %s' if curso_id is not None else ''
+    return iterar_lotes(con, f'''
+        SELECT n.id, n.trabalho::float8, n.simulado1::float8, n.simulado2::float8, n.prova::float8
+        FROM notas n {filtro}
+    ''', (curso_id,) if curso_id is not None else None)
+
+# Versões das tabelas
+
+def versoes_tabelas(con):
+    """{tabela: versão}; a versão sobe a cada comando que altera a tabela (migrações 7 e 8)"""
+    return dict(buscar_todas(con, '''
+        SELECT v.tabela, v.versao + count(a.id)
+        FROM versoes_tabela v
+        LEFT JOIN alteracoes_tabela a ON a.tabela = v.tabela
+        GROUP BY v.tabela, v.versao
+    '''))
+
+def compactar_alteracoes(con):
+    """Passa as linhas do registro de alterações para o contador de cada tabela.
+
+    Remoção e soma vão no mesmo comando, então as versões não mudam. Linhas de
+    transações ainda não confirmadas não são vistas e ficam para a próxima vez.
+    """
+    executar_comando(con, '''
+        WITH removidas AS (
+            DELETE FROM alteracoes_tabela RETURNING tabela
+        )
+        UPDATE versoes_tabela v SET versao = v.versao + r.quantidade
+        FROM (SELECT tabela, count(*) AS quantidade FROM removidas GROUP BY tabela) r
+        WHERE v.tabela = r.tabela
+    ''')
+
+def lendo_versoes(buscar, versoes):
+    """buscar(con, *args) precedida da leitura das versões das tabelas, guardadas em `versoes`.
+
+    As versões são lidas antes dos dados, na mesma tarefa: uma cópia gravada com elas
+    pode parecer mais antiga do que é, nunca mais nova.
+    """
+    def ler(con, *args):
+        versoes.update(versoes_tabelas(con))
+        return buscar(con, *args)
+    return ler
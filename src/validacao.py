@@ -0,0 +1,31 @@
+# Faixa aceita para cada componente da nota (iguais às restrições CHECK da tabela notas)
+LIMITES_NOTA = {
+    'trabalho': (0, 5),
+    'simulado': (0, 1),
+    'prova': (0, 5),
+}
+
+def converter_nota(valor, tipo):
+    """Converte o texto de uma nota (aceita vírgula decimal).
+
+    Devolve None para o campo vazio e levanta ValueError se o valor não for um
+    número dentro da faixa do tipo ('trabalho', 'simulado' ou 'prova').
+    """
+    texto = (valor or '').strip()
+    if not texto:
+        return None
+    try:
+        nota = float(texto.replace(',', '.'))
+    except ValueError:
+        raise ValueError(f"valor inválido '{texto}'")
+    minimo, maximo = LIMITES_NOTA[tipo]
+    if not minimo <= nota <= maximo:
+        raise ValueError(f"'{texto}' fora da faixa {minimo}-{maximo}")
+    return nota
+
+def nota_valida(valor, tipo):
+    """Versão tolerante usada na interface: valores vazios ou inválidos viram None"""
+    try:
+        return converter_nota(valor, tipo)
+    except ValueError:
+        return None
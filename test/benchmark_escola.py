@@ -0,0 +1,248 @@
+"""Benchmark das cargas de painel e das gravações do MiniEscola.
+
+Popula um banco separado (padrão: escola_benchmark) com o gerador do mock.py, abre a
+aplicação com a janela escondida e mede cada operação, incluindo o preenchimento
+dos Treeviews. Para cada operação são exibidos p50/p95 do tempo e o número de
+consultas e de idas ao banco (consultas + commits). Os resultados são comparados
+com a base gravada em benchmark_base.json e qualquer regressão encerra com erro,
+assim como a falta de base para o tamanho de banco medido (grave-a antes com --gravar,
+na máquina em que as comparações serão feitas).
+
+    python test/benchmark_escola.py --alunos 30000 --gravar   # grava a base
+    python test/benchmark_escola.py --alunos 30000            # compara com a base
+"""
+import argparse
+import json
+import math
+import os
+import sys
+import time
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+from rastreamento import CursorRastreado
+
+ARQUIVO_BASE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmark_base.json')
+
+class CursorContador(CursorRastreado):
+    """Cursor da aplicação (rastreado) que também conta os comandos enviados ao servidor"""
+    consultas = 0
+
+    def execute(self, query, vars=None):
+        CursorContador.consultas += 1
+        return super().execute(query, vars)
+
+    def executemany(self, query, vars_list):
+        CursorContador.consultas += 1
+        return super().executemany(query, vars_list)
+
+    def copy_expert(self, sql, file, size=8192):
+        CursorContador.consultas += 1
+        return super().copy_expert(sql, file, size)
+
+def percentil(amostras, p):
+    """Percentil pelo método do posto mais próximo"""
+    ordenadas = sorted(amostras)
+    return ordenadas[max(0, math.ceil(p / 100 * len(ordenadas)) - 1)]
+
+def criar_banco_se_preciso(nome):
+    from banco import conectar
+    con = conectar('postgres')
+    con.autocommit = True
+    cur = con.cursor()
+    cur.execute('SELECT 1 FROM pg_database WHERE datname = %s', (nome,))
+    if not cur.fetchone():
+        cur.execute(f'CREATE DATABASE "{nome}"')
+    con.close()
+
+class Benchmark:
+    def __init__(self, app, con_preparo, repeticoes):
+        self.app = app
+        self.con_preparo = con_preparo
+        self.repeticoes = repeticoes
+        self.transacoes = 0
+        # Conta as tarefas do executor: cada uma termina com um commit (ou rollback)
+        executar_original = app.executor.executar
+        def executar_contando(con, tarefa):
+            self.transacoes += 1
+            return executar_original(con, tarefa)
+        app.executor.executar = executar_contando
+        app.con.cursor_factory = CursorContador
+
+    def medir(self, operacao, preparar=None):
+        tempos, consultas, idas = [], [], []
+        for _ in range(self.repeticoes):
+            if preparar:
+                preparar()
+            self.app.update()
+            CursorContador.consultas = 0
+            self.transacoes = 0
+            inicio = time.perf_counter()
+            operacao()
+            # Inclui o trabalho de layout pendente dos widgets preenchidos
+            self.app.update_idletasks()
+            tempos.append((time.perf_counter() - inicio) * 1000)
+            consultas.append(CursorContador.consultas)
+            idas.append(CursorContador.consultas + self.transacoes)
+        return {
+            'p50_ms': round(percentil(tempos, 50), 2),
+            'p95_ms': round(percentil(tempos, 95), 2),
+            'consultas': max(consultas),
+            'idas_ao_banco': max(idas),
+        }
+
+    def consultar_preparo(self, query, params=None):
+        cur = self.con_preparo.cursor()
+        cur.execute(query, params)
+        resultado = cur.fetchall() if cur.description else None
+        self.con_preparo.commit()
+        return resultado
+
+    def preparar_materias_curso(self):
+        app = self.app
+        if not app.lista_cursos.selection():
+            app.carregar_cursos()
+            app.lista_cursos.selection_set(app.lista_cursos.get_children()[0])
+            app.update()
+        # Mede o caso mais caro: o catálogo de matérias também é recarregado
+        app.invalidar_referencia('materias')
+
+    def preparar_nota(self):
+        app = self.app
+        if not hasattr(self, 'par_nota'):
+            self.par_nota = self.consultar_preparo('''
+                SELECT a.id, a.nome, m.id, m.nome FROM alunos a
+                JOIN curso_materia cm ON cm.curso_id = a.curso_id
+                JOIN materias m ON m.id = cm.materia_id
+                ORDER BY a.id, m.id LIMIT 1
+            ''')[0]
+            app.filtrar_notas()
+        aluno_id, aluno_nome, materia_id, materia_nome = self.par_nota
+        app.combo_aluno.set(f'{aluno_id}: {aluno_nome}')
+        app.combo_mat.set(f'{materia_id}: {materia_nome}')
+        for entrada, valor in ((app.entrada_trabalho, '4'), (app.entrada_sim1, '0.5'),
+                               (app.entrada_sim2, '0.5'), (app.entrada_prova, '3')):
+            entrada.delete(0, 'end')
+            entrada.insert(0, valor)
+
+    def preparar_remocao_curso(self):
+        """Cria um curso com o porte médio dos cursos do banco para ser removido"""
+        curso_id = self.consultar_preparo('''
+            WITH curso AS (
+                INSERT INTO cursos(nome) VALUES('Curso Benchmark') RETURNING id
+            ), curriculo AS (
+                INSERT INTO curso_materia(curso_id, materia_id)
+                SELECT curso.id, m.id FROM curso, (
+                    SELECT id FROM materias ORDER BY id
+                    LIMIT (SELECT count(*) / greatest(count(DISTINCT curso_id), 1) FROM curso_materia)
+                ) m
+            )
+            SELECT id FROM curso
+        ''')[0][0]
+        self.consultar_preparo('''
+            INSERT INTO alunos(nome, curso_id)
+            SELECT 'Aluno Benchmark ' || i, %s
+            FROM generate_series(1, (SELECT count(*) / greatest(count(DISTINCT curso_id), 1) FROM alunos)) i
+        ''', (curso_id,))
+        self.consultar_preparo('''
+            INSERT INTO notas(aluno_id, materia_id, trabalho, simulado1, simulado2, prova)
+            SELECT a.id, cm.materia_id, 3, 0.5, 0.5, 3
+            FROM alunos a JOIN curso_materia cm ON cm.curso_id = a.curso_id
+            WHERE a.curso_id = %s
+        ''', (curso_id,))
+        self.app.combo_curso_edicao.set(f'{curso_id}: Curso Benchmark')
+
+    def executar(self):
+        app = self.app
+        return {
+            'carregar_alunos': self.medir(app.carregar_alunos),
+            'filtrar_notas': self.medir(app.filtrar_notas),
+            'carregar_materias_curso': self.medir(app.carregar_materias_curso, self.preparar_materias_curso),
+            'adicionar_nota': self.medir(app.adicionar_nota, self.preparar_nota),
+            'remover_curso': self.medir(app.remover_curso, self.preparar_remocao_curso),
+        }
+
+def comparar(resultados, base, tolerancia):
+    """Devolve as regressões em relação à base (tempo acima da tolerância ou mais idas ao banco)"""
+    regressoes = []
+    for operacao, medida in resultados.items():
+        anterior = base.get(operacao)
+        if anterior is None:
+            continue
+        limite = anterior['p95_ms'] * (1 + tolerancia)
+        if medida['p95_ms'] > limite:
+            regressoes.append(f"{operacao}: p95 {medida['p95_ms']:.1f} ms > {limite:.1f} ms")
+        for campo in ('consultas', 'idas_ao_banco'):
+            if medida[campo] > anterior[campo]:
+                regressoes.append(f'{operacao}: {campo} {medida[campo]} > {anterior[campo]}')
+    return regressoes
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark das operações do MiniEscola.')
+    parser.add_argument('--banco', default='escola_benchmark',
+                        help='banco usado no benchmark (seus dados são substituídos)')
+    parser.add_argument('--cursos', type=int, default=20)
+    parser.add_argument('--materias', type=int, default=100)
+    parser.add_argument('--materias-por-curso', type=int, default=30)
+    parser.add_argument('--alunos', type=int, default=5000)
+    parser.add_argument('--repeticoes', type=int, default=20)
+    parser.add_argument('--sem-popular', action='store_true', help='reaproveita os dados já existentes no banco')
+    parser.add_argument('--tolerancia', type=float, default=0.25,
+                        help='aumento relativo do p95 aceito antes de acusar regressão')
+    parser.add_argument('--gravar', action='store_true', help='grava os resultados como nova base')
+    args = parser.parse_args()
+
+    # Todas as conexões (aplicação, mock e preparo) usam o banco do benchmark
+    os.environ['db_name'] = args.banco
+    criar_banco_se_preciso(args.banco)
+    from banco import inicializar_banco
+    from main import MiniEscolaApp
+    from mock import inserir_dados_mock
+
+    con_preparo = inicializar_banco()
+    tamanho = {'cursos': args.cursos, 'materias': args.materias,
+               'materias_por_curso': args.materias_por_curso, 'alunos': args.alunos}
+    if not args.sem_popular:
+        inicio = time.perf_counter()
+        totais = inserir_dados_mock(args.cursos, args.materias, args.materias_por_curso, args.alunos,
+                                    con=con_preparo)
+        print(f'Banco populado em {time.perf_counter() - inicio:.1f}s: '
+              + ', '.join(f'{total} {tabela}' for tabela, total in totais.items()))
+
+    app = MiniEscolaApp(assincrono=False)
+    app.withdraw()
+    try:
+        resultados = Benchmark(app, con_preparo, args.repeticoes).executar()
+    finally:
+        app.destroy()
+        con_preparo.close()
+
+    print(f"\n{'operação':<26}{'p50 (ms)':>10}{'p95 (ms)':>10}{'consultas':>11}{'idas':>6}")
+    for operacao, medida in resultados.items():
+        print(f"{operacao:<26}{medida['p50_ms']:>10.1f}{medida['p95_ms']:>10.1f}"
+              f"{medida['consultas']:>11}{medida['idas_ao_banco']:>6}")
+
+    # Cada tamanho de banco tem sua própria base
+    chave = ','.join(f'{nome}={valor}' for nome, valor in tamanho.items())
+    bases = {}
+    if os.path.exists(ARQUIVO_BASE):
+        with open(ARQUIVO_BASE, encoding='utf-8') as arquivo:
+            bases = json.load(arquivo)
+    if args.gravar:
+        bases[chave] = resultados
+        with open(ARQUIVO_BASE, 'w', encoding='utf-8') as arquivo:
+            json.dump(bases, arquivo, indent=2, ensure_ascii=False)
+        print(f'\nBase gravada em {ARQUIVO_BASE} ({chave})')
+        return 0
+    if chave not in bases:
+        print(f'\nSem base para {chave}; rode com --gravar para criá-la.')
+        return 2
+    regressoes = comparar(resultados, bases[chave], args.tolerancia)
+    if regressoes:
+        print('\nREGRESSÕES em relação à base:')
+        for regressao in regressoes:
+            print(f'  {regressao}')
+        return 1
+    print('\nSem regressões em relação à base.')
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,185 @@
+import os
+import sys
+import threading
+import time
+import tkinter
+import unittest
+from unittest import mock
+from psycopg2.extensions import QueryCanceledError
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+import banco
+from banco import ExecutorBanco, conectar, iterar_lotes, iterar_consulta
+
+class JanelaFalsa:
+    """Substitui a janela Tk: guarda os callbacks agendados com after()"""
+    def __init__(self):
+        self.agendados = []
+        self.excecoes = []
+
+    def after(self, tempo, funcao):
+        self.agendados.append(funcao)
+
+    def report_callback_exception(self, tipo, valor, traceback):
+        self.excecoes.append(valor)
+
+class ConexaoFalsa:
+    def __init__(self):
+        self.closed = False
+        self.commits = 0
+        self.cancelamentos = 0
+        self.liberar = threading.Event()
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        pass
+
+    def cancel(self):
+        self.cancelamentos += 1
+        self.liberar.set()
+
+    def close(self):
+        self.closed = True
+
+class TestExecutorBanco(unittest.TestCase):
+    def aguardar_resultados(self, executor, quantidade, limite=5):
+        """Processa os resultados na thread atual até receber a quantidade esperada"""
+        fim = time.time() + limite
+        while executor.resultados.qsize() < quantidade and time.time() < fim:
+            time.sleep(0.01)
+        executor.processar_resultados()
+
+    def test_modo_sincrono_entrega_na_hora(self):
+        con = ConexaoFalsa()
+        executor = ExecutorBanco(JanelaFalsa(), con)
+        recebidos = []
+        executor.submeter(lambda c: 42, recebidos.append)
+        self.assertEqual(recebidos, [42])
+        self.assertEqual(con.commits, 1)
+
+    def test_erro_vai_para_ao_falhar(self):
+        executor = ExecutorBanco(JanelaFalsa(), ConexaoFalsa())
+        erros = []
+        def falhar(con):
+            raise ValueError('falhou')
+        executor.submeter(falhar, ao_falhar=erros.append)
+        self.assertEqual(str(erros[0]), 'falhou')
+
+    def test_resultado_atrasado_nao_sobrescreve_o_novo(self):
+        con = ConexaoFalsa()
+        with mock.patch.object(banco, 'conectar', return_value=con):
+            executor = ExecutorBanco(JanelaFalsa())
+            iniciou = threading.Event()
+            def lenta(c):
+                iniciou.set()
+                c.liberar.wait(5)
+                return 'antiga'
+            recebidos, finalizados = [], []
+            executor.submeter(lenta, recebidos.append, chave='lista',
+                              ao_finalizar=lambda: finalizados.append(1))
+            iniciou.wait(5)
+            executor.submeter(lambda c: 'nova', recebidos.append, chave='lista',
+                              ao_finalizar=lambda: finalizados.append(2))
+            self.aguardar_resultados(executor, 2)
+            executor.encerrar()
+        self.assertEqual(recebidos, ['nova'])
+        self.assertEqual(con.cancelamentos, 1)
+        self.assertEqual(sorted(finalizados), [1, 2])
+
+    def test_descartar_chave_em_andamento(self):
+        con = ConexaoFalsa()
+        with mock.patch.object(banco, 'conectar', return_value=con):
+            executor = ExecutorBanco(JanelaFalsa())
+            iniciou = threading.Event()
+            def lenta(c):
+                iniciou.set()
+                c.liberar.wait(5)
+                return 'ab'
+            recebidos, finalizados = [], []
+            executor.submeter(lenta, recebidos.append, chave='busca', ao_finalizar=lambda: finalizados.append(1))
+            iniciou.wait(5)
+            # O resultado veio de outro caminho: a busca em andamento deixa de valer
+            executor.descartar('busca')
+            self.aguardar_resultados(executor, 1)
+            executor.encerrar()
+        self.assertEqual(recebidos, [])
+        self.assertEqual(con.cancelamentos, 1)
+        self.assertEqual(finalizados, [1])
+
+    def test_callback_com_erro_nao_interrompe_a_entrega(self):
+        con = ConexaoFalsa()
+        janela = JanelaFalsa()
+        with mock.patch.object(banco, 'conectar', return_value=con):
+            executor = ExecutorBanco(janela)
+            def fechada(valor):
+                raise tkinter.TclError('invalid command name')
+            recebidos = []
+            executor.submeter(lambda c: 1, fechada)
+            executor.submeter(lambda c: 2, recebidos.append)
+            janela.agendados.clear()
+            self.aguardar_resultados(executor, 2)
+            executor.encerrar()
+        self.assertEqual(recebidos, [2])
+        self.assertIsInstance(janela.excecoes[0], tkinter.TclError)
+        # A busca de resultados continua agendada
+        self.assertEqual(janela.agendados, [executor.processar_resultados])
+
+    def test_cancelamento_que_nao_foi_pedido_e_falha(self):
+        executor = ExecutorBanco(JanelaFalsa(), ConexaoFalsa())
+        erros = []
+        def expirada(con):
+            raise QueryCanceledError('canceling statement due to statement timeout')
+        executor.submeter(expirada, ao_falhar=erros.append, chave='gravar')
+        self.assertIsInstance(erros[0], QueryCanceledError)
+
+    def test_lotes_aguardam_a_interface(self):
+        con = ConexaoFalsa()
+        with mock.patch.object(banco, 'conectar', return_value=con):
+            executor = ExecutorBanco(JanelaFalsa())
+            gerados, lotes, concluidos = [], [], []
+            def gerar(c):
+                for i in range(10):
+                    gerados.append(i)
+                    yield [i]
+            executor.submeter(gerar, concluidos.append, ao_lote=lotes.append, chave='lista')
+            time.sleep(0.2)
+            # Sem a interface consumir, o gerador para com as vagas cheias (mais o lote em mãos)
+            self.assertEqual(len(gerados), banco.LOTES_EM_ESPERA + 1)
+            fim = time.time() + 5
+            while not concluidos and time.time() < fim:
+                executor.processar_resultados()
+                time.sleep(0.01)
+            # Uma tarefa mais nova libera a antiga que aguardava vaga
+            executor.submeter(gerar, ao_lote=lotes.append, chave='lista')
+            executor.submeter(lambda c: 'nova', concluidos.append, chave='lista')
+            self.aguardar_resultados(executor, 2)
+            executor.encerrar()
+        self.assertEqual(lotes, [[i] for i in range(10)])
+        self.assertEqual(concluidos, [None, 'nova'])
+
+    def test_lotes_entregues_em_ordem(self):
+        executor = ExecutorBanco(JanelaFalsa(), ConexaoFalsa())
+        lotes, concluidos = [], []
+        executor.submeter(lambda c: iter([[1, 2], [3]]), concluidos.append, ao_lote=lotes.append)
+        self.assertEqual(lotes, [[1, 2], [3]])
+        self.assertEqual(concluidos, [None])
+
+class TestLeituraEmLotes(unittest.TestCase):
+    def setUp(self):
+        self.con = conectar()
+
+    def tearDown(self):
+        self.con.close()
+
+    def test_lotes_do_cursor_nomeado(self):
+        lotes = list(iterar_lotes(self.con, 'SELECT i FROM generate_series(1, %s) i', (5,), tamanho=2))
+        self.assertEqual(lotes, [[(1,), (2,)], [(3,), (4,)], [(5,)]])
+
+    def test_linhas_uma_a_uma(self):
+        linhas = iterar_consulta(self.con, 'SELECT i FROM generate_series(1, 3) i', tamanho=2)
+        self.assertEqual(next(linhas), (1,))
+        self.assertEqual(list(linhas), [(2,), (3,)])
+
+if __name__ == '__main__':
+    unittest.main()
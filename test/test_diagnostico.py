@@ -0,0 +1,79 @@
+import os
+import pstats
+import sys
+import time
+import tkinter
+import unittest
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+import diagnostico
+from diagnostico import MonitorInterface, nome_callback
+
+class TestMonitorInterface(unittest.TestCase):
+    def setUp(self):
+        # Interpretador Tcl sem janela: tem after, update e os callbacks do CallWrapper
+        self.tcl = tkinter.Tcl()
+        self.monitor = MonitorInterface(self.tcl)
+
+    def tearDown(self):
+        self.monitor.encerrar()
+        if self.monitor.ultimo_perfil:
+            os.remove(self.monitor.ultimo_perfil)
+
+    def test_encerrar_restaura_o_tkinter(self):
+        self.assertIs(tkinter.CallWrapper.__call__, diagnostico.chamar_medindo)
+        with self.assertRaises(RuntimeError):
+            MonitorInterface(tkinter.Tcl())
+        self.monitor.encerrar()
+        self.assertIs(tkinter.CallWrapper.__call__, diagnostico.chamar_callback)
+        # Um monitor novo pode ser criado depois do encerramento
+        self.monitor = MonitorInterface(self.tcl)
+
+    def test_nome_callback(self):
+        class Janela:
+            def filtrar_notas(self):
+                pass
+        self.assertEqual(nome_callback(Janela().filtrar_notas),
+                         'TestMonitorInterface.test_nome_callback.Janela.filtrar_notas')
+        funcao = lambda: None
+        self.assertEqual(nome_callback(funcao),
+                         f'TestMonitorInterface.test_nome_callback.<lambda>:{funcao.__code__.co_firstlineno}')
+
+    def test_mede_comandos_e_after(self):
+        def buscar_aluno():
+            time.sleep(0.02)
+        comando = self.tcl.register(buscar_aluno)
+        self.tcl.tk.call(comando)
+        self.tcl.tk.call(comando)
+        # O after do tkinter é identificado pela função agendada, não pelo callit interno
+        self.tcl.after(0, buscar_aluno)
+        self.tcl.update()
+        nome, chamadas, total, maior, histograma = self.monitor.resumo()[0]
+        self.assertTrue(nome.endswith('buscar_aluno'))
+        self.assertEqual(chamadas, 3)
+        self.assertGreaterEqual(maior, 20)
+        # Todas na faixa de 16 a 50 ms
+        self.assertEqual(histograma[diagnostico.LIMITES_HISTOGRAMA_MS.index(50)], 3)
+
+    def test_travamento_do_mainloop(self):
+        time.sleep((diagnostico.INTERVALO_BATIDA_MS + diagnostico.LIMITE_TRAVAMENTO_MS * 2) / 1000)
+        self.tcl.update()
+        self.assertEqual(self.monitor.travamentos, 1)
+        self.assertGreaterEqual(self.monitor.maior_travamento, diagnostico.LIMITE_TRAVAMENTO_MS)
+        # A batida não aparece entre os callbacks medidos
+        self.assertEqual(self.monitor.resumo(), [])
+
+    def test_perfil_dos_proximos_callbacks(self):
+        def marcar_materia():
+            sum(range(1000))
+        comando = self.tcl.register(marcar_materia)
+        self.monitor.perfilar(2)
+        self.tcl.tk.call(comando)
+        self.assertIsNone(self.monitor.ultimo_perfil)
+        self.tcl.tk.call(comando)
+        self.assertEqual(self.monitor.restantes_perfil, 0)
+        estatisticas = pstats.Stats(self.monitor.ultimo_perfil)
+        chamadas = {funcao[2]: dados[1] for funcao, dados in estatisticas.stats.items()}
+        self.assertEqual(chamadas['marcar_materia'], 2)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,5 +1,11 @@
+import os
+import sys
 import unittest
-from src.main import MiniEscolaApp, inicializar_banco
+# Os módulos de src importam uns aos outros pelo nome (ex.: from banco import ...)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+from src.main import MiniEscolaApp, TAMANHO_PAGINA
+from banco import inicializar_banco
+from repositorio import CONSULTAS_REFERENCIA
 import tkinter as tk
 
 class TestMiniEscola(unittest.TestCase):
@@ -23,7 +29,8 @@ class TestMiniEscola(unittest.TestCase):
         print(header)
         # Inicializa o banco de dados
         self.con = inicializar_banco()
-        self.app = MiniEscolaApp()
+        # Modo síncrono: as consultas rodam na hora, sem a thread do executor
+        self.app = MiniEscolaApp(assincrono=False)
         
         # Inicializa os widgets necessários para os testes
         self.app.painel_notas()  # Isso criará self.busca_aluno e self.filtro_curso
@@ -196,8 +203,8 @@ class TestMiniEscola(unittest.TestCase):
         materia_id = cur.fetchone()[0]
         self.con.commit()
         
-        # Testa toggle de matéria
-        self.app.toggle_materia(curso_id, materia_id, 1)
+        # Testa a gravação do currículo (inclusões e remoções em um único comando)
+        self.app.salvar_curriculo(curso_id, [materia_id], [])
         cur.execute('SELECT 1 FROM curso_materia WHERE curso_id = %s AND materia_id = %s', (curso_id, materia_id))
         self.assertIsNotNone(cur.fetchone())
         print("✅ Matéria adicionada ao curso")
@@ -302,7 +309,7 @@ class TestMiniEscola(unittest.TestCase):
         # Teste de filtro por nome
         self.app.busca_materia.delete(0, tk.END)
         self.app.busca_materia.insert(0, 'Teste')
-        self.app.filtrar_materias_curso(self.curso_id, set())
+        self.app.filtrar_materias_curso()
         
         items = self.app.lista_materias.get_children()
         self.assertGreater(len(items), 0)
@@ -500,5 +507,97 @@ class TestMiniEscola(unittest.TestCase):
         self.assertEqual(cur.fetchone()[0], 0)
         print("✅ Erro sem matéria selecionada")
 
+    def test_cache_referencia(self):
+        """Uma escrita gera uma única recarga, compartilhada pelas listas e combos"""
+        consultas = []
+        buscar_original = self.app.buscar_todas
+        def buscar_contando(con, query, params=None):
+            consultas.append(query)
+            return buscar_original(con, query, params)
+        self.app.buscar_todas = buscar_contando
+        
+        self.app.entrada_curso.insert(0, 'Curso Cache')
+        self.app.adicionar_curso()
+        self.assertEqual(consultas.count(CONSULTAS_REFERENCIA['cursos']), 1)
+        self.assertIn('Curso Cache', self.app.filtro_curso['values'])
+        nomes = [self.app.lista_cursos.item(i)['values'][1] for i in self.app.lista_cursos.get_children()]
+        self.assertIn('Curso Cache', nomes)
+        print("✅ Lista e combos de cursos atualizados com uma consulta")
+        
+        # Sem novas escritas, o cache é reaproveitado
+        self.app.carregar_cursos_combo()
+        self.assertEqual(consultas.count(CONSULTAS_REFERENCIA['cursos']), 1)
+        print("✅ Cache reaproveitado")
+
+    def test_paginacao_alunos(self):
+        """A lista de alunos carrega uma página por vez"""
+        cur = self.con.cursor()
+        cur.execute("INSERT INTO alunos(nome) SELECT 'Aluno ' || i FROM generate_series(1, %s) i",
+                    (TAMANHO_PAGINA + 5,))
+        self.con.commit()
+        
+        self.app.carregar_alunos()
+        self.assertEqual(len(self.app.lista_alunos.get_children()), TAMANHO_PAGINA)
+        print("✅ Primeira página carregada")
+        
+        self.app.carregar_pagina(self.app.lista_alunos)
+        self.assertEqual(len(self.app.lista_alunos.get_children()), TAMANHO_PAGINA + 5)
+        self.app.carregar_pagina(self.app.lista_alunos)
+        self.assertEqual(len(self.app.lista_alunos.get_children()), TAMANHO_PAGINA + 5)
+        print("✅ Última página carregada sem repetir alunos")
+
+    def test_curriculo_em_lote(self):
+        """Marcações ficam pendentes e são aplicadas juntas"""
+        cur = self.con.cursor()
+        cur.execute("INSERT INTO materias(nome) VALUES('Lote A'), ('Lote B') RETURNING id")
+        lote = {linha[0] for linha in cur.fetchall()}
+        self.con.commit()
+        self.app.recarregar_referencia('materias')
+        
+        self.app.busca_materia.insert(0, 'lote')
+        self.app.filtrar_materias_curso()
+        self.app.marcar_filtradas(True)
+        self.assertEqual(self.app.alteracoes_curriculo, {m_id: True for m_id in lote})
+        cur.execute('SELECT count(*) FROM curso_materia WHERE curso_id = %s', (self.curso_id,))
+        self.assertEqual(cur.fetchone()[0], 1)
+        print("✅ Matérias filtradas marcadas sem gravar")
+        
+        self.app.aplicar_curriculo()
+        cur.execute('SELECT materia_id FROM curso_materia WHERE curso_id = %s', (self.curso_id,))
+        self.assertEqual({linha[0] for linha in cur.fetchall()}, lote | {self.materia_id})
+        self.assertEqual(self.app.alteracoes_curriculo, {})
+        print("✅ Alterações aplicadas de uma vez")
+        
+        self.app.marcar_filtradas(False)
+        self.app.descartar_curriculo()
+        self.assertTrue(all(self.app.vars_check[m_id].get() for m_id in lote))
+        print("✅ Alterações descartadas")
+
+    def test_abas_carregam_ao_serem_mostradas(self):
+        """Só a aba inicial carrega na abertura; as demais, ao serem mostradas pela primeira vez"""
+        cargas = []
+        filtrar_original = self.app.filtrar_notas
+        def filtrar_contando(event=None):
+            cargas.append('notas')
+            filtrar_original()
+        self.app.filtrar_notas = filtrar_contando
+        self.assertTrue(self.app.aba_carregada('cursos'))
+        self.assertFalse(self.app.aba_carregada('notas'))
+
+        # Gravações em outras abas não carregam a aba de notas ainda fechada
+        self.app.entrada_aluno.insert(0, 'Aluno Aba')
+        self.app.adicionar_aluno()
+        self.assertEqual(cargas, [])
+        print("✅ Aba de notas não carregada na abertura")
+
+        self.app.notebook.select(3)
+        self.app.update()
+        self.assertEqual(cargas, ['notas'])
+        self.app.notebook.select(0)
+        self.app.notebook.select(3)
+        self.app.update()
+        self.assertEqual(cargas, ['notas'])
+        print("✅ Aba de notas carregada uma única vez, ao ser mostrada")
+
 if __name__ == '__main__':
     unittest.main() 
\ No newline at end of file
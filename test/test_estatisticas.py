@@ -0,0 +1,49 @@
+import os
+import sys
+import unittest
+from decimal import Decimal
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+from banco import conectar
+from repositorio import atualizar_estatisticas, consultar_estatisticas_cursos, consultar_estatisticas_materias
+from migracoes import aplicar_migracoes
+
+class TestEstatisticas(unittest.TestCase):
+    def setUp(self):
+        self.con = conectar()
+        aplicar_migracoes(self.con)
+        cur = self.con.cursor()
+        cur.execute("INSERT INTO cursos(nome) VALUES('Curso Estatísticas') RETURNING id")
+        self.curso_id = cur.fetchone()[0]
+        cur.execute("INSERT INTO materias(nome) VALUES('Matéria A'), ('Matéria B') RETURNING id")
+        self.materia_a, self.materia_b = (linha[0] for linha in cur.fetchall())
+        cur.execute("INSERT INTO alunos(nome, curso_id) VALUES('Aluno 1', %s), ('Aluno 2', %s) RETURNING id",
+                    (self.curso_id, self.curso_id))
+        aluno_1, aluno_2 = (linha[0] for linha in cur.fetchall())
+        cur.execute('''
+            INSERT INTO notas(aluno_id, materia_id, trabalho, simulado1, simulado2, prova) VALUES
+                (%s, %s, 5, 1, 1, 5), (%s, %s, 2, NULL, NULL, 1), (%s, %s, 4, 0.5, 0.5, NULL)
+        ''', (aluno_1, self.materia_a, aluno_2, self.materia_a, aluno_1, self.materia_b))
+
+    def tearDown(self):
+        self.con.rollback()
+        self.con.close()
+
+    def test_agregados_por_curso_e_materia(self):
+        atualizar_estatisticas(self.con)
+        cursos = {linha[0]: linha for linha in consultar_estatisticas_cursos(self.con)}
+        curso = cursos[self.curso_id]
+        # curso_id, nome, alunos, notas, médias (trabalho, sim1, sim2, prova, final), status, faixas
+        self.assertEqual(curso[2:4], (2, 3))
+        self.assertEqual(curso[4], Decimal('3.67'))
+        self.assertEqual(curso[8], Decimal('6.00'))
+        self.assertEqual(curso[9:12], (1, 1, 1))
+        self.assertEqual(curso[12], [0, 1, 1, 0, 1])
+
+        materias = {linha[0]: linha for linha in consultar_estatisticas_materias(self.con, self.curso_id)}
+        self.assertEqual(set(materias), {self.materia_a, self.materia_b})
+        self.assertEqual(materias[self.materia_a][2], 2)
+        self.assertEqual(materias[self.materia_a][7], Decimal('6.50'))
+        self.assertEqual(materias[self.materia_b][8:11], (0, 0, 1))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+import csv
+import json
+import os
+import sys
+import tempfile
+import unittest
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+from banco import conectar
+from exportacao import exportar_boletins, exportar_planilha_cursos
+from migracoes import aplicar_migracoes
+
+class TestExportacao(unittest.TestCase):
+    def setUp(self):
+        self.con = conectar()
+        aplicar_migracoes(self.con)
+        cur = self.con.cursor()
+        cur.execute("INSERT INTO cursos(nome) VALUES('Curso Exportação') RETURNING id")
+        self.curso_id = cur.fetchone()[0]
+        cur.execute("INSERT INTO materias(nome) VALUES('Matéria 1'), ('Matéria 2'), (NULL) RETURNING id")
+        materias = [linha[0] for linha in cur.fetchall()]
+        cur.execute('INSERT INTO curso_materia(curso_id, materia_id) VALUES(%s, %s)', (self.curso_id, materias[2]))
+        cur.execute("INSERT INTO alunos(nome, curso_id) VALUES('Aluno com Notas', %s), ('Aluno sem Notas', %s) RETURNING id",
+                    (self.curso_id, self.curso_id))
+        self.aluno_id = cur.fetchone()[0]
+        cur.execute('INSERT INTO notas(aluno_id, materia_id, trabalho, prova) VALUES(%s, %s, 4, 3), (%s, %s, 2, NULL)',
+                    (self.aluno_id, materias[0], self.aluno_id, materias[1]))
+        # Nota de uma matéria sem nome: continua sendo uma nota nos dois formatos
+        cur.execute('INSERT INTO notas(aluno_id, materia_id, trabalho, prova) VALUES(%s, %s, 1, 1)',
+                    (self.aluno_id, materias[2]))
+        self.pasta = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.con.rollback()
+        self.con.close()
+        self.pasta.cleanup()
+
+    def test_boletins_json(self):
+        caminho = os.path.join(self.pasta.name, 'boletins.json')
+        self.assertEqual(exportar_boletins(self.con, caminho, self.curso_id), 2)
+        with open(caminho, encoding='utf-8') as arquivo:
+            boletins = json.load(arquivo)
+        self.assertEqual(boletins[0]['aluno_id'], self.aluno_id)
+        self.assertEqual([(n['materia'], n['nota_final'], n['status']) for n in boletins[0]['notas']],
+                         [('Matéria 1', 7, 'Aprovado'), ('Matéria 2', 2, 'Pendente'), (None, 2, 'Reprovado')])
+        self.assertEqual(boletins[1]['notas'], [])
+
+    def test_boletins_e_planilha_csv(self):
+        caminho = os.path.join(self.pasta.name, 'boletins.csv')
+        exportar_boletins(self.con, caminho, self.curso_id)
+        with open(caminho, encoding='utf-8') as arquivo:
+            linhas = list(csv.DictReader(arquivo, delimiter=';'))
+        self.assertEqual([linha['status'] for linha in linhas], ['Aprovado', 'Pendente', 'Reprovado', ''])
+        # O aluno sem notas tem uma linha só com os seus dados, como a lista vazia do JSON
+        self.assertEqual(linhas[3]['aluno'], 'Aluno sem Notas')
+        self.assertEqual({linhas[3][coluna] for coluna in ('materia', 'nota_final', 'status')}, {''})
+
+        caminho = os.path.join(self.pasta.name, 'planilha.csv')
+        self.assertEqual(exportar_planilha_cursos(self.con, caminho, self.curso_id), 3)
+        with open(caminho, encoding='utf-8') as arquivo:
+            planilha = list(csv.DictReader(arquivo, delimiter=';'))
+        self.assertEqual((planilha[0]['materia'], planilha[0]['aprovados'], planilha[0]['media_final']),
+                         ('Matéria 1', '1', '7.00'))
+
+if __name__ == '__main__':
+    unittest.main()
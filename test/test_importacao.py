@@ -0,0 +1,70 @@
+import os
+import sys
+import tempfile
+import unittest
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+from banco import conectar
+from importacao import importar_notas
+from migracoes import aplicar_migracoes
+
+class TestImportacaoNotas(unittest.TestCase):
+    def setUp(self):
+        self.con = conectar()
+        aplicar_migracoes(self.con)
+        cur = self.con.cursor()
+        cur.execute("INSERT INTO cursos(nome) VALUES('Curso Importação') RETURNING id")
+        curso_id = cur.fetchone()[0]
+        cur.execute("INSERT INTO materias(nome) VALUES('Matéria do Curso'), ('Matéria de Fora') RETURNING id")
+        self.materia_id, self.materia_fora = (linha[0] for linha in cur.fetchall())
+        cur.execute('INSERT INTO curso_materia(curso_id, materia_id) VALUES(%s, %s)', (curso_id, self.materia_id))
+        cur.execute("INSERT INTO alunos(nome, curso_id) VALUES('Aluno A', %s), ('Aluno B', %s) RETURNING id",
+                    (curso_id, curso_id))
+        self.aluno_a, self.aluno_b = (linha[0] for linha in cur.fetchall())
+        # Nota já existente, que a importação deve substituir
+        cur.execute('INSERT INTO notas(aluno_id, materia_id, prova) VALUES(%s, %s, 1)', (self.aluno_b, self.materia_id))
+        self.arquivo = tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False, encoding='utf-8')
+
+    def tearDown(self):
+        # Nada é confirmado: a importação roda na transação do teste
+        self.con.rollback()
+        self.con.close()
+        os.remove(self.arquivo.name)
+
+    def importar(self, linhas):
+        self.arquivo.write('\n'.join(linhas) + '\n')
+        self.arquivo.close()
+        return importar_notas(self.con, self.arquivo.name)
+
+    def test_importacao_com_relatorio_de_erros(self):
+        a, b, m = self.aluno_a, self.aluno_b, self.materia_id
+        resultado = self.importar([
+            'aluno_id;materia_id;trabalho;simulado1;simulado2;prova',
+            f'{a};{m};4,5;1;;5',              # 2: válida
+            f'{b};{m};3;0,5;0,5;2',           # 3: atualiza a nota existente
+            f'{a};{m};6;;;5',                 # 4: trabalho fora da faixa
+            f'{a};{self.materia_fora};3;;;3', # 5: fora do currículo
+            f'999999999;{m};3;;;3',           # 6: aluno inexistente
+            f'x;{m};;;;',                     # 7: id inválido
+            f'{b};{m};2;;;2',                 # 8: repete a linha 3 e prevalece
+        ])
+        self.assertEqual((resultado.inseridas, resultado.atualizadas), (1, 1))
+        self.assertEqual([linha for linha, _ in resultado.erros], [3, 4, 5, 6, 7])
+        self.assertIn('trabalho', resultado.erros[1][1])
+        self.assertIn('não pertence ao curso', resultado.erros[2][1])
+
+        cur = self.con.cursor()
+        cur.execute('SELECT aluno_id, trabalho, simulado2, prova FROM notas WHERE aluno_id IN (%s, %s) ORDER BY aluno_id',
+                    (a, b))
+        self.assertEqual(cur.fetchall(), [(a, 4.5, None, 5), (b, 2, None, 2)])
+
+    def test_tabela_permanente_de_mesmo_nome_preservada(self):
+        cur = self.con.cursor()
+        cur.execute('CREATE TABLE public.importacao_notas (id INTEGER)')
+        resultado = self.importar(['aluno_id;materia_id;trabalho;simulado1;simulado2;prova',
+                                   f'{self.aluno_a};{self.materia_id};4;;;5'])
+        self.assertEqual(resultado.inseridas, 1)
+        cur.execute("SELECT to_regclass('public.importacao_notas') IS NOT NULL")
+        self.assertTrue(cur.fetchone()[0])
+
+if __name__ == '__main__':
+    unittest.main()
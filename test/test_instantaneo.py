@@ -0,0 +1,70 @@
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+import instantaneo
+from instantaneo import Instantaneo, abrir, desatualizadas
+
+class TestInstantaneo(unittest.TestCase):
+    def setUp(self):
+        self.pasta = tempfile.TemporaryDirectory()
+        self.caminho = os.path.join(self.pasta.name, 'cache', 'escola.sqlite3')
+
+    def tearDown(self):
+        self.pasta.cleanup()
+
+    def test_grava_e_le_listas(self):
+        copia = Instantaneo(self.caminho)
+        versoes = {'cursos': 3, 'alunos': 7, 'notas': 2, 'materias': 1}
+        copia.gravar('cursos', versoes, [(1, 'Curso A'), (2, 'Curso B')])
+        copia.gravar('arvore_notas', versoes, [(5, 'Aluno', None)])
+        copia.fechar()
+        copia = Instantaneo(self.caminho)
+        self.assertEqual(copia.ler_todas(), {
+            'cursos': ({'cursos': 3}, [(1, 'Curso A'), (2, 'Curso B')]),
+            'arvore_notas': ({'alunos': 7, 'cursos': 3, 'notas': 2}, [(5, 'Aluno', None)]),
+        })
+        copia.fechar()
+
+    def test_formato_diferente_descarta_listas(self):
+        copia = Instantaneo(self.caminho)
+        copia.gravar('cursos', {'cursos': 1}, [(1, 'Curso A')])
+        copia.fechar()
+        with mock.patch.object(instantaneo, 'FORMATO', 'outro'):
+            copia = Instantaneo(self.caminho)
+        self.assertEqual(copia.ler_todas(), {})
+        copia.fechar()
+
+    def test_desatualizadas(self):
+        assinaturas = {'cursos': {'cursos': 3}, 'materias': {'materias': 1},
+                       'arvore_notas': {'alunos': 7, 'cursos': 3, 'notas': 2}}
+        versoes = {'cursos': 3, 'materias': 1, 'alunos': 7, 'notas': 3}
+        self.assertEqual(desatualizadas(assinaturas, versoes), ['arvore_notas'])
+        # Lista que a versão atual não conhece é sempre recarregada
+        self.assertEqual(desatualizadas({'antiga': {}}, versoes), ['antiga'])
+
+    def test_arquivo_invalido(self):
+        with open(os.path.join(self.pasta.name, 'invalido.sqlite3'), 'w') as arquivo:
+            arquivo.write('não é um banco SQLite' * 100)
+        self.assertIsNone(abrir(arquivo.name))
+        copia = abrir(self.caminho)
+        self.assertIsInstance(copia, Instantaneo)
+        copia.fechar()
+
+    def test_gravacao_em_segundo_plano(self):
+        copia = Instantaneo(self.caminho)
+        with mock.patch.object(instantaneo.log, 'warning') as aviso:
+            copia.gravar('cursos', {'cursos': 1}, [(1, 'Curso A')])
+            copia.gravar('cursos', {'cursos': 2}, [(1, 'Curso A'), (2, 'Curso B')])
+            # Uma lista que não vira JSON é relatada no log sem afetar as demais
+            copia.gravar('materias', {'materias': 1}, [(1, object())])
+            copia.fechar()
+        self.assertTrue(aviso.called)
+        copia = Instantaneo(self.caminho)
+        self.assertEqual(copia.ler_todas(), {'cursos': ({'cursos': 2}, [(1, 'Curso A'), (2, 'Curso B')])})
+        copia.fechar()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+import os
+import sys
+import unittest
+from decimal import Decimal
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+from banco import conectar
+from repositorio import consultar_turma, remover_notas_em_lote, salvar_notas_em_lote
+from migracoes import aplicar_migracoes
+
+class TestLancamentoEmLote(unittest.TestCase):
+    def setUp(self):
+        self.con = conectar()
+        aplicar_migracoes(self.con)
+        cur = self.con.cursor()
+        cur.execute("INSERT INTO cursos(nome) VALUES('Curso Lançamento') RETURNING id")
+        self.curso_id = cur.fetchone()[0]
+        cur.execute("INSERT INTO materias(nome) VALUES('Matéria do Curso'), ('Matéria de Fora') RETURNING id")
+        self.materia_id, self.materia_fora = (linha[0] for linha in cur.fetchall())
+        cur.execute('INSERT INTO curso_materia(curso_id, materia_id) VALUES(%s, %s)', (self.curso_id, self.materia_id))
+        cur.execute("INSERT INTO alunos(nome, curso_id) VALUES('Aluno A', %s), ('Aluno B', %s) RETURNING id",
+                    (self.curso_id, self.curso_id))
+        self.aluno_a, self.aluno_b = (linha[0] for linha in cur.fetchall())
+        cur.execute('INSERT INTO notas(aluno_id, materia_id, prova) VALUES(%s, %s, 1)', (self.aluno_b, self.materia_id))
+
+    def tearDown(self):
+        self.con.rollback()
+        self.con.close()
+
+    def test_turma_com_notas_existentes(self):
+        turma = consultar_turma(self.con, self.curso_id, self.materia_id)
+        self.assertEqual([linha[:2] for linha in turma], [(self.aluno_a, 'Aluno A'), (self.aluno_b, 'Aluno B')])
+        self.assertEqual(turma[0][2:], (None,) * 6)
+        self.assertEqual(turma[1][5], Decimal('1.00'))
+        self.assertEqual(turma[1][7], 'Pendente')
+
+    def test_gravacao_em_um_comando(self):
+        m = self.materia_id
+        gravadas = salvar_notas_em_lote(self.con, [
+            (self.aluno_a, m, 4, 0.5, None, 3),
+            (self.aluno_b, m, 2, None, None, None),
+            (self.aluno_a, self.materia_fora, 5, 1, 1, 5),
+        ])
+        self.assertEqual(sorted(gravadas), sorted([
+            (self.aluno_a, Decimal('7.50'), 'Aprovado'),
+            (self.aluno_b, Decimal('2.00'), 'Pendente'),
+        ]))
+        cur = self.con.cursor()
+        cur.execute('SELECT trabalho, prova FROM notas WHERE aluno_id = %s AND materia_id = %s', (self.aluno_b, m))
+        # A nota existente é substituída por inteiro, como na tela de notas
+        self.assertEqual(cur.fetchone(), (Decimal('2.00'), None))
+        cur.execute('SELECT count(*) FROM notas WHERE materia_id = %s', (self.materia_fora,))
+        self.assertEqual(cur.fetchone()[0], 0)
+
+    def test_remocao_das_linhas_limpas(self):
+        # Só o aluno B tinha nota: o A não tem o que apagar
+        removidas = remover_notas_em_lote(self.con, self.materia_id, [self.aluno_a, self.aluno_b])
+        self.assertEqual(removidas, [self.aluno_b])
+        cur = self.con.cursor()
+        cur.execute('SELECT count(*) FROM notas WHERE materia_id = %s', (self.materia_id,))
+        self.assertEqual(cur.fetchone()[0], 0)
+
+if __name__ == '__main__':
+    unittest.main()
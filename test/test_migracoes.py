@@ -0,0 +1,93 @@
+import os
+import sys
+import unittest
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+from banco import conectar
+from psycopg2 import errors
+from migracoes import MIGRACOES, aplicar_migracao, aplicar_migracoes, versao_banco, VERSAO_ATUAL
+
+class TestMigracoes(unittest.TestCase):
+    def setUp(self):
+        self.con = conectar()
+
+    def tearDown(self):
+        self.con.close()
+
+    def test_migra_ate_a_versao_atual(self):
+        aplicar_migracoes(self.con)
+        cur = self.con.cursor()
+        self.assertEqual(versao_banco(cur), VERSAO_ATUAL)
+
+    def test_reaplicar_nao_altera_nada(self):
+        aplicar_migracoes(self.con)
+        aplicar_migracoes(self.con)
+        cur = self.con.cursor()
+        cur.execute('SELECT count(*) FROM schema_version')
+        self.assertEqual(cur.fetchone()[0], VERSAO_ATUAL)
+
+    def test_indices_criados(self):
+        aplicar_migracoes(self.con)
+        cur = self.con.cursor()
+        cur.execute("SELECT indexname FROM pg_indexes WHERE indexname LIKE 'idx_%%'")
+        indices = {row[0] for row in cur.fetchall()}
+        self.assertTrue({'idx_alunos_curso', 'idx_notas_materia', 'idx_curso_materia_materia'} <= indices)
+
+    def test_chaves_estrangeiras_validadas(self):
+        aplicar_migracoes(self.con)
+        cur = self.con.cursor()
+        cur.execute("""
+            SELECT conname FROM pg_constraint
+            WHERE contype = 'f' AND conrelid IN ('notas'::regclass, 'curso_materia'::regclass, 'alunos'::regclass)
+              AND NOT convalidated
+        """)
+        self.assertEqual(cur.fetchall(), [])
+
+    def test_nota_final_e_status_calculados(self):
+        aplicar_migracoes(self.con)
+        cur = self.con.cursor()
+        cur.execute("INSERT INTO alunos(nome) VALUES('Aluno Migração') RETURNING id")
+        aluno_id = cur.fetchone()[0]
+        casos = [
+            ((5, 1, 1, 5), 10, 'Aprovado'),
+            ((3, 0.5, None, 2.5), 6, 'Reprovado'),
+            ((3, None, None, 3.5), 6.5, 'Aprovado'),
+            ((4, 1, 1, None), 6, 'Pendente'),
+        ]
+        for (trabalho, sim1, sim2, prova), nota_final, status in casos:
+            cur.execute("INSERT INTO materias(nome) VALUES('Matéria Migração') RETURNING id")
+            cur.execute('''
+                INSERT INTO notas(aluno_id, materia_id, trabalho, simulado1, simulado2, prova)
+                VALUES(%s, %s, %s, %s, %s, %s) RETURNING nota_final, status
+            ''', (aluno_id, cur.fetchone()[0], trabalho, sim1, sim2, prova))
+            self.assertEqual(cur.fetchone(), (nota_final, status))
+        self.con.rollback()
+
+    def test_indice_unico_repete_a_remocao_de_duplicatas(self):
+        # Duplicata gravada entre a remoção e a construção do índice da migração 3
+        class ConexaoFalsa:
+            autocommit = False
+            def __init__(self):
+                self.comandos = []
+                self.falhas = 1
+            def cursor(self):
+                return self
+            def execute(self, comando, params=None):
+                self.comandos.append(' '.join(comando.split()[:3]))
+                if comando.startswith('CREATE UNIQUE') and self.falhas:
+                    self.falhas -= 1
+                    raise errors.UniqueViolation()
+            def fetchone(self):
+                return None
+            def commit(self):
+                pass
+        con = ConexaoFalsa()
+        numero, descricao, passos = MIGRACOES[2]
+        aplicar_migracao(con, numero, descricao, passos)
+        # A remoção roda de novo antes da segunda tentativa
+        self.assertEqual(con.comandos[:5], ['DELETE FROM notas', 'SELECT 1 FROM', 'CREATE UNIQUE INDEX',
+                                            'DELETE FROM notas', 'SELECT 1 FROM'])
+        self.assertEqual(con.comandos.count('CREATE UNIQUE INDEX'), 2)
+        self.assertFalse(con.autocommit)
+
+if __name__ == '__main__':
+    unittest.main()
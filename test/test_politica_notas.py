@@ -0,0 +1,73 @@
+import os
+import random
+import sys
+import unittest
+import numpy as np
+from psycopg2.extras import execute_values
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+from banco import conectar
+from migracoes import aplicar_migracoes
+from politica_notas import (POLITICA_ATUAL, STATUS, PoliticaNotas, avaliar, carregar_notas, resumo,
+                            simular)
+
+class TestPoliticaNotas(unittest.TestCase):
+    def test_regra_atual(self):
+        nan = np.nan
+        final, status = avaliar(POLITICA_ATUAL, [
+            [5, 1, 1, 5],
+            [3, 0.5, nan, 2.5],
+            [3, nan, nan, 3.5],
+            [4, 1, 1, nan],
+            [3, 0.01, nan, 3],
+        ])
+        self.assertEqual(final.tolist(), [10, 6, 6.5, 6, 6.01])
+        self.assertEqual(STATUS[status].tolist(), ['Aprovado', 'Reprovado', 'Aprovado', 'Pendente', 'Aprovado'])
+
+    def test_politica_configuravel(self):
+        politica = PoliticaNotas(pesos=(1, 0.5, 0.5, 1), limite=9, aprovacao=5, obrigatorios=('prova',))
+        final, status = avaliar(politica, [[5, 1, 1, 5], [np.nan, 1, 0, 4.5], [2, 1, 1, np.nan]])
+        self.assertEqual(final.tolist(), [9, 5, 3])
+        self.assertEqual(STATUS[status].tolist(), ['Aprovado', 'Reprovado', 'Pendente'])
+        self.assertEqual(resumo(status), {'Pendente': 1, 'Reprovado': 1, 'Aprovado': 1})
+
+class TestPoliticaNoBanco(unittest.TestCase):
+    def setUp(self):
+        self.con = conectar()
+        aplicar_migracoes(self.con)
+
+    def tearDown(self):
+        self.con.rollback()
+        self.con.close()
+
+    def test_identica_as_colunas_do_banco(self):
+        cur = self.con.cursor()
+        cur.execute("INSERT INTO cursos(nome) VALUES('Curso Política') RETURNING id")
+        curso_id = cur.fetchone()[0]
+        cur.execute("INSERT INTO materias(nome) VALUES('Matéria Política') RETURNING id")
+        materia_id = cur.fetchone()[0]
+        cur.execute("INSERT INTO alunos(nome, curso_id) SELECT 'Aluno ' || i, %s FROM generate_series(1, 2000) i "
+                    "RETURNING id", (curso_id,))
+        rng = random.Random(7)
+        def componente(maximo):
+            return None if rng.random() < 0.1 else rng.randint(0, maximo * 100) / 100
+        execute_values(cur, 'INSERT INTO notas(aluno_id, materia_id, trabalho, simulado1, simulado2, prova) VALUES %s',
+                       [(aluno_id, materia_id, componente(5), componente(1), componente(1), componente(5))
+                        for aluno_id, in cur.fetchall()])
+
+        ids, notas = carregar_notas(self.con, curso_id)
+        final, status = avaliar(POLITICA_ATUAL, notas)
+        cur.execute('''
+            SELECT n.id, n.nota_final, n.status FROM notas n JOIN alunos a ON a.id = n.aluno_id
+            WHERE a.curso_id = %s
+        ''', (curso_id,))
+        banco = {nota_id: (float(nota_final), nota_status) for nota_id, nota_final, nota_status in cur.fetchall()}
+        self.assertEqual(len(ids), 2000)
+        self.assertEqual(dict(zip(ids.tolist(), zip(final.tolist(), STATUS[status].tolist()))), banco)
+
+        # Simulação: exigir só a prova nunca deixa mais notas pendentes
+        simulacao = simular(notas, POLITICA_ATUAL._replace(obrigatorios=('prova',)))
+        self.assertLessEqual(simulacao.proposta['Pendente'], simulacao.atual['Pendente'])
+        self.assertEqual(simulacao.notas, 2000)
+
+if __name__ == '__main__':
+    unittest.main()
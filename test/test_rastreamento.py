@@ -0,0 +1,102 @@
+import os
+import sys
+import unittest
+from unittest import mock
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+import diagnostico
+import rastreamento
+from banco import ExecutorBanco, conectar, iterar_lotes
+from rastreamento import normalizar_sql
+
+class JanelaFalsa:
+    def after(self, tempo, funcao):
+        pass
+
+class TestRastreamento(unittest.TestCase):
+    def setUp(self):
+        rastreamento.zerar()
+        self.con = conectar()
+
+    def tearDown(self):
+        self.con.rollback()
+        self.con.close()
+        rastreamento.zerar()
+
+    def medicoes(self, acao):
+        return {consulta[0]: consulta for item in rastreamento.resumo_por_acao() if item[0] == acao
+                for consulta in item[5]}
+
+    def test_normalizar_sql(self):
+        self.assertEqual(normalizar_sql("SELECT nome\n  FROM cursos WHERE id = %s AND nome = 'x''y'"),
+                         'SELECT nome FROM cursos WHERE id = ? AND nome = ?')
+        self.assertEqual(normalizar_sql('EXECUTE nota_edicao(%s, %s)'), 'EXECUTE nota_edicao(?, ?)')
+        # Identificadores com números e parâmetros do PREPARE ficam como estão
+        self.assertEqual(normalizar_sql('SELECT simulado1 FROM notas WHERE aluno_id = $1 LIMIT 10'),
+                         'SELECT simulado1 FROM notas WHERE aluno_id = $1 LIMIT ?')
+        # VALUES gerados pelo execute_values: o tamanho do lote não cria um comando novo
+        self.assertEqual(normalizar_sql(b"INSERT INTO t VALUES (1::int,'a',NULL::numeric),(2::int,'b',3.5::numeric)"),
+                         'INSERT INTO t VALUES (?::int,?,?::numeric), ...')
+
+    def test_comandos_agrupados_por_acao(self):
+        executor = ExecutorBanco(JanelaFalsa(), self.con)
+        def buscar(con):
+            cur = con.cursor()
+            for valor in (1, 2):
+                cur.execute('SELECT generate_series(1, %s)', (valor,))
+            linhas = [linha for lote in iterar_lotes(con, 'SELECT generate_series(1, 5000) AS n') for linha in lote]
+            return len(linhas)
+        resultados = []
+        executor.submeter(buscar, resultados.append, acao='carregar_teste')
+        self.assertEqual(resultados, [5000])
+
+        medicoes = self.medicoes('carregar_teste')
+        # sql, execuções, ms, maior ms, linhas, lentas
+        self.assertEqual(medicoes['SELECT generate_series(?, ?)'][1], 2)
+        self.assertEqual(medicoes['SELECT generate_series(?, ?)'][4], 3)
+        # No cursor nomeado as linhas vêm dos fetch
+        self.assertEqual(medicoes['SELECT generate_series(?, ?) AS n'][1], 1)
+        self.assertEqual(medicoes['SELECT generate_series(?, ?) AS n'][4], 5000)
+        # Fora da tarefa, a ação volta a ser a da thread
+        self.assertEqual(rastreamento.acao_atual(), 'MainThread')
+
+    def test_consulta_lenta_com_plano(self):
+        with mock.patch.object(rastreamento, 'LIMITE_LENTA_MS', 0), \
+                mock.patch.object(rastreamento, 'EXPLICAR_LENTAS', True), \
+                mock.patch.object(rastreamento.log, 'warning') as aviso:
+            rastreamento.definir_acao('teste_lentas')
+            try:
+                cur = self.con.cursor()
+                cur.execute('SELECT count(*) FROM pg_class WHERE relname = %s', ('cursos',))
+                # O EXPLAIN roda em um savepoint e não afeta a transação nem o resultado
+                self.assertEqual(cur.fetchone(), (1,))
+                cur.execute('SELECT 1')
+            finally:
+                rastreamento.definir_acao(None)
+        _, _, acao, _, sql, plano = rastreamento.consultas_lentas()[0]
+        self.assertEqual((acao, sql), ('teste_lentas', 'SELECT count(*) FROM pg_class WHERE relname = ?'))
+        self.assertIn('pg_class', plano)
+        self.assertEqual(cur.fetchone(), (1,))
+        self.assertTrue(aviso.called)
+
+    def test_acao_da_interface(self):
+        def adicionar_curso():
+            def concluido():
+                return (lambda: diagnostico.acao_da_interface())()
+            return concluido()
+        with mock.patch.object(diagnostico, 'ARQUIVOS_INTERFACE', {os.path.abspath(__file__)}):
+            self.assertEqual(adicionar_curso(), 'TestRastreamento.test_acao_da_interface')
+        self.assertIsNone(adicionar_curso())
+
+    def test_acao_da_interface_em_pacote(self):
+        # Tratador de src/lancamento.py importado como src.lancamento
+        pasta = os.path.dirname(diagnostico.__file__)
+        globais = {'__name__': 'src.lancamento', 'diagnostico': diagnostico}
+        codigo = 'def salvar():\n    return diagnostico.acao_da_interface()'
+        exec(compile(codigo, os.path.join(pasta, 'lancamento.py'), 'exec'), globais)
+        self.assertEqual(globais['salvar'](), 'salvar')
+        # Um módulo de mesmo nome em outro pacote não é da interface
+        exec(compile(codigo, os.path.join(pasta, 'outro', 'lancamento.py'), 'exec'), globais)
+        self.assertIsNone(globais['salvar']())
+
+if __name__ == '__main__':
+    unittest.main()
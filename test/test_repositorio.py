@@ -0,0 +1,109 @@
+import os
+import sys
+import unittest
+from decimal import Decimal
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+import repositorio
+from banco import conectar
+from migracoes import aplicar_migracoes
+
+class TestRepositorio(unittest.TestCase):
+    def setUp(self):
+        self.con = conectar()
+        aplicar_migracoes(self.con)
+
+    def tearDown(self):
+        self.con.rollback()
+        self.con.close()
+
+    def preparadas_no_servidor(self):
+        cur = self.con.cursor()
+        cur.execute('SELECT name FROM pg_prepared_statements')
+        return {linha[0] for linha in cur.fetchall()}
+
+    def test_consultas_preparadas_uma_vez_por_conexao(self):
+        repositorio.inserir_curso(self.con, 'Curso Repositório')
+        cur = self.con.cursor()
+        cur.execute("SELECT id FROM cursos WHERE nome = 'Curso Repositório'")
+        curso_id = cur.fetchone()[0]
+        self.assertEqual(repositorio.nome_curso(self.con, curso_id), 'Curso Repositório')
+        self.assertIn('nome_curso', self.preparadas_no_servidor())
+
+        # O preparo sobrevive ao rollback e é reaproveitado sem novo PREPARE
+        self.con.rollback()
+        self.assertIsNone(repositorio.nome_curso(self.con, curso_id))
+        self.assertEqual(repositorio.preparadas_por_conexao[self.con], {'nome_curso'})
+
+    def test_fluxo_de_notas(self):
+        repositorio.inserir_curso(self.con, 'Curso Notas')
+        repositorio.inserir_materia(self.con, 'Matéria Notas')
+        cur = self.con.cursor()
+        cur.execute("SELECT (SELECT max(id) FROM cursos), (SELECT max(id) FROM materias)")
+        curso_id, materia_id = cur.fetchone()
+        repositorio.salvar_curriculo(self.con, curso_id, [materia_id], [])
+        self.assertEqual(repositorio.materias_ligadas(self.con, curso_id), {materia_id})
+        repositorio.inserir_aluno(self.con, 'Aluno_% Notas', curso_id)
+        cur.execute('SELECT max(id) FROM alunos')
+        aluno_id = cur.fetchone()[0]
+        self.assertEqual(repositorio.dados_aluno(self.con, aluno_id), ('Aluno_% Notas', curso_id))
+        self.assertEqual(repositorio.materias_do_aluno(self.con, aluno_id), [(materia_id, 'Matéria Notas')])
+
+        salva = repositorio.salvar_nota(self.con, aluno_id, materia_id, Decimal('4'), None, Decimal('0.5'), 3)
+        self.assertEqual(salva[1:], ('Matéria Notas', Decimal('4.00'), None, Decimal('0.50'), Decimal('3.00'),
+                                     Decimal('7.50'), 'Aprovado'))
+        self.assertEqual(repositorio.nota_edicao(self.con, aluno_id, materia_id),
+                         (Decimal('4.00'), None, Decimal('0.50'), Decimal('3.00')))
+        self.assertEqual(len(repositorio.notas_do_aluno(self.con, aluno_id)), 1)
+        self.assertEqual(repositorio.notas_do_aluno(self.con, aluno_id, 'Pendente'), [])
+
+        # O texto da busca é literal, mesmo com curingas do LIKE
+        lotes = list(repositorio.buscar_alunos_com_notas(self.con, '_%', 'Curso Notas', 'Aprovado'))
+        self.assertEqual([linha for lote in lotes for linha in lote], [(aluno_id, 'Aluno_% Notas', 'Curso Notas')])
+        self.assertEqual(list(repositorio.buscar_alunos_com_notas(self.con, 'x%', None, None)), [])
+
+        # Matéria fora do currículo não é gravada
+        repositorio.salvar_curriculo(self.con, curso_id, [], [materia_id])
+        self.assertIsNone(repositorio.salvar_nota(self.con, aluno_id, materia_id, 1, None, None, 1))
+        repositorio.remover_curso(self.con, curso_id)
+        self.assertEqual(repositorio.notas_do_aluno(self.con, aluno_id), [])
+        self.assertEqual(repositorio.dados_aluno(self.con, aluno_id), ('Aluno_% Notas', None))
+
+    def test_versoes_sobem_a_cada_alteracao(self):
+        antes = repositorio.versoes_tabelas(self.con)
+        lidas = {}
+        buscar = repositorio.lendo_versoes(repositorio.buscar_todas, lidas)
+        self.assertEqual(buscar(self.con, repositorio.CONSULTAS_REFERENCIA['cursos']),
+                         repositorio.buscar_todas(self.con, repositorio.CONSULTAS_REFERENCIA['cursos']))
+        self.assertEqual(lidas, antes)
+        repositorio.inserir_curso(self.con, 'Curso Versão')
+        cur = self.con.cursor()
+        # Um comando sem linhas afetadas também conta
+        cur.execute("UPDATE alunos SET nome = nome WHERE false")
+        depois = repositorio.versoes_tabelas(self.con)
+        self.assertEqual(depois['cursos'], antes['cursos'] + 1)
+        self.assertEqual(depois['alunos'], antes['alunos'] + 1)
+        self.assertEqual(depois['notas'], antes['notas'])
+        repositorio.compactar_alteracoes(self.con)
+        self.assertEqual(repositorio.versoes_tabelas(self.con), depois)
+
+    def test_gravacoes_simultaneas_nao_esperam_a_versao(self):
+        outra = conectar()
+        try:
+            repositorio.inserir_curso(self.con, 'Curso Simultâneo 1')
+            cur = outra.cursor()
+            # Com a transação acima aberta, a outra conexão grava na mesma tabela sem esperar
+            cur.execute("SET lock_timeout = '1s'")
+            repositorio.inserir_curso(outra, 'Curso Simultâneo 2')
+            antes = repositorio.versoes_tabelas(outra)['cursos']
+            outra.commit()
+            # A alteração confirmada por último conta, mesmo tendo o registro mais antigo
+            self.con.commit()
+            self.assertEqual(repositorio.versoes_tabelas(outra)['cursos'], antes + 1)
+        finally:
+            cur = outra.cursor()
+            cur.execute("DELETE FROM cursos WHERE nome LIKE 'Curso Simultâneo %%'")
+            outra.commit()
+            outra.close()
+
+if __name__ == '__main__':
+    unittest.main()